@@ -0,0 +1,123 @@
+## build_catchment_geometry.py converts the ZIP code boundaries of San Diego into the catchment area geometry read by the
+## dashboard. Boundaries are simplified at a few tolerances and their coordinates rounded, so the web workers only parse
+## a small JSON file and don't need geopandas. Run by the daily update, which skips the build when neither the boundaries
+## nor CATCHMENT_LEVELS changed (--force rebuilds anyway):
+##     python .github/scripts/build_catchment_geometry.py [resources/zips.geojson] [--force]
+import hashlib
+import json
+import os
+import sys
+
+import geopandas as gpd
+
+ZIPS_LOCATION = "resources/zips.geojson"
+CATCHMENT_GEOMETRY = "resources/catchment_areas.json"
+
+# Simplification tolerance (degrees) and coordinate decimals of each level of detail.
+CATCHMENT_LEVELS = {
+    "low" : ( 0.008, 3 ),
+    "medium" : ( 0.002, 4 ),
+    "high" : ( 0.0005, 5 ),
+}
+
+def load_zips( zips_location ):
+    """ Loads the ZIP code boundaries.
+    Returns
+    -------
+    geopandas.GeoSeries
+        boundary of each ZIP code, indexed by the ZIP code.
+    """
+    sd = gpd.read_file( zips_location )
+    sd = sd.loc[~sd["geometry"].isna()]
+    sd["ZIP"] = sd["ZIP"].apply( lambda x: f"{x:.0f}" )
+    return sd.set_index( "ZIP" )["geometry"]
+
+def quantize_ring( ring, decimals ):
+    """ Rounds the coordinates of a linear ring and drops the points that become duplicates of the previous point.
+    Returns
+    -------
+    list or None
+        the ring, or None if fewer than four points are left.
+    """
+    quantized = list()
+    for x, y in ring:
+        point = [round( x, decimals ), round( y, decimals )]
+        if not quantized or point != quantized[-1]:
+            quantized.append( point )
+    if len( quantized ) < 4:
+        return None
+    return quantized
+
+def quantize_geometry( geometry, decimals ):
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError( f"Unexpected geometry type {geometry['type']}." )
+
+    quantized = list()
+    for polygon in polygons:
+        rings = [quantize_ring( ring, decimals ) for ring in polygon]
+        # A polygon whose exterior collapsed is dropped, holes that collapsed are dropped from their polygon.
+        if rings[0] is not None:
+            quantized.append( [ring for ring in rings if ring is not None] )
+    if not quantized:
+        return None
+    return { "type" : "MultiPolygon", "coordinates" : quantized }
+
+def build_level( zips, tolerance, decimals ):
+    """ Simplifies and quantizes the boundaries of each ZIP code.
+    Returns
+    -------
+    dict
+        GeoJSON FeatureCollection with one feature per ZIP code, identified by the ZIP code. The catchment area of each
+        ZIP code is joined at runtime, so the geometry doesn't need rebuilding when a ZIP code moves between catchments.
+    """
+    simplified = zips.simplify( tolerance )
+    features = list()
+    for zipcode, geometry in simplified.items():
+        if geometry is None or geometry.is_empty:
+            continue
+        quantized = quantize_geometry( geometry.__geo_interface__, decimals )
+        if quantized is None:
+            continue
+        features.append( { "type" : "Feature", "id" : zipcode, "properties" : {}, "geometry" : quantized } )
+    return { "type" : "FeatureCollection", "features" : features }
+
+def input_hash( zips_location ):
+    """ Returns a hash of the ZIP code boundaries and of CATCHMENT_LEVELS.
+    """
+    digest = hashlib.sha256()
+    with open( zips_location, "rb" ) as zips_file:
+        digest.update( zips_file.read() )
+    digest.update( json.dumps( CATCHMENT_LEVELS, sort_keys=True ).encode() )
+    return digest.hexdigest()
+
+def load_previous_hash():
+    if not os.path.exists( CATCHMENT_GEOMETRY ):
+        return None
+    with open( CATCHMENT_GEOMETRY, "r" ) as geometry_file:
+        return json.load( geometry_file ).get( "input_hash" )
+
+def build_catchment_geometry( zips_location=ZIPS_LOCATION ):
+    zips = load_zips( zips_location )
+    levels = dict()
+    for level, ( tolerance, decimals ) in CATCHMENT_LEVELS.items():
+        levels[level] = build_level( zips, tolerance, decimals )
+        print( f"{level}: {len( levels[level]['features'] )} ZIP codes, {len( json.dumps( levels[level] ) ) / 1e3:.0f} kB" )
+    return { "input_hash" : input_hash( zips_location ), "levels" : levels }
+
+if __name__ == "__main__":
+    arguments = [arg for arg in sys.argv[1:] if arg != "--force"]
+    zips_location = arguments[0] if arguments else ZIPS_LOCATION
+    if not os.path.exists( zips_location ):
+        print( f"{zips_location} not found. Skipping catchment geometry." )
+        sys.exit( 0 )
+    if "--force" not in sys.argv and input_hash( zips_location ) == load_previous_hash():
+        print( "ZIP code boundaries unchanged. Skipping catchment geometry." )
+        sys.exit( 0 )
+
+    geometry = build_catchment_geometry( zips_location )
+    with open( CATCHMENT_GEOMETRY, "w" ) as output:
+        json.dump( geometry, output, separators=( ",", ":" ) )
@@ -1,8 +1,13 @@
 from urllib.error import HTTPError
+import os
+import sys
 import pandas as pd
 import datetime
 from tableauscraper import TableauScraper as TS
 
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", ".." ) )
+from src.cases import interpolate_weekly_cases
+
 def append_wastewater( sd ):
     zip_loc = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/Zipcodes.csv"
     zips = pd.read_csv( zip_loc, usecols=["Zip_code", "Wastewater_treatment_plant"], dtype={"Zip_code" : str, "Wastewater_treatment_plant" : str } )
@@ -34,13 +39,6 @@ def download_sd_cases():
 
         return dataframe
 
-    def _add_missing_cases( entry, start ):
-        entry = entry.set_index( "updatedate" ).reindex( pd.date_range( start, entry["updatedate"].max() ) ).rename_axis( "updatedate" ).reset_index()
-        indexer = pd.api.indexers.FixedForwardWindowIndexer(window_size=7)
-        entry["new_cases"] = entry.rolling( window=indexer, min_periods=1 )["new_cases"].apply( lambda x: x.max() / 7 )
-        entry["new_cases"] = entry["new_cases"].fillna(0)
-        return entry
-
     # First, we load current dataset of cases
     sd = pd.read_csv( "resources/cases.csv", parse_dates=["updatedate"] )
     sd = sd.loc[~sd["ziptext"].isna()]
@@ -83,9 +81,8 @@ def download_sd_cases():
     date = sd["updatedate"].unique()[-2]
 
     sdprob = sd.loc[sd["updatedate"]>date]
-    sdprob = sdprob.groupby( "ziptext" ).apply( _add_missing_cases, start=date + pd.Timedelta( days=1 ) )
-    sdprob = sdprob.drop( columns="ziptext" ).reset_index()
-    sdprob = sdprob.drop( columns="level_1" )
+    sdprob = interpolate_weekly_cases( sdprob, start=date + pd.Timedelta( days=1 ) )
+    sdprob["new_cases"] = sdprob["new_cases"].fillna(0)
 
     sd = sd.loc[sd["updatedate"]<=date]
     sd = pd.concat( [sd,sdprob] )
@@ -1,6 +1,10 @@
+import os
+import sys
+import io
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
 import matplotlib.dates as mdates
 from subprocess import run
 import json
@@ -9,7 +13,13 @@ import re
 from scipy.special import expit, logit
 import pickle
 
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", ".." ) )
+from src.growth_model import MultinomialGrowthModel, GrowthModelResults
+
 SEQS_LOCATION = "resources/sequences.csv"
+MODEL_LOCATION = "resources/clinical.model"
+HISTORY_LOCATION = "resources/growth_rates_history.csv"
+BACKFILL_REGIONS = ["San Diego", "Baja California"]
 VOC_LOCATION = "resources/voc.txt"
 
 aliasor = Aliasor()
@@ -28,24 +38,67 @@ def load_cdc_variants():
         variants.append( entry["variant"] )
     return variants
 
-def load_sequences():
+def load_sequences( region : str = "San Diego" ):
     seqs = pd.read_csv( SEQS_LOCATION, usecols=["ID", "collection_date", "epiweek", "lineage", "state"],
                        parse_dates=["collection_date", "epiweek"] )
-    seqs = seqs.loc[seqs["state"] == "San Diego"]
+    if region is not None:
+        seqs = seqs.loc[seqs["state"] == region]
     return seqs
 
-def collapse_lineage( entry : str, accepted_lineages: set[str] ):
-    if entry in accepted_lineages or "." not in entry:
-        return entry
-    elif re.match( "[A-Z]{2}.\d+$", entry ):
+def lineage_parent( entry : str ):
+    if re.match( "[A-Z]{2}.\d+$", entry ):
         return aliasor.partial_compress( aliasor.uncompress( entry ), accepted_aliases=["BA"] )
     return ".".join( entry.split( "." )[:-1] )
 
-
-def calculate_CIs( entry, name, model ):
+class LineageCollapser:
+    """ Collapses lineages into their parents over several rounds. Works on the distinct lineage names rather than on
+    sequences: the parent of each name is computed once and reused in every round, and the sequences are only mapped
+    to their final collapsed lineage at the end.
+
+    Parameters
+    ----------
+    lineages : pandas.Series
+        lineage of each sequence.
+    """
+    def __init__( self, lineages : pd.Series ):
+        lineages = lineages.astype( "category" )
+        self.codes = lineages.cat.codes.to_numpy()
+        self.names = np.asarray( lineages.cat.categories, dtype=object )
+        self.sizes = np.bincount( self.codes[self.codes >= 0], minlength=len( self.names ) )
+        self._parents = dict()
+
+    def parent( self, entry : str ):
+        if entry not in self._parents:
+            self._parents[entry] = lineage_parent( entry )
+        return self._parents[entry]
+
+    def counts( self ) -> pd.Series:
+        """ Returns the number of sequences of each current collapsed lineage.
+        """
+        return pd.Series( self.sizes, index=self.names ).groupby( level=0 ).sum()
+
+    def collapse( self, accepted : set[str] ):
+        """ Replaces every lineage which isn't accepted by its parent.
+        """
+        self.names = np.asarray( [name if name in accepted or "." not in name else self.parent( name ) for name in self.names], dtype=object )
+
+    def collapsed( self ) -> np.ndarray:
+        """ Returns the collapsed lineage of each sequence.
+        """
+        return np.where( self.codes >= 0, self.names[self.codes], np.nan )
+
+
+def calculate_CIs( entry, model ):
     return_df = entry.copy()
-    se = model.cov_params().loc[name,name].to_numpy()
-    se = np.sqrt( [xx@se@xx for xx in [[i, 1] for i in return_df.index]] )
+
+    # The (epiweek, const) covariance block of each variant, stacked into a (variants, 2, 2) array.
+    names = model.names[1:]
+    lineages = np.arange( len( names ) )
+    cov = model.cov_params().to_numpy().reshape( len( names ), 2, len( names ), 2 )[lineages, :, lineages, :]
+
+    exog = np.column_stack( [return_df.index.to_numpy( dtype=float ), np.ones( len( return_df ) )] )
+    variants = pd.Index( names ).get_indexer( return_df["variant"] )
+    se = np.sqrt( np.einsum( "ri,rij,rj->r", exog, cov[variants], exog ) )
     return_df["upper"] = expit( logit( return_df["prevalence"] ) + 1.96 * se )
     return_df["lower"] = expit( logit( return_df["prevalence"] ) - 1.96 * se )
     return return_df
@@ -53,21 +106,48 @@ def calculate_CIs( entry, name, model ):
 
 def format_model_results( model_results, weeks : list ):
     results = pd.DataFrame( model_results.predict( [[i, 1] for i in weeks] ), index=weeks,
-                            columns=model_results.model._ynames_map.values() )
+                            columns=model_results.names )
     results = results.drop( columns=["Other"] )
     results = results.melt( var_name="variant", value_name="prevalence", ignore_index=False )
-    results = results.groupby( "variant" ).apply( lambda x: calculate_CIs( x, x.name, model_results ) )
-    return results
-
-
-def model_sequence_counts( df : pd.DataFrame, weeks : list ):
-    mdata = df.copy()
-    mdata["const"] = 1
-    X = mdata[["epiweek", "const"]]
-    Y = mdata["collapsed_linege"]
-
-    model = sm.MNLogit( Y, X, missing="drop" )
-    res = model.fit_regularized( maxiter=1000 )
+    results = calculate_CIs( results, model_results )
+    return results.sort_values( "variant", kind="stable" )
+
+
+def load_previous_model():
+    try:
+        with open( MODEL_LOCATION, "rb" ) as model_file:
+            model = pickle.load( model_file )
+    except FileNotFoundError:
+        return None
+    except ( pickle.UnpicklingError, AttributeError, ImportError, EOFError ) as error:
+        print( f"Unable to load previous growth model ({error!r}). Fitting from scratch." )
+        return None
+
+    # Models saved before the switch to GrowthModelResults can't be used as a starting point.
+    if not isinstance( model, GrowthModelResults ):
+        return None
+    return model
+
+
+def model_sequence_counts( df : pd.DataFrame, weeks : list, previous : GrowthModelResults = None, compare_cold : bool = False ):
+    # The week is the only covariate, so the model is fit to the number of sequences of each lineage per week.
+    counts = df.groupby( "epiweek" )["collapsed_linege"].value_counts().unstack( fill_value=0 )
+    counts = counts.reindex( columns=df["collapsed_linege"].cat.categories, fill_value=0 )
+
+    model = MultinomialGrowthModel( counts )
+    if previous is not None and previous.names[0] == model.names[0]:
+        res = model.refit( previous )
+        matched = len( set( previous.names[1:] ).intersection( model.names[1:] ) )
+        print( f"Growth model warm-started from {matched} of {len( model.names ) - 1} lineages {'converged' if res.converged else 'did not converge'} "
+               f"after {res.iterations} iterations." )
+        if compare_cold:
+            # The warm start is only compared against a fit from scratch on the same counts when asked for.
+            cold = model.fit()
+            print( f"Fitting from scratch {'converged' if cold.converged else 'did not converge'} after {cold.iterations} iterations, "
+                   f"{cold.iterations - res.iterations} more than the warm start." )
+    else:
+        res = model.fit()
+        print( f"Growth model {'converged' if res.converged else 'did not converge'} after {res.iterations} iterations." )
 
     results = format_model_results( res, weeks )
 
@@ -76,35 +156,33 @@ def model_sequence_counts( df : pd.DataFrame, weeks : list ):
 
 def calculate_growth_rate( results ):
     coeff = results.params.T
-    coeff[["lower", "upper"]] = results._results.conf_int()[:, :1].reshape( -1, 2 )
-    coeff.index = list( results.model._ynames_map.values() )[1:]
+    coeff[["lower", "upper"]] = results.conf_int()[:, :1].reshape( -1, 2 )
+    coeff.index = results.names[1:]
     coeff = coeff.drop( columns=["const"] )
     coeff = coeff.rename( columns={"epiweek" : "growth_rate" })
     return coeff
 
 def dump_model_names( model, collapsed_names ):
-    with open( "resources/clinical.model", "wb" ) as model_file:
+    with open( MODEL_LOCATION, "wb" ) as model_file:
         pickle.dump( model, model_file )
     with open( "resources/collapsed_names.csv", "w" ) as cn:
         cn.write( "lineage,collapsed_lineage\n" )
         [cn.write( f"{k},{v}\n" ) for k, v in collapsed_names.items()]
 
-def smooth_sequence_counts( df : pd.DataFrame, weeks : list, forced_lineages : list[str], rounds : int = 10, min_sequences : int = 50 ):
+def smooth_sequence_counts( df : pd.DataFrame, weeks : list, forced_lineages : list[str], rounds : int = 10, min_sequences : int = 50, update_model : bool = True, compare_cold : bool = False ):
     last_seqs = df.loc[df["epiweek"].isin( weeks )].copy()
 
-    previous_round = "lineage"
+    collapser = LineageCollapser( last_seqs["lineage"] )
     for i in range( rounds ):
-        counts = last_seqs[previous_round].value_counts()
+        counts = collapser.counts()
         accepted = set( list( counts.loc[counts > min_sequences].index ) + forced_lineages )
-        last_seqs[f"round_{i}"] = last_seqs[previous_round].apply( lambda x: collapse_lineage( x, accepted ) )
+        collapser.collapse( accepted )
 
-        previous_round = f"round_{i}"
-        counts = last_seqs[previous_round].value_counts()
+        counts = collapser.counts()
         print(
             f"Round {i} allowed {len( set( list( counts.loc[counts > min_sequences].index ) + forced_lineages ) )} lineages from {len( accepted )}" )
     else:
-        last_seqs["collapsed_linege"] = last_seqs[previous_round]
-        last_seqs = last_seqs.drop( columns=[i for i in last_seqs.columns if i.startswith( "round" )] )
+        last_seqs["collapsed_linege"] = collapser.collapsed()
         accepted = set( list( counts.loc[counts > min_sequences].index ) + forced_lineages )
         last_seqs.loc[~last_seqs["collapsed_linege"].isin( accepted ), "collapsed_linege"] = "Other"
 
@@ -119,9 +197,11 @@ def smooth_sequence_counts( df : pd.DataFrame, weeks : list, forced_lineages : l
     cat = np.append( ["Other"], cat[cat != "Other"] )
     last_seqs["collapsed_linege"] = last_seqs["collapsed_linege"].astype( 'category' ).cat.set_categories( new_categories=cat )
 
-    smoothed, model = model_sequence_counts( last_seqs, last_week_prediction )
+    # Only the nightly run warm-starts from, and replaces, the saved model.
+    smoothed, model = model_sequence_counts( last_seqs, last_week_prediction, previous=load_previous_model() if update_model else None, compare_cold=compare_cold )
 
-    dump_model_names( model, collapsed_names )
+    if update_model:
+        dump_model_names( model, collapsed_names )
 
     smoothed.index = mdates.num2date( smoothed.index )
     smoothed.index = smoothed.index.tz_localize(None)
@@ -137,6 +217,13 @@ def calculate_last_weeks( df : pd.DataFrame ):
     return last_weeks
 
 
+def calculate_historical_weeks( df : pd.DataFrame ):
+    # Every window calculate_last_weeks() would have returned in the past, i.e. each run of 8 weeks with enough sequences.
+    weeks = df["epiweek"].value_counts().sort_index()
+    weeks = weeks[weeks > 100].index
+    return [weeks[i - 8:i] for i in range( 8, len( weeks ) + 1 )]
+
+
 def load_vocs():
     with open( VOC_LOCATION, "r" ) as i:
         vocs = { k: v for k, v in map( lambda x: x.strip().split( ",", 1 ), i ) }
@@ -199,11 +286,8 @@ def add_collapsed_lineages( seqs: pd.DataFrame, names: dict[str] ):
     seqs["collapsed_lineage"] = seqs["lineage"].replace( names )
     return seqs
 
-def calculate_growth_rates():
-    cdc_lineages = load_cdc_variants()
-    seqs = load_sequences()
-    last_weeks = calculate_last_weeks( seqs )
-    smooth_seqs, rates, names = smooth_sequence_counts( seqs, last_weeks, forced_lineages=cdc_lineages )
+def calculate_growth_rates( seqs : pd.DataFrame, last_weeks, cdc_lineages : list[str], update_model : bool = True, compare_cold : bool = False ):
+    smooth_seqs, rates, names = smooth_sequence_counts( seqs, last_weeks, forced_lineages=cdc_lineages, update_model=update_model, compare_cold=compare_cold )
     rates = rates.sort_values( "growth_rate", ascending=False )
 
     seqs = add_collapsed_lineages( seqs, names )
@@ -212,7 +296,50 @@ def calculate_growth_rates():
     return generate_table( rates_df=rates, seqs_df=seqs, prevalence_df=smooth_seqs, weeks=last_weeks, vocs=voc_names, forced_lineages=cdc_lineages )
 
 
+# Sequences and CDC lineages shared by the backfill workers. They are set once per process by the pool initializer
+# rather than sent along with every window.
+_backfill_seqs = dict()
+_backfill_lineages = list()
+
+def _init_backfill_worker( seqs : dict[str, pd.DataFrame], cdc_lineages : list[str] ):
+    global _backfill_seqs, _backfill_lineages
+    _backfill_seqs = seqs
+    _backfill_lineages = cdc_lineages
+
+def backfill_window( job ):
+    region, weeks = job
+    seqs = _backfill_seqs[region]
+    # Only the sequences available at the end of the window, so totals match what a run on that day would report.
+    seqs = seqs.loc[seqs["epiweek"] <= weeks.max()].copy()
+    with redirect_stdout( io.StringIO() ):
+        _, table = calculate_growth_rates( seqs, weeks, _backfill_lineages, update_model=False )
+    table.insert( 0, "region", region )
+    return table
+
+def backfill_growth_rates( cdc_lineages : list[str], regions : list[str] = BACKFILL_REGIONS, workers : int = None ):
+    all_seqs = load_sequences( region=None )
+    seqs = { region : all_seqs.loc[all_seqs["state"] == region] for region in regions }
+    jobs = [( region, weeks ) for region in regions for weeks in calculate_historical_weeks( seqs[region] )]
+    print( f"Backfilling growth rates for {len( jobs )} windows." )
+
+    # Windows are independent. map() returns tables in the order of jobs, so the output doesn't depend on which
+    # worker finishes first.
+    with ProcessPoolExecutor( max_workers=workers, initializer=_init_backfill_worker, initargs=( seqs, cdc_lineages ) ) as executor:
+        tables = list( executor.map( backfill_window, jobs ) )
+
+    if len( tables ) == 0:
+        return pd.DataFrame()
+    return pd.concat( tables, ignore_index=True )
+
+
 if __name__ == "__main__":
-    growth_rates_filtered, all = calculate_growth_rates()
-    growth_rates_filtered.to_csv( "resources/growth_rates.csv", index=False )
-    all.to_csv( "resources/growth_rates_all.csv", index=False )
\ No newline at end of file
+    cdc_lineages = load_cdc_variants()
+    if "--backfill" in sys.argv:
+        history = backfill_growth_rates( cdc_lineages )
+        history.to_csv( HISTORY_LOCATION, index=False )
+    else:
+        seqs = load_sequences()
+        last_weeks = calculate_last_weeks( seqs )
+        growth_rates_filtered, all = calculate_growth_rates( seqs, last_weeks, cdc_lineages, compare_cold="--compare-cold" in sys.argv )
+        growth_rates_filtered.to_csv( "resources/growth_rates.csv", index=False )
+        all.to_csv( "resources/growth_rates_all.csv", index=False )
\ No newline at end of file
@@ -1,9 +1,28 @@
+import hashlib
+import os
+import sys
 import pandas as pd
-from epiweeks import Week
-import datetime
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", ".." ) )
+from src.epiweek import epiweek_start
+from src.snapshot import write_snapshot
+
+SEQS_LOCATION = "resources/sequences.csv"
+SNAPSHOT_LOCATION = "resources/sequences.parquet"
+STATE_LOCATION = "resources/sequences_state.parquet"
+EXCITE_LOCATION = "resources/excite_providers.csv"
+SDPHL_LOCATION = "resources/sdphl_sequences.txt"
+METADATA_URL = "https://raw.githubusercontent.com/andersen-lab/HCoV-19-Genomics/master/metadata.csv"
+LINEAGE_URL = "https://raw.githubusercontent.com/andersen-lab/HCoV-19-Genomics/master/lineage_report.csv"
+CATEGORICAL_COLUMNS = ["zipcode", "sequencer", "provider", "lineage", "state"]
+
+# Columns of the metadata, plus the lineage, that the output depends on. A row is processed again when one changes.
+HASH_COLUMNS = ["ID", "collection_date", "location", "authors", "originating_lab", "zipcode", "host", "lineage"]
+# Columns of process_rows() which are kept between runs.
+STATE_COLUMNS = ["ID", "num", "row_hash", "collection_date", "zipcode", "epiweek", "sequencer", "provider", "lineage", "state"]
 
 def load_excite_providers() :
-    excite = pd.read_csv( "resources/excite_providers.csv" )
+    excite = pd.read_csv( EXCITE_LOCATION )
     excite = excite.set_index( "search_id" )
     return excite["source"].to_dict()
 
@@ -11,18 +30,45 @@ def load_file_as_list( loc ):
     with open( loc, "r" ) as open_file:
         return [line.strip() for line in open_file]
 
-def download_search():
-    """ Downloads the metadata from the SEARCH github repository. Removes entries with very wrong dates.
+def extract_num( ids ):
+    """ Returns the number in SEARCH-<number> identifiers, which is used to match sequences to lineages. Identifiers
+    that don't follow the pattern are returned as is.
+    """
+    num = ids.str.extract( "SEARCH-([0-9]+)", expand=False )
+    num.loc[num.isna()] = ids
+    return num
+
+def download_raw_search():
+    """ Downloads the metadata and pangolin lineage report from the SEARCH github repository.
     Returns
     -------
-    pandas.DataFrame:
-        Data frame containing the metadata for all sequences generated by SEARCH
+    md : pandas.DataFrame
+        Unprocessed metadata.
+    pango : pandas.DataFrame
+        Lineage of each sequence, with the "num" of its ID.
     """
-
-    search_md = "https://raw.githubusercontent.com/andersen-lab/HCoV-19-Genomics/master/metadata.csv"
-    md = pd.read_csv( search_md, usecols=["ID", "collection_date", "location", "authors", "originating_lab", "zipcode", "host", "percent_coverage_cds"] )
+    md = pd.read_csv( METADATA_URL, usecols=["ID", "collection_date", "location", "authors", "originating_lab", "zipcode", "host", "percent_coverage_cds"] )
     md["collection_date"] = md["collection_date"].astype( str )
 
+    pango = pd.read_csv( LINEAGE_URL, usecols=["taxon", "lineage"] )
+    pango["num"] = extract_num( pango["taxon"] )
+    pango = pango[["num", "lineage"]]
+
+    return md, pango
+
+def process_rows( md ):
+    """ Filters and cleans metadata rows. Every step only depends on the row itself, so rows can be processed in any
+    subset. Steps which depend on the whole dataset are done by finalize_search().
+    Parameters
+    ----------
+    md : pandas.DataFrame
+        rows of the metadata with "num" and "lineage" columns.
+
+    Returns
+    -------
+    pandas.DataFrame:
+        rows of md passing the filters, with the same index.
+    """
     # Filter out incorrect samples or wastewater
     md = md.loc[~md["ID"].isin(["SEARCH-104076", "SEARCH-58367"])]
     #md = md.loc[~md["ID"].isin( load_file_as_list( "resources/ignore.txt") )]
@@ -35,6 +81,7 @@ def download_search():
     md = md.loc[~md["collection_date"].isin( ["NaT", "nan", 'Unknown', 'missing'] )]
 
     md = md.loc[~md["host"].isin(["Environment","Environmental"] )]
+    md = md.copy()
 
     # Generate an identifiable location column
     md["state"] = "Baja California"
@@ -43,12 +90,9 @@ def download_search():
     #clean up zipcode
     md["zipcode"] = md["zipcode"].astype( "str" )
     md["zipcode"] = md["zipcode"].apply( lambda x: x.split( "-" )[0] )
-    # Will covert all zipcodes to int except those with alphabetical characters.
-    md["zipcode"] = pd.to_numeric( md["zipcode"], errors="coerce", downcast="integer" )
 
-    md["epiweek"] = md["collection_date"].apply( lambda x: Week.fromdate( datetime.datetime.strptime( x, "%Y-%m-%d" ).date() ).startdate() )
     md["collection_date"] = pd.to_datetime( md["collection_date"], format="%Y-%m-%d" ).dt.normalize()
-    md["days_past"] = ( md["collection_date"].max() - md["collection_date"] ).dt.days
+    md["epiweek"] = epiweek_start( md["collection_date"] )
 
     md["originating_lab"] = md["originating_lab"].replace( { 'UC San Diego Center for Advanced Laboratory Medicine' :  "UCSD CALM Lab",
                                                             "UCSD EXCITE" : "UCSD EXCITE Lab",
@@ -66,7 +110,7 @@ def download_search():
     md["sequencer"] = "Andersen Lab"
     md.loc[md["originating_lab"]=="UCSD EXCITE Lab","sequencer"] = "UCSD EXCITE Lab"
     md.loc[md["authors"]=="Helix","sequencer"] = "Helix"
-    md.loc[md["ID"].isin( load_file_as_list( "resources/sdphl_sequences.txt" ) ),"sequencer"] = "SD County Public Health Laboratory"
+    md.loc[md["ID"].isin( load_file_as_list( SDPHL_LOCATION ) ),"sequencer"] = "SD County Public Health Laboratory"
     md.loc[md['ID'].str.startswith( "CA-SDCPHL-" ),"sequencer"] = "SD County Public Health Laboratory"
 
     md["provider"] = md["originating_lab"]
@@ -83,18 +127,28 @@ def download_search():
                                              "Genomica Lab Molecular, México" : "Genomica Laboratorio"} )
     md.loc[md["provider"].isna(),"provider"] = md["sequencer"]
 
-    # Add pangolin lineage information
-    pango_loc = "https://raw.githubusercontent.com/andersen-lab/HCoV-19-Genomics/master/lineage_report.csv"
-    pango = pd.read_csv( pango_loc, usecols=["taxon", "lineage"] )
-    pango["num"] = pango["taxon"].str.extract( "SEARCH-([0-9]+)" )
-    pango.loc[pango["num"].isna(),"num"] = pango["taxon"]
-    pango = pango[["num", "lineage"]]
+    return md[STATE_COLUMNS]
 
+def finalize_search( rows ):
+    """ Completes the steps of processing which depend on all rows: zipcode types, days since the most recent
+    sequence, and removing sequences which failed lineage calling.
+    Parameters
+    ----------
+    rows : pandas.DataFrame
+        output of process_rows() for every row of the metadata, in the order of the metadata.
 
-    md["num"] = md["ID"].str.extract( "SEARCH-([0-9]+)" )
-    md.loc[md["num"].isna(),"num"] = md["ID"]
+    Returns
+    -------
+    pandas.DataFrame:
+        Data frame containing the metadata for all sequences generated by SEARCH
+    """
+    if rows["num"].duplicated().any():
+        raise pd.errors.MergeError( "Merge keys are not unique in left dataset; not a one-to-one merge" )
 
-    md = md.merge( pango, left_on="num", right_on="num", how="left", validate="one_to_one" )
+    md = rows.copy()
+    # Will covert all zipcodes to int except those with alphabetical characters.
+    md["zipcode"] = pd.to_numeric( md["zipcode"], errors="coerce", downcast="integer" )
+    md["days_past"] = ( md["collection_date"].max() - md["collection_date"] ).dt.days
 
     # Filter sequences which failed lineage calling. These sequences are likely incomplete/erroneous.
     md = md.loc[~md["lineage"].isin( ["None", "Unassigned"] )]
@@ -103,6 +157,116 @@ def download_search():
 
     return md
 
+def add_lineages( md, pango ):
+    if not pango["num"].is_unique:
+        raise pd.errors.MergeError( "Merge keys are not unique in right dataset; not a one-to-one merge" )
+    md["lineage"] = md["num"].map( pango.set_index( "num" )["lineage"] )
+    return md
+
+def rule_modules():
+    """ Returns the paths of the modules of src imported by this script, like src/epiweek.py, whose code shapes each row.
+    """
+    src_dir = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "..", "src" )
+    src_dir = os.path.realpath( src_dir ) + os.sep
+    paths = [getattr( module, "__file__", None ) for module in list( sys.modules.values() )]
+    return sorted( os.path.realpath( path ) for path in paths if path and os.path.realpath( path ).startswith( src_dir ) )
+
+def rules_key():
+    """ Returns a 16 character key identifying the processing rules: this script, the modules of src it imports and the
+    files it reads besides the metadata. Changing any of them changes the hash of every row, so all rows are processed
+    again.
+    """
+    digest = hashlib.sha256()
+    for path in [os.path.abspath( __file__ ), *rule_modules(), EXCITE_LOCATION, SDPHL_LOCATION]:
+        with open( path, "rb" ) as rule_file:
+            digest.update( rule_file.read() )
+    return digest.hexdigest()[:16]
+
+def row_hashes( md ):
+    return pd.util.hash_pandas_object( md[HASH_COLUMNS], index=False, hash_key=rules_key() ).to_numpy()
+
+def download_search( state=None ):
+    """ Downloads the metadata from the SEARCH github repository. Removes entries with very wrong dates.
+    Parameters
+    ----------
+    state : pandas.DataFrame
+        state returned by a previous call. Only rows which are new or changed since then are processed again, the
+        result is identical to processing every row. None processes every row.
+
+    Returns
+    -------
+    pandas.DataFrame:
+        Data frame containing the metadata for all sequences generated by SEARCH
+    pandas.DataFrame:
+        State to pass to the next call.
+    """
+    md, pango = download_raw_search()
+
+    if state is not None and not ( md["ID"].is_unique and state["ID"].is_unique ):
+        print( "Metadata contains duplicate IDs. Processing every row." )
+        state = None
+
+    if state is None:
+        md["num"] = extract_num( md["ID"] )
+        md = add_lineages( md, pango )
+        md["row_hash"] = row_hashes( md )
+        rows = process_rows( md )
+    else:
+        positions = pd.Index( state["ID"] ).get_indexer( md["ID"] )
+        found = positions >= 0
+        md["num"] = state["num"].to_numpy()[positions]
+        md.loc[~found, "num"] = extract_num( md.loc[~found, "ID"] )
+        md = add_lineages( md, pango )
+        md["row_hash"] = row_hashes( md )
+
+        unchanged = found & ( state["row_hash"].to_numpy()[positions] == md["row_hash"].to_numpy() )
+        reuse = unchanged & state["kept"].to_numpy()[positions]
+        print( f"Processing {( ~unchanged ).sum()} of {len( md )} rows." )
+
+        previous = state.iloc[positions[reuse]]
+        previous.index = md.index[reuse]
+        rows = pd.concat( [previous[STATE_COLUMNS], process_rows( md.loc[~unchanged] )] ).sort_index()
+        for col in ["collection_date", "epiweek"]:
+            rows[col] = pd.to_datetime( rows[col] )
+
+    new_state = md[["ID", "num", "row_hash"]].copy()
+    new_state["kept"] = md.index.isin( rows.index )
+    new_state = new_state.join( rows.drop( columns=["ID", "num", "row_hash"] ) )
+
+    return finalize_search( rows[[col for col in STATE_COLUMNS if col != "row_hash"]] ), new_state
+
+def format_snapshot( md ):
+    """ Converts the output of download_search() into the typed frame the dashboard works with, so that workers don't
+    need to parse dates or clean zipcodes at boot.
+    Parameters
+    ----------
+    md : pandas.DataFrame
+        output of download_search().
+
+    Returns
+    -------
+    pandas.DataFrame:
+        Same rows as md with datetime64 dates, zipcodes as clean strings ("nan" if missing), and categorical dtypes for
+        the low-cardinality columns.
+    """
+    snapshot = md.copy()
+    snapshot["collection_date"] = pd.to_datetime( snapshot["collection_date"] ).dt.normalize()
+    snapshot["epiweek"] = pd.to_datetime( snapshot["epiweek"] ).dt.normalize()
+
+    zipcodes = pd.to_numeric( snapshot["zipcode"], errors="coerce" )
+    snapshot["zipcode"] = zipcodes.round().astype( "Int64" ).astype( str ).where( zipcodes.notna(), "nan" )
+
+    for col in CATEGORICAL_COLUMNS:
+        snapshot[col] = snapshot[col].astype( "category" )
+
+    return snapshot
+
 if __name__ == "__main__":
-    seqs_md = download_search()
-    seqs_md.to_csv( "resources/sequences.csv", index=False )
+    previous_state = None
+    if "--full" not in sys.argv and os.path.exists( STATE_LOCATION ):
+        previous_state = pd.read_parquet( STATE_LOCATION )
+
+    seqs_md, seqs_state = download_search( previous_state )
+    seqs_md.to_csv( SEQS_LOCATION, index=False )
+    write_snapshot( format_snapshot( seqs_md ), SNAPSHOT_LOCATION, SEQS_LOCATION )
+    seqs_state.to_parquet( STATE_LOCATION, index=False )
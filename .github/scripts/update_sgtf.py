@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", ".." ) )
+from src.sgtf import SGTF_URL, fit_mixture, input_hash, prepare_tests
+
+TESTS_LOCATION = "resources/sgtf.csv"
+FIT_LOCATION = "resources/fit.csv"
+ESTIMATES_LOCATION = "resources/estimates.csv"
+HASH_LOCATION = "resources/sgtf_fit.json"
+
+def download_tests():
+    """ Downloads the number of tests with S-gene target failure in San Diego and smooths the percent of SGTF tests.
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    return prepare_tests( pd.read_csv( SGTF_URL, parse_dates=["Date"] ) )
+
+def load_previous_hash():
+    if not os.path.exists( HASH_LOCATION ):
+        return None
+    with open( HASH_LOCATION, "r" ) as hash_file:
+        return json.load( hash_file ).get( "input_hash" )
+
+if __name__ == "__main__":
+    sgtf_tests = download_tests()
+    current_hash = input_hash( sgtf_tests )
+    outputs_exist = all( os.path.exists( loc ) for loc in [TESTS_LOCATION, FIT_LOCATION, ESTIMATES_LOCATION] )
+    if outputs_exist and "--force" not in sys.argv and current_hash == load_previous_hash():
+        print( "SGTF data unchanged. Skipping fit." )
+        sys.exit( 0 )
+
+    fits, sgtf_estimates = fit_mixture( sgtf_tests )
+    sgtf_tests.to_csv( TESTS_LOCATION, index=False )
+    fits.to_csv( FIT_LOCATION, index=False )
+    sgtf_estimates.to_csv( ESTIMATES_LOCATION )
+    with open( HASH_LOCATION, "w" ) as hash_file:
+        json.dump( { "input_hash" : current_hash, "url" : SGTF_URL }, hash_file, indent=2 )
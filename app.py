@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
+import os
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-import src.format_resources as format_data
 import dash
-from src.callbacks import register_callbacks
+from src.callbacks import register_callbacks, PATH_GIT_DICT
+from src.commit_dates import CommitDatePoller
+from src.dataset import DatasetStore
 
 external_stylesheets = [dbc.themes.ZEPHYR, dbc.icons.BOOTSTRAP]
 app = dash.Dash( __name__, external_stylesheets=external_stylesheets )
@@ -17,12 +19,14 @@ app.scripts.append_script( {
     "external_url" : "https://raw.githubusercontent.com/watronfire/lone_pine/master/assets/gtag.js"
 })
 
-sequences = format_data.load_sequences()
-cases_whole = format_data.load_cases()
-growth_rates = format_data.load_growth_rates()
-ww_growth_rates = format_data.load_ww_growth_rates()
+dataset_store = DatasetStore()
+dataset_store.start()
 
-register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rates )
+commit_dates = CommitDatePoller( PATH_GIT_DICT.values() )
+commit_dates.start()
+
+# Set CLIENTSIDE_FILTERS=1 to filter the sequence counts of the main page in the browser.
+register_callbacks( app, dataset_store, commit_dates, clientside_filters=os.environ.get( "CLIENTSIDE_FILTERS" ) == "1" )
 
 app.layout = html.Div( children=[
     dcc.Location(id='url', refresh=False),
@@ -0,0 +1,305 @@
+// Clientside filtering mode of the main page. The server sends the sequence counts of a region once per page load,
+// built by src/region_counts.py, and the dropdown options and lineage graphs are computed from them in the browser.
+// Each function mirrors the Python code drawing the same output when the mode is off.
+( function() {
+    var decoded = new WeakMap();
+
+    function unpack( packed ) {
+        var binary = atob( packed.data );
+        var bytes = new Uint8Array( binary.length );
+        for ( var i = 0; i < binary.length; i++ ) {
+            bytes[i] = binary.charCodeAt( i );
+        }
+        if ( packed.dtype === "uint8" ) {
+            return bytes;
+        } else if ( packed.dtype === "uint16" ) {
+            return new Uint16Array( bytes.buffer );
+        }
+        return new Uint32Array( bytes.buffer );
+    }
+
+    function columns( data ) {
+        var result = decoded.get( data );
+        if ( !result ) {
+            result = { codes : {}, counts : unpack( data.counts ) };
+            Object.keys( data.codes ).forEach( function( dim ) {
+                result.codes[dim] = unpack( data.codes[dim] );
+            } );
+            decoded.set( data, result );
+        }
+        return result;
+    }
+
+    // Same as CountCube._mask(): falsy filters are ignored and recency keeps the days_past buckets up to it.
+    function mask( data, recency, filters ) {
+        var cols = columns( data );
+        var keep = new Uint8Array( cols.counts.length ).fill( 1 );
+        Object.keys( filters ).forEach( function( dim ) {
+            if ( !filters[dim] ) {
+                return;
+            }
+            var code = data.labels[dim].indexOf( filters[dim] );
+            var codes = cols.codes[dim];
+            for ( var i = 0; i < keep.length; i++ ) {
+                keep[i] = keep[i] && codes[i] === code;
+            }
+        } );
+        if ( recency ) {
+            var bucket = data.bucket_edges.indexOf( recency );
+            if ( bucket < 0 ) {
+                throw new Error( "recency must be one of " + data.bucket_edges + ", not " + recency + "." );
+            }
+            var labels = data.labels.days_bucket;
+            var buckets = cols.codes.days_bucket;
+            for ( var j = 0; j < keep.length; j++ ) {
+                keep[j] = keep[j] && labels[buckets[j]] <= bucket;
+            }
+        }
+        return keep;
+    }
+
+    function compare( a, b ) {
+        return a < b ? -1 : ( a > b ? 1 : 0 );
+    }
+
+    // Same as CountCube.counts_by(), followed by dropping missing values: returns the sorted values of dim with the
+    // number of sequences matching the filters.
+    function countsBy( data, dim, recency, filters ) {
+        var cols = columns( data );
+        var keep = mask( data, recency, filters );
+        var codes = cols.codes[dim];
+        var totals = new Float64Array( data.labels[dim].length );
+        for ( var i = 0; i < keep.length; i++ ) {
+            if ( keep[i] ) {
+                totals[codes[i]] += cols.counts[i];
+            }
+        }
+        var result = [];
+        data.labels[dim].forEach( function( value, code ) {
+            if ( value !== null && totals[code] > 0 ) {
+                result.push( { value : value, count : totals[code] } );
+            }
+        } );
+        return result.sort( function( a, b ) { return compare( a.value, b.value ); } );
+    }
+
+    // Number of sequences per epiweek and lineage, as a matrix with sorted epiweeks as rows and sorted lineages as
+    // columns, like the pivot tables of plot_lineages_time() and plot_voc().
+    function pivotEpiweekLineage( data, recency, filters ) {
+        var cols = columns( data );
+        var keep = mask( data, recency, filters );
+        var weeks = cols.codes.epiweek;
+        var lineages = cols.codes.lineage;
+        var cells = {};
+        var rowSet = {};
+        var columnSet = {};
+        for ( var i = 0; i < keep.length; i++ ) {
+            var week = data.labels.epiweek[weeks[i]];
+            var lineage = data.labels.lineage[lineages[i]];
+            if ( !keep[i] || week === null || lineage === null ) {
+                continue;
+            }
+            rowSet[week] = true;
+            columnSet[lineage] = true;
+            var key = week + "|" + lineage;
+            cells[key] = ( cells[key] || 0 ) + cols.counts[i];
+        }
+        var rows = Object.keys( rowSet ).sort( compare );
+        var names = Object.keys( columnSet ).sort( compare );
+        var values = rows.map( function( week ) {
+            return names.map( function( lineage ) { return cells[week + "|" + lineage] || 0; } );
+        } );
+        var index = {};
+        names.forEach( function( lineage, i ) { index[lineage] = i; } );
+        return { rows : rows, columns : names, index : index, values : values };
+    }
+
+    function sum( values ) {
+        return values.reduce( function( a, b ) { return a + b; }, 0 );
+    }
+
+    // numpy.round() rounds halves to even.
+    function roundHalfEven( value ) {
+        var rounded = Math.round( value );
+        if ( Math.abs( value % 1 ) === 0.5 && rounded % 2 !== 0 ) {
+            rounded -= 1;
+        }
+        return rounded;
+    }
+
+    function pad( value ) {
+        return ( value < 10 ? "0" : "" ) + value;
+    }
+
+    // Upper limit of the x axis set by _add_date_formating(): the first day of the month after the last epiweek.
+    function maximumDate( week ) {
+        var parts = week.split( "-" ).map( Number );
+        var year = parts[0] + ( parts[1] === 12 ? 1 : 0 );
+        var month = parts[1] === 12 ? 1 : parts[1] + 1;
+        return year + "-" + pad( month ) + "-01T00:00:00";
+    }
+
+    function figure( data, layoutName, traces ) {
+        var layout = JSON.parse( JSON.stringify( data.layouts[layoutName] ) );
+        layout.template = data.template;
+        return { data : traces, layout : layout };
+    }
+
+    // Applies the scaling and axis limits of plot_lineages_time() and plot_voc() to the stacked series.
+    function timeFigure( data, layoutName, rows, series, scaleby ) {
+        var totals = rows.map( function( _, i ) { return sum( series.map( function( s ) { return s.y[i]; } ) ); } );
+        if ( scaleby === "fraction" ) {
+            series.forEach( function( s ) {
+                s.y = s.y.map( function( value, i ) { return value / totals[i]; } );
+            } );
+            totals = totals.map( function( total ) { return total > 0 ? 1 : 0; } );
+        }
+        var result = figure( data, layoutName, series.map( function( s ) {
+            return { type : "bar", x : rows, y : s.y, name : s.name, marker : { color : s.color } };
+        } ) );
+        result.layout.yaxis.range = [0, roundHalfEven( Math.max.apply( null, totals ) * 1.05 )];
+        if ( rows.length > 0 ) {
+            result.layout.xaxis.range = [result.layout.xaxis.range[0], maximumDate( rows[rows.length - 1] )];
+        }
+        return result;
+    }
+
+    function columnTotals( pivot, names ) {
+        return pivot.rows.map( function( _, i ) {
+            return sum( names.map( function( name ) { return pivot.values[i][pivot.index[name]]; } ) );
+        } );
+    }
+
+    function lineagesTime( data, pivot, lineage, scaleby ) {
+        var series = [];
+        var all = pivot.values.map( sum );
+        if ( lineage ) {
+            var column = pivot.index[lineage];
+            var focus = pivot.values.map( function( row ) { return column === undefined ? 0 : row[column]; } );
+            series.push( { name : lineage, y : focus, color : data.colors.light } );
+            all = all.map( function( total, i ) { return total - focus[i]; } );
+        }
+        series.push( { name : "All", y : all, color : data.colors.dark } );
+        return timeFigure( data, "lineage_time_" + scaleby, pivot.rows, series, scaleby );
+    }
+
+    function byTotal( groups, pivot ) {
+        var totals = {};
+        Object.keys( groups ).forEach( function( name ) {
+            totals[name] = sum( columnTotals( pivot, groups[name] ) );
+        } );
+        return Object.keys( groups ).sort( compare ).sort( function( a, b ) { return totals[b] - totals[a]; } );
+    }
+
+    function voc( data, pivot, scaleby, focus ) {
+        var groups = {};
+        pivot.columns.forEach( function( lineage ) {
+            var name = data.voc[lineage] || "Other";
+            if ( focus !== "VOC" ) {
+                name = name.indexOf( focus ) === 0 ? lineage : "Other";
+            }
+            ( groups[name] = groups[name] || [] ).push( lineage );
+        } );
+
+        var order;
+        if ( focus !== "VOC" ) {
+            var other = groups.Other || [];
+            delete groups.Other;
+            order = byTotal( groups, pivot );
+            var rest = [];
+            order.slice( 5 ).forEach( function( lineage ) { rest = rest.concat( groups[lineage] ); } );
+            order = order.slice( 0, 5 );
+            groups["Other " + focus + " lineages"] = rest;
+            order.push( "Other " + focus + " lineages" );
+            groups.Other = other;
+            order.push( "Other" );
+        } else {
+            order = byTotal( groups, pivot ).filter( function( name ) { return name !== "Other"; } );
+            if ( groups.Other ) {
+                order.push( "Other" );
+            }
+        }
+
+        // Same colors as dashplot.plot_voc(): the i-th group takes the i-th Dark2 color and "Other" is dark.
+        var series = order.map( function( name, i ) {
+            var color = name === "Other" ? data.colors.dark : data.colors.voc[i % data.colors.voc.length];
+            return { name : name, y : columnTotals( pivot, groups[name] ), color : color };
+        } );
+        return timeFigure( data, "voc_" + scaleby, pivot.rows, series, scaleby );
+    }
+
+    window.dash_clientside = Object.assign( {}, window.dash_clientside, {
+        filters : {
+            // format_data.get_provider_sequencer_values()
+            sequencer_options : function( data, url, recency, provider, zip ) {
+                if ( !data ) {
+                    return window.dash_clientside.no_update;
+                }
+                return providerSequencerValues( countsBy( data, "sequencer", recency, { provider : provider, zipcode : zip } ) );
+            },
+            provider_options : function( data, url, recency, sequencer, zip ) {
+                if ( !data ) {
+                    return window.dash_clientside.no_update;
+                }
+                return providerSequencerValues( countsBy( data, "provider", recency, { sequencer : sequencer, zipcode : zip } ) );
+            },
+            // format_data.get_lineage_values()
+            lineage_options : function( data, url, recency, zip, provider, sequencer ) {
+                if ( !data ) {
+                    return window.dash_clientside.no_update;
+                }
+                var values = countsBy( data, "lineage", recency, { zipcode : zip, provider : provider, sequencer : sequencer } ).map( function( row ) { return row.value; } );
+                var options = [{ label : "All variants of concern", value : "all-voc" },
+                               { label : "All Delta lineages", value : "all-delta" },
+                               { label : "All Omicron lineages", value : "all-omicron" },
+                               { label : " - Variants of concern", value : "None", disabled : true }];
+                values.filter( function( v ) { return v in data.voc; } ).forEach( function( v ) { options.push( { label : v, value : v } ); } );
+                options.push( { label : " - Variants of interest", value : "None", disabled : true } );
+                values.filter( function( v ) { return v in data.voi; } ).forEach( function( v ) { options.push( { label : v, value : v } ); } );
+                options.push( { label : " - PANGO lineages", value : "None", disabled : true } );
+                values.filter( function( v ) { return !( v in data.voc ) && !( v in data.voi ); } ).forEach( function( v ) { options.push( { label : v, value : v } ); } );
+                return options;
+            },
+            // dashplot.plot_lineages()
+            lineage_graph : function( data, url, recency, zip, provider, sequencer ) {
+                if ( !data ) {
+                    return window.dash_clientside.no_update;
+                }
+                var counts = countsBy( data, "lineage", recency, { zipcode : zip, provider : provider, sequencer : sequencer } );
+                counts.sort( function( a, b ) { return b.count - a.count; } );
+                var colors = counts.map( function( row ) {
+                    if ( row.value in data.voi ) {
+                        return data.colors.lineage_voi;
+                    } else if ( row.value in data.voc ) {
+                        return data.colors.lineage_voc;
+                    }
+                    return data.colors.dark;
+                } );
+                var result = figure( data, "lineages", [{ type : "bar",
+                                                          x : counts.map( function( row ) { return row.value; } ),
+                                                          y : counts.map( function( row ) { return row.count; } ),
+                                                          marker : { color : colors } }] );
+                result.layout.xaxis.range = [-0.5, Math.min( counts.length, 51 ) - 0.5];
+                return result;
+            },
+            // dashplot.plot_voc() and dashplot.plot_lineages_time(), for each scale of the lineage-type toggle.
+            lineage_time_variants : function( data, url, recency, zip, lineage, provider, sequencer ) {
+                if ( !data ) {
+                    return window.dash_clientside.no_update;
+                }
+                var pivot = pivotEpiweekLineage( data, recency, { zipcode : zip, provider : provider, sequencer : sequencer } );
+                var focus = { "all-voc" : "VOC", "all-delta" : "Delta", "all-omicron" : "Omicron" }[lineage];
+                var variants = {};
+                ["sequences", "fraction"].forEach( function( scaleby ) {
+                    variants[scaleby] = focus ? voc( data, pivot, scaleby, focus ) : lineagesTime( data, pivot, lineage, scaleby );
+                } );
+                return { figure : null, variants : variants };
+            }
+        }
+    } );
+
+    function providerSequencerValues( counts ) {
+        return counts.map( function( row ) { return { label : row.value + " (" + row.count + ")", value : row.value }; } )
+                     .sort( function( a, b ) { return compare( a.label, b.label ); } );
+    }
+} )();
@@ -0,0 +1,38 @@
+import threading
+import traceback
+
+def start_periodic( name, interval, func, immediate=False ):
+    """ Calls func every interval seconds on a daemon thread. Exceptions are printed and don't stop the thread.
+    Parameters
+    ----------
+    name : str
+        Name of the thread.
+    interval : float
+        Seconds to wait between calls.
+    func : callable
+        Function without arguments.
+    immediate : bool
+        Also call func as soon as the thread starts, instead of waiting interval seconds for the first call.
+
+    Returns
+    -------
+    threading.Event
+        Set it to stop the thread.
+    """
+    stop = threading.Event()
+
+    def call():
+        try:
+            func()
+        except Exception:
+            print( f"Background task {name} failed:" )
+            traceback.print_exc()
+
+    def run():
+        if immediate:
+            call()
+        while not stop.wait( interval ):
+            call()
+
+    threading.Thread( target=run, name=name, daemon=True ).start()
+    return stop
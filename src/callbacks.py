@@ -1,6 +1,10 @@
-from scipy.signal import savgol_filter
 import src.plot as dashplot
 import src.format_resources as format_data
+from src.query_cache import query_key
+from src.figure_cache import FigureCache
+from src.decimate import decimate_figure, relayout_range
+from src.region_counts import region_counts
+from src.dataset import WastewaterStore
 import src.pages.mainpage as mainpage
 import src.pages.sgtfpage as sgtfpage
 import src.pages.wastewaterpage as wastepage
@@ -8,10 +12,10 @@ import src.pages.monkeypox as monkeypox
 import src.pages.growth_table as growth_table
 import src.pages.graphonly as graphonly
 import src.pages.ww_growth_table as ww_growth_table
-from dash import Input, Output, html
-from datetime import datetime, timezone, timedelta
-import requests
+from dash import Input, Output, html, ctx, ClientsideFunction
+from dash.exceptions import PreventUpdate
 from urllib.parse import parse_qs
+from flask import jsonify
 
 
 PATH_GIT_DICT = {
@@ -22,11 +26,46 @@ PATH_GIT_DICT = {
     "/" : "https://api.github.com/repos/andersen-lab/HCoV-19-Genomics/git/refs/heads/master",
 }
 
-def register_url_sequences( df, url ):
+# Presentation toggles are handled in the browser. The server stores every variant of a figure in a dcc.Store next to
+# the graph, either as whole figures or as layout keys replacing those of a shared figure, and this function picks the
+# variant matching the toggle.
+SELECT_FIGURE_VARIANT = """
+function( store, choice ) {
+    if ( !store || !( choice in store.variants ) ) {
+        return window.dash_clientside.no_update;
+    }
+    var variant = store.variants[choice];
+    var figure = variant;
+    if ( store.figure ) {
+        figure = Object.assign( {}, store.figure, variant );
+        figure.layout = Object.assign( {}, store.figure.layout, variant.layout );
+    }
+    // Plotly writes computed ranges into the figure it draws, so the stored variants are never handed out directly.
+    return JSON.parse( JSON.stringify( figure ) );
+}
+"""
+
+# Graphs whose figure is picked in the browser, and the toggle choosing the variant.
+FIGURE_VARIANT_TOGGLES = {
+    "wastewater-graph" : "yaxis-scale-radio",
+    "monkeypox-graph" : "yaxis-scale-radio",
+    "wastewater-seq-graph" : "scale-seqs-radios",
+    "lineage-time-graph" : "lineage-type",
+}
+YAXIS_SCALES = ["linear", "log"]
+LINEAGE_SCALES = ["sequences", "fraction"]
+WASTEWATER_NORMS = ["prevalence", "viral", "cases"]
+
+def axis_variant( figure ):
+    """ Returns the y axes of figure, as a variant replacing the y axes of another figure.
+    """
+    return { "layout" : { key : value for key, value in figure["layout"].items() if key.startswith( "yaxis" ) } }
+
+def get_url_state( url ):
     if url == "/bajacalifornia":
-        return df.loc[df["state"]=="Baja California"]
+        return "Baja California"
     else:
-        return df.loc[df["state"]=="San Diego"]
+        return "San Diego"
 
 def register_url_cases( df, url ):
     if url == "/bajacalifornia":
@@ -34,36 +73,68 @@ def register_url_cases( df, url ):
     else:
         return df.loc[df["ziptext"]!="None"]
 
-def get_last_commit_date( url ):
-    try:
-        last_commit = requests.get( url ).json()["object"]["url"]
-        last_commit_date = requests.get( last_commit ).json()["author"]["date"]
-        last_commit_date = datetime.strptime( last_commit_date, "%Y-%m-%dT%H:%M:%SZ" ).replace( tzinfo=timezone.utc ).astimezone( timezone( timedelta( hours=-7 ) ) )
-        last_date = last_commit_date.strftime( "%B %d @ %I:%M %p PDT" )
-        return f"Updated at {last_date}"
-    except KeyError:
-        #return "Updating at the moment..."
-        return ""
-
-def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rates ):
-
-    def get_sequences( seqs, url, window=None, provider=None, sequencer=None, zip_f=None ):
-        new_seqs = seqs.copy()
-
-        new_seqs = register_url_sequences( new_seqs, url )
-
-        if window:
-            new_seqs = new_seqs.loc[sequences["days_past"] <= window]
-        if provider:
-            new_seqs = new_seqs.loc[new_seqs['provider']==provider]
-        if sequencer:
-            new_seqs = new_seqs.loc[new_seqs["sequencer"]==sequencer]
-        if zip_f:
-            new_seqs = new_seqs.loc[new_seqs["zipcode"]==zip_f]
-
-        return new_seqs
-
-    def get_cases( cases, url, window=None, source=None ):
+def register_callbacks( app, store, commit_dates, figure_cache=None, clientside_filters=False, wastewater_store=None ):
+    """ Registers the dashboard callbacks.
+    Parameters
+    ----------
+    app : dash.Dash
+    store : src.dataset.DatasetStore
+        Holds the current dataset. Every callback reads store.current once, so a dataset swapped in by the refresher is
+        only seen by later requests.
+    commit_dates : src.commit_dates.CommitDatePoller
+        Polls the last commit date of the repositories in PATH_GIT_DICT.
+    figure_cache : src.figure_cache.FigureCache
+        Cache of the figures returned by the callbacks. A new cache is created if not given.
+    clientside_filters : bool
+        Whether the dropdown options and lineage graphs of the main page are computed in the browser. The sequence
+        counts of the region are then sent once per page load, and changing the filters doesn't reach the server.
+    wastewater_store : src.dataset.WastewaterStore
+        Holds the current wastewater dataset. A new store is created if not given.
+    """
+    figure_cache = FigureCache() if figure_cache is None else figure_cache
+    wastewater_store = WastewaterStore() if wastewater_store is None else wastewater_store
+
+    def filter_callback( output, inputs, function_name ):
+        # Callbacks reading nothing but the sequence counts of the region. In the clientside filtering mode, the
+        # function of the same name in assets/clientside_filters.js is registered instead of the decorated one. It takes
+        # the counts loaded by update_region_counts() followed by the same inputs.
+        if clientside_filters:
+            app.clientside_callback( ClientsideFunction( namespace="filters", function_name=function_name ),
+                                     output, [Input( "region-counts", "data" )] + inputs )
+            return lambda function: function
+        return app.callback( output, inputs )
+
+    def get_figure( name, version, factory, *inputs ):
+        return figure_cache.get( name, inputs, version, factory )
+
+    def decimate_view( figure, graph_id, relayout ):
+        # Time series are sent downsampled to the visible range. Zooming or panning fires relayoutData, which requests
+        # the new range again at full resolution.
+        if ctx.triggered_id != graph_id:
+            return decimate_figure( figure )
+        x_range = relayout_range( relayout )
+        if x_range is None:
+            raise PreventUpdate
+        if x_range == "auto":
+            # Double-clicking resets to the initial view, which keeps the x range the figure was drawn with rather than
+            # autoranging over the whole series.
+            return decimate_figure( figure )
+        return decimate_figure( figure, x_range=x_range )
+
+    def get_query( dataset, name, factory, url, window=None, provider=None, sequencer=None, zip_f=None ):
+        return dataset.query_cache.get( query_key( get_url_state( url ), window, provider, sequencer, zip_f ), name, factory )
+
+    def get_sequences( dataset, url, window=None, provider=None, sequencer=None, zip_f=None ):
+        return get_query( dataset, "sequences",
+                          lambda: dataset.sequence_index.select( window=window, state=get_url_state( url ), provider=provider, sequencer=sequencer, zipcode=zip_f ),
+                          url, window, provider, sequencer, zip_f )
+
+    def get_counts( dataset, dims, url, window=None, provider=None, sequencer=None, zip_f=None ):
+        return get_query( dataset, f"counts_{'_'.join( dims )}",
+                          lambda: dataset.count_cube.counts_by( dims, window=window, state=get_url_state( url ), provider=provider, sequencer=sequencer, zipcode=zip_f ),
+                          url, window, provider, sequencer, zip_f )
+
+    def filter_cases( cases, url, window=None ):
         new_cases = cases.copy()
 
         new_cases = register_url_cases( new_cases, url )
@@ -71,15 +142,25 @@ def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rat
         if window:
             new_cases = cases.loc[cases["days_past"] <= window]
 
-        if source:
-            new_cases = cases.loc[cases["catchment"] == source].groupby( "updatedate" ).agg(
-                reported_cases=("new_cases", sum),
-                population=("population", sum ) )
-            new_cases["reported_cases_rolling"] = savgol_filter( new_cases["reported_cases"], window_length=21, polyorder=2 )
-            new_cases.loc[new_cases["reported_cases_rolling"] < 0] = 0
-            new_cases["reported_cases_rolling"] = new_cases["reported_cases_rolling"] / new_cases["population"]
         return new_cases
 
+    def get_cases( dataset, url, window=None, source=None ):
+        cases = dataset.cases
+        if not source:
+            return get_query( dataset, "cases", lambda: filter_cases( cases, url, window ), url, window )
+
+        new_cases = dataset.catchment_cases.xs( source, axis=1, level=1 )
+        return new_cases.loc[new_cases["reported_cases"].notna()]
+
+    @app.server.route( "/stats/query-cache" )
+    def query_cache_stats():
+        dataset = store.current
+        return jsonify( { "version" : dataset.version, **dataset.query_cache.stats() } )
+
+    @app.server.route( "/stats/figure-cache" )
+    def figure_cache_stats():
+        return jsonify( figure_cache.stats() )
+
     @app.callback(
         Output( "page-contents", "children" ),
         Input( "url", "pathname" )
@@ -121,7 +202,7 @@ def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rat
         Input( "url", "pathname")
     )
     def update_commit_date( path ):
-        return html.I( get_last_commit_date( PATH_GIT_DICT.get( path, PATH_GIT_DICT["/"] ) ) )
+        return html.I( commit_dates.get( PATH_GIT_DICT.get( path, PATH_GIT_DICT["/"] ) ) )
 
     @app.callback(
         Output( "top-table-div", "children" ),
@@ -133,15 +214,16 @@ def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rat
         elif url == "/wastewater":
             return ww_growth_table.get_table( format_data.load_ww_growth_rates() )
         else:
-            return growth_table.get_table( growth_rates )
+            return growth_table.get_table( store.current.growth_rates )
 
     @app.callback(
         Output( "zip-drop", "options" ),
         Input( "url", "pathname" )
     )
     def update_zip_drop( url ):
-        new_cases = get_cases( cases_whole, url )
-        return [{"label" : i, "value": i } for i in new_cases["ziptext"].sort_values().unique()]
+        dataset = store.current
+        new_cases = get_cases( dataset, url )
+        return get_query( dataset, "zip_values", lambda: [{"label" : i, "value": i } for i in new_cases["ziptext"].sort_values().unique()], url )
 
     @app.callback(
         Output( "zip-drop", "disabled" ),
@@ -150,39 +232,57 @@ def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rat
     def enable_zip_drop( url ):
         return url == "/bajacalifornia"
 
-    @app.callback(
+    if clientside_filters:
+        @app.callback(
+            Output( "region-counts", "data" ),
+            Input( "url", "pathname" )
+        )
+        def update_region_counts( url ):
+            dataset = store.current
+            return get_query( dataset, "region_counts", lambda: region_counts( dataset.count_cube, get_url_state( url ) ), url )
+
+    @filter_callback(
         Output( "sequencer-drop", "options" ),
         [Input( "url", "pathname" ),
          Input( "recency-drop", "value" ),
          Input( 'provider-drop', "value" ),
-         Input( "zip-drop", "value")]
+         Input( "zip-drop", "value")],
+        "sequencer_options"
     )
     def update_sequencer_drop( url, window, provider, zip_f ):
-        new_sequences = get_sequences( sequences, url, window, provider, None, zip_f )
-        return format_data.get_provider_sequencer_values( new_sequences, "sequencer" )
+        dataset = store.current
+        return get_query( dataset, "sequencer_values",
+                          lambda: format_data.get_provider_sequencer_values( get_counts( dataset, ["sequencer"], url, window, provider, None, zip_f ), "sequencer" ),
+                          url, window, provider, None, zip_f )
 
-    @app.callback(
+    @filter_callback(
         Output( "provider-drop", "options" ),
         [Input( "url", "pathname" ),
          Input( "recency-drop", "value" ),
          Input( 'sequencer-drop', "value" ),
-         Input( "zip-drop", "value")]
+         Input( "zip-drop", "value")],
+        "provider_options"
     )
     def update_sequencer_drop( url, window, sequencer, zip_f ):
-        new_sequences = get_sequences( sequences, url, window, None, sequencer, zip_f )
-        return format_data.get_provider_sequencer_values( new_sequences, "provider" )
+        dataset = store.current
+        return get_query( dataset, "provider_values",
+                          lambda: format_data.get_provider_sequencer_values( get_counts( dataset, ["provider"], url, window, None, sequencer, zip_f ), "provider" ),
+                          url, window, None, sequencer, zip_f )
 
-    @app.callback(
+    @filter_callback(
         Output( "lineage-drop", "options" ),
         [Input( "url", "pathname" ),
          Input( "recency-drop", "value" ),
          Input( "zip-drop", "value" ),
          Input( "provider-drop", "value"),
-         Input( 'sequencer-drop', "value")]
+         Input( 'sequencer-drop', "value")],
+        "lineage_options"
     )
     def update_lineage_drop( url, window, zip_f, provider, sequencer ):
-        new_sequences = get_sequences( sequences, url, window, provider, sequencer, zip_f )
-        return format_data.get_lineage_values( new_sequences )
+        dataset = store.current
+        return get_query( dataset, "lineage_values",
+                          lambda: format_data.get_lineage_values( get_counts( dataset, ["lineage"], url, window, provider, sequencer, zip_f ) ),
+                          url, window, provider, sequencer, zip_f )
 
     @app.callback(
         Output( "summary-table", "children"),
@@ -192,8 +292,11 @@ def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rat
          Input( "zip-drop", "value")]
     )
     def update_summary_table( url, provider, sequencer, zip_f ):
-        new_sequences = get_sequences( sequences, url, None, provider, sequencer, zip_f )
-        return format_data.get_summary_table( new_sequences )
+        dataset = store.current
+        return get_query( dataset, "summary_table",
+                          lambda: format_data.get_summary_table( get_counts( dataset, ["lineage"], url, None, provider, sequencer, zip_f ),
+                                                                 get_counts( dataset, ["lineage"], url, 29, provider, sequencer, zip_f ) ),
+                          url, None, provider, sequencer, zip_f )
 
     @app.callback(
         Output( "zip-graph", "figure" ),
@@ -203,9 +306,15 @@ def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rat
          Input( 'sequencer-drop', "value")]
     )
     def update_zip_graph( url, window, provider, sequencer ):
-        new_sequences = get_sequences( sequences, url, window, provider, sequencer )
-        new_cases = format_data.format_cases_total( get_cases( cases_whole, url, window ) )
-        return dashplot.plot_zips( format_data.format_zip_summary( new_cases, new_sequences ) )
+        dataset = store.current
+
+        def draw():
+            new_sequences = get_sequences( dataset, url, window, provider, sequencer )
+            new_cases = get_query( dataset, "cases_total", lambda: format_data.format_cases_total( get_cases( dataset, url, window ) ), url, window )
+            zip_summary = get_query( dataset, "zip_summary", lambda: format_data.format_zip_summary( new_cases, new_sequences ), url, window, provider, sequencer )
+            return dashplot.plot_zips( zip_summary )
+
+        return get_figure( "zips", dataset.version, draw, get_url_state( url ), window, provider, sequencer )
 
     @app.callback(
         [Output( "cum-graph", "figure" ),
@@ -218,48 +327,62 @@ def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rat
          Input( 'sequencer-drop', "value")]
     )
     def update_cummulative_graph( url, window, zip_f, provider, sequencer ):
-        new_sequences = get_sequences( sequences, url, window, provider, sequencer )
-        new_seqs_per_case = format_data.get_seqs_per_case( get_cases( cases_whole, url, window ), new_sequences, zip_f=zip_f )
+        dataset = store.current
 
-        return_plots = [dashplot.plot_cummulative_cases_seqs( new_seqs_per_case ),
-                        dashplot.plot_daily_cases_seqs( new_seqs_per_case ),
-                        dashplot.plot_cummulative_sampling_fraction( new_seqs_per_case )]
+        def draw():
+            new_seqs_per_case = get_query( dataset, "seqs_per_case",
+                                           lambda: format_data.get_seqs_per_case( get_cases( dataset, url, window ), get_sequences( dataset, url, window, provider, sequencer ), zip_f=zip_f ),
+                                           url, window, provider, sequencer, zip_f )
 
-        return return_plots
+            return [dashplot.plot_cummulative_cases_seqs( new_seqs_per_case ),
+                    dashplot.plot_daily_cases_seqs( new_seqs_per_case ),
+                    dashplot.plot_cummulative_sampling_fraction( new_seqs_per_case )]
 
-    @app.callback(
+        return get_figure( "cummulative", dataset.version, draw, get_url_state( url ), window, zip_f, provider, sequencer )
+
+    @filter_callback(
         Output( "lineage-graph", "figure" ),
         [Input( "url", "pathname" ),
          Input( "recency-drop", "value" ),
          Input( "zip-drop", "value" ),
          Input( "provider-drop", "value"),
-         Input( 'sequencer-drop', "value")]
+         Input( 'sequencer-drop', "value")],
+        "lineage_graph"
     )
     def update_lineages_graph( url, window, zip_f, provider, sequencer ):
-        new_sequences = get_sequences( sequences, url, window, provider, sequencer, zip_f )
-        return dashplot.plot_lineages( new_sequences )
+        dataset = store.current
+        return get_figure( "lineages", dataset.version,
+                           lambda: dashplot.plot_lineages( get_counts( dataset, ["lineage"], url, window, provider, sequencer, zip_f ) ),
+                           get_url_state( url ), window, zip_f, provider, sequencer )
 
-    @app.callback(
-        Output( "lineage-time-graph", "figure" ),
+    @filter_callback(
+        Output( "lineage-time-graph-variants", "data" ),
         [Input( "url", "pathname" ),
          Input( "recency-drop", "value" ),
          Input( "zip-drop", "value" ),
          Input( "lineage-drop", "value"),
          Input( "provider-drop", "value"),
-         Input( "lineage-type", "value"),
-         Input( 'sequencer-drop', "value")]
+         Input( 'sequencer-drop', "value")],
+        "lineage_time_variants"
     )
-    def update_lineage_time_graph( url, window, zip_f, lineage, provider, scaleby, sequencer ):
-        new_sequences = get_sequences( sequences, url, window, provider, sequencer, zip_f )
-
-        if lineage == "all-voc":
-            return dashplot.plot_voc( new_sequences, scaleby, focus="VOC" )
-        elif lineage == "all-delta":
-            return dashplot.plot_voc( new_sequences, scaleby, focus="Delta" )
-        elif lineage == "all-omicron":
-            return dashplot.plot_voc( new_sequences, scaleby, focus="Omicron" )
-        else:
-            return dashplot.plot_lineages_time( new_sequences, lineage, scaleby )
+    def update_lineage_time_graph( url, window, zip_f, lineage, provider, sequencer ):
+        dataset = store.current
+
+        def draw( scaleby ):
+            lineage_counts = get_counts( dataset, ["epiweek", "lineage"], url, window, provider, sequencer, zip_f )
+
+            if lineage == "all-voc":
+                return dashplot.plot_voc( lineage_counts, scaleby, focus="VOC" )
+            elif lineage == "all-delta":
+                return dashplot.plot_voc( lineage_counts, scaleby, focus="Delta" )
+            elif lineage == "all-omicron":
+                return dashplot.plot_voc( lineage_counts, scaleby, focus="Omicron" )
+            else:
+                return dashplot.plot_lineages_time( lineage_counts, lineage, scaleby )
+
+        return { "figure" : None,
+                 "variants" : { scaleby : get_figure( "lineage_time", dataset.version, lambda: draw( scaleby ), get_url_state( url ), window, zip_f, lineage, provider, scaleby, sequencer )
+                                for scaleby in LINEAGE_SCALES } }
 
     @app.callback(
         Output('zip-drop', 'value'),
@@ -288,46 +411,81 @@ def register_callbacks( app, sequences, cases_whole, growth_rates, ww_growth_rat
         return url=="/bajacalifornia"
 
     @app.callback(
-        Output( "wastewater-graph", "figure" ),
-        [Input( "yaxis-scale-radio", "value" ),
-         Input( "ww-source-radio", "value" )]
+        Output( "wastewater-graph-variants", "data" ),
+        [Input( "ww-source-radio", "value" ),
+         Input( "wastewater-graph", "relayoutData" )]
     )
-    def update_wastewater_graph( scale, source ):
-        return dashplot.plot_wastewater( *format_data.load_wastewater_data(), cases=get_cases( cases_whole, "/", source=source ), scale=scale, source=source )
+    def update_wastewater_graph( source, relayout ):
+        dataset = store.current
+        wastewater = wastewater_store.current
+        version = f"{dataset.version}-{wastewater.version}"
+        figures = { scale : get_figure( "wastewater", version,
+                                        lambda: dashplot.plot_wastewater( wastewater.qpcr, wastewater.seqs, cases=get_cases( dataset, "/", source=source ), scale=scale, source=source ),
+                                        scale, source )
+                    for scale in YAXIS_SCALES }
+        return { "figure" : decimate_view( figures["linear"], "wastewater-graph", relayout ),
+                 "variants" : { scale : axis_variant( figure ) for scale, figure in figures.items() } }
 
     @app.callback(
         Output( "indiv-wastewater-graph", "figure"),
-        Input( "url", "search" )
+        [Input( "url", "search" ),
+         Input( "indiv-wastewater-graph", "relayoutData" )]
     )
-    def update_indiv_wastewater_graph( search ):
+    def update_indiv_wastewater_graph( search, relayout ):
         source = "PointLoma"
         if search != "":
             search_dict = parse_qs( search.strip("?") )
             if "site" in search_dict:
                 source = search_dict["site"][0]
-        return dashplot.plot_wastewater(
-            *format_data.load_wastewater_data(),
-            cases=get_cases( cases_whole, "/", source=source ),
-            source=source, seq_indicator=False
-        )
+        dataset = store.current
+        wastewater = wastewater_store.current
+        figure = get_figure( "indiv_wastewater", f"{dataset.version}-{wastewater.version}",
+                             lambda: dashplot.plot_wastewater(
+                                 wastewater.qpcr, wastewater.seqs,
+                                 cases=get_cases( dataset, "/", source=source ),
+                                 source=source, seq_indicator=False
+                             ),
+                             source )
+        return decimate_view( figure, "indiv-wastewater-graph", relayout )
 
     @app.callback(
-        Output( "wastewater-seq-graph", "figure" ),
-        [Input( "scale-seqs-radios", "value" ),
-         Input( "ww-source-radio", "value" ),
-         Input( "smooth-radio", "value")]
+        Output( "wastewater-seq-graph-variants", "data" ),
+        [Input( "ww-source-radio", "value" ),
+         Input( "smooth-radio", "value"),
+         Input( "wastewater-seq-graph", "relayoutData" )]
     )
-    def update_wastewater_seq_graph( norm_type, source, smooth ):
-        return dashplot.plot_wastewater_seqs( *format_data.load_wastewater_data(), config=format_data.load_ww_plot_config(), cases=get_cases( cases_whole, "/", source=source), norm_type=norm_type, source=source, smooth=smooth )
+    def update_wastewater_seq_graph( source, smooth, relayout ):
+        dataset = store.current
+        wastewater = wastewater_store.current
+        version = f"{dataset.version}-{wastewater.version}"
+        figures = { norm_type : get_figure( "wastewater_seqs", version,
+                                            lambda: dashplot.plot_wastewater_seqs( wastewater.qpcr, wastewater.abundances[bool( smooth )], config=wastewater.config, cases=get_cases( dataset, "/", source=source), norm_type=norm_type, source=source ),
+                                            norm_type, source, smooth )
+                    for norm_type in WASTEWATER_NORMS }
+        return { "figure" : None,
+                 "variants" : { norm_type : decimate_view( figure, "wastewater-seq-graph", relayout ) for norm_type, figure in figures.items() } }
 
     @app.callback(
-        Output( "monkeypox-graph", "figure"),
-        [Input( "yaxis-scale-radio", "value" ),
-         Input( "ww-source-radio", "value" )]
+        Output( "monkeypox-graph-variants", "data"),
+        [Input( "ww-source-radio", "value" ),
+         Input( "monkeypox-graph", "relayoutData" )]
     )
-    def update_monkeypox_graph( scale, source ):
-        monkeypox_data = format_data.load_monkeypox_data()
-        return dashplot.plot_monkeypox_concentration( *monkeypox_data, scale=scale, source=source )
+    def update_monkeypox_graph( source, relayout ):
+        version = format_data.monkeypox_version()
+        figures = { scale : get_figure( "monkeypox", version,
+                                        lambda: dashplot.plot_monkeypox_concentration( *format_data.load_monkeypox_data(), scale=scale, source=source ),
+                                        scale, source )
+                    for scale in YAXIS_SCALES }
+        return { "figure" : decimate_view( figures["linear"], "monkeypox-graph", relayout ),
+                 "variants" : { scale : axis_variant( figure ) for scale, figure in figures.items() } }
+
+    for graph, toggle in FIGURE_VARIANT_TOGGLES.items():
+        app.clientside_callback(
+            SELECT_FIGURE_VARIANT,
+            Output( graph, "figure" ),
+            [Input( f"{graph}-variants", "data" ),
+             Input( toggle, "value" )]
+        )
 
     # This is I guess the way to change the title dynamically. Fingers crossed.
     app.clientside_callback(
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import savgol_filter
+
+def interpolate_weekly_cases( cases, start=None, window=7 ):
+    """ Spreads cases reported once per reporting period over the days of the period. Every ZIP code is reindexed to
+    daily dates, and the new cases of each day are the largest number reported in the following window days (including
+    the day itself) divided by window. Days without a report in that window get NaN.
+
+    Equivalent to applying set_index( "updatedate" ).reindex( date_range ) and
+    rolling( FixedForwardWindowIndexer( window_size=window ), min_periods=1 ).apply( lambda x: x.max() / window ) to each
+    ZIP code with groupby( "ziptext" ).apply(), but done in a single pass over a dense (date x ZIP code) matrix.
+
+    Parameters
+    ----------
+    cases : pandas.DataFrame
+        reported cases with "ziptext", "updatedate" and "new_cases" columns, and at most one row per ZIP code and date.
+    start : datetime-like or pandas.Series
+        first day of the output, or of each ZIP code when given as a Series indexed by ZIP code. Defaults to the first
+        report of each ZIP code, which is also used for ZIP codes missing from a Series.
+    window : int
+        number of days in a reporting period.
+
+    Returns
+    -------
+    pandas.DataFrame
+        one row per ZIP code and day, from its start to its last report, sorted by ZIP code and date.
+        Columns are "ziptext", "updatedate" and the remaining columns of cases, which are NaN on days without a report.
+    """
+    other_columns = [col for col in cases.columns if col not in ["ziptext", "updatedate"]]
+    if cases.empty:
+        return pd.DataFrame( columns=["ziptext", "updatedate"] + other_columns )
+
+    zips, zip_codes = np.unique( cases["ziptext"].to_numpy(), return_inverse=True )
+    first_report = cases.groupby( "ziptext" )["updatedate"].min().reindex( zips )
+    if start is None:
+        starts = first_report
+    elif isinstance( start, pd.Series ):
+        starts = start.reindex( zips ).fillna( first_report )
+    else:
+        starts = pd.Series( pd.Timestamp( start ), index=zips )
+    first_day = min( starts.min(), cases["updatedate"].min() )
+    dates = pd.date_range( first_day, cases["updatedate"].max() )
+    date_codes = ( ( cases["updatedate"] - first_day ).dt.days ).to_numpy()
+
+    dense = np.full( ( len( dates ), len( zips ) ), np.nan )
+    dense[date_codes, zip_codes] = cases["new_cases"].to_numpy( dtype=float )
+
+    # A forward looking window is a backward looking window over the reversed dates.
+    spread = pd.DataFrame( dense[::-1] ).rolling( window=window, min_periods=1 ).max().to_numpy()[::-1] / window
+
+    # Each ZIP code spans from its start, or its first report, to its last report.
+    first = ( starts - first_day ).dt.days.to_numpy()
+    last = np.full( len( zips ), -1 )
+    np.maximum.at( last, zip_codes, date_codes )
+    lengths = np.maximum( last - first + 1, 0 )
+
+    out_zips = np.repeat( np.arange( len( zips ) ), lengths )
+    out_dates = np.repeat( first - np.cumsum( lengths ) + lengths, lengths ) + np.arange( lengths.sum() )
+
+    return_df = pd.DataFrame( { "ziptext" : zips[out_zips], "updatedate" : dates[out_dates] } )
+    reported = pd.Series( np.arange( len( cases ) ), index=date_codes * len( zips ) + zip_codes )
+    rows = reported.reindex( out_dates * len( zips ) + out_zips ).to_numpy()
+    has_row = ~np.isnan( rows )
+    for col in other_columns:
+        values = cases[col].iloc[rows[has_row].astype( int )]
+        return_df[col] = pd.Series( values.to_numpy(), index=np.flatnonzero( has_row ) ).reindex( return_df.index )
+    return_df["new_cases"] = spread[out_dates, out_zips]
+
+    return return_df
+
+def interpolate_new_reports( cases, previous, window=7 ):
+    """ Extends a previous output of interpolate_weekly_cases() with the reports that followed it, giving the same daily
+    cases as interpolating every report again. Each ZIP code resumes after its own last day in previous, so a ZIP code
+    which fell behind the others isn't left with a gap. Assumes reports of a ZIP code are at least window days apart,
+    so days up to its last report already in previous aren't affected by later reports.
+
+    Parameters
+    ----------
+    cases : pandas.DataFrame
+        every report to interpolate, in the format interpolate_weekly_cases() expects.
+    previous : pandas.DataFrame
+        earlier daily cases with the same columns as cases.
+    window : int
+        number of days in a reporting period.
+
+    Returns
+    -------
+    pandas.DataFrame
+        previous followed by the newly interpolated days of each ZIP code.
+    """
+    last_day = previous.groupby( "ziptext" )["updatedate"].max()
+    first_report = cases.groupby( "ziptext" )["updatedate"].min()
+
+    # A ZIP code resumes the day after its last day in previous, but never before its first report, which is where
+    # interpolating every report would have started it. ZIP codes missing from previous start at their first report.
+    resume = ( last_day + pd.Timedelta( days=1 ) ).reindex( first_report.index )
+    resume = resume.where( resume > first_report, first_report )
+
+    new_reports = cases.loc[cases["updatedate"] >= cases["ziptext"].map( resume )]
+    return pd.concat( [previous, interpolate_weekly_cases( new_reports, start=resume, window=window )] )
+
+def catchment_case_series( cases, window_length=21 ):
+    """ Computes the daily cases of every wastewater catchment area, their Savitzky-Golay smoothed series, and the
+    smoothed cases per capita.
+
+    Equivalent to grouping the cases of each catchment by "updatedate", smoothing the sum of "new_cases" with
+    savgol_filter( window_length=window_length, polyorder=2 ), zeroing the rows where the smoothed value is negative and
+    dividing it by the population, but done once for all catchments.
+
+    Parameters
+    ----------
+    cases : pandas.DataFrame
+        output of load_cases(), with "updatedate", "catchment", "new_cases" and "population" columns.
+    window_length : int
+        length of the window of the Savitzky-Golay filter.
+
+    Returns
+    -------
+    pandas.DataFrame
+        indexed by date, with a column for each ("reported_cases", "population" or "reported_cases_rolling", catchment)
+        pair. Dates without reports for a catchment are NaN.
+    """
+    totals = cases.groupby( ["updatedate", "catchment"] ).agg( reported_cases=("new_cases", "sum"), population=("population", "sum") )
+    totals = totals.unstack( "catchment" ).astype( float )
+
+    reported = totals["reported_cases"]
+    rolling = pd.DataFrame( np.nan, index=reported.index, columns=reported.columns )
+    for catchment in reported.columns:
+        present = reported[catchment].notna()
+        rolling.loc[present, catchment] = savgol_filter( reported.loc[present, catchment], window_length=window_length, polyorder=2 )
+
+    # Days with a negative smoothed value are zeroed entirely, which leaves their per capita value undefined.
+    negative = rolling < 0
+    reported = reported.mask( negative, 0 )
+    population = totals["population"].mask( negative, 0 )
+    rolling = rolling.mask( negative, 0 ) / population
+
+    return pd.concat( { "reported_cases" : reported, "population" : population, "reported_cases_rolling" : rolling }, axis=1 )
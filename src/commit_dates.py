@@ -0,0 +1,91 @@
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+import requests
+
+from src.background import start_periodic
+
+POLL_INTERVAL = 10 * 60
+REQUEST_TIMEOUT = 5
+MAX_AGE = 6 * 60 * 60
+
+def format_commit_date( date ):
+    """ Formats the ISO 8601 date of a commit as shown below the page titles.
+    """
+    commit_date = datetime.strptime( date, "%Y-%m-%dT%H:%M:%SZ" ).replace( tzinfo=timezone.utc ).astimezone( timezone( timedelta( hours=-7 ) ) )
+    return commit_date.strftime( "%B %d @ %I:%M %p PDT" )
+
+class CommitDatePoller:
+    """ Keeps the date of the last commit of a set of GitHub branches up to date on a background thread, so that pages
+    can display it without waiting on the GitHub API.
+
+    Branch refs are requested with If-None-Match, and the commit behind a ref is only requested when the ref moves, so
+    an unchanged branch costs a single 304 response, which GitHub doesn't count against the rate limit.
+
+    Parameters
+    ----------
+    urls : iterable[str]
+        GitHub API urls of the branch refs, e.g. https://api.github.com/repos/<owner>/<repo>/git/refs/heads/<branch>.
+    timeout : float
+        Timeout in seconds of each request.
+    max_age : float
+        Seconds after the last successful check at which a date is considered stale.
+    """
+    def __init__( self, urls, timeout=REQUEST_TIMEOUT, max_age=MAX_AGE ):
+        self.urls = list( dict.fromkeys( urls ) )
+        self.timeout = timeout
+        self.max_age = max_age
+        self._etags = dict()
+        self._commits = dict()
+        self._dates = dict()
+        self._checked = dict()
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._session.headers["Accept"] = "application/vnd.github+json"
+
+    def _refresh_url( self, url ):
+        headers = dict()
+        if url in self._etags:
+            headers["If-None-Match"] = self._etags[url]
+        response = self._session.get( url, headers=headers, timeout=self.timeout )
+        if response.status_code != 304:
+            response.raise_for_status()
+            commit_url = response.json()["object"]["url"]
+            if commit_url != self._commits.get( url ):
+                commit = self._session.get( commit_url, timeout=self.timeout )
+                commit.raise_for_status()
+                date = format_commit_date( commit.json()["author"]["date"] )
+                with self._lock:
+                    self._dates[url] = date
+                self._commits[url] = commit_url
+            self._etags[url] = response.headers.get( "ETag" )
+        with self._lock:
+            self._checked[url] = time.time()
+
+    def refresh( self ):
+        """ Checks every branch for new commits. Failures are printed and leave the previous date in place.
+        """
+        for url in self.urls:
+            try:
+                self._refresh_url( url )
+            except ( requests.RequestException, KeyError, ValueError ) as error:
+                print( f"Unable to check last commit of {url} ({error!r})." )
+
+    def start( self, interval=POLL_INTERVAL ):
+        """ Checks the branches immediately and then every interval seconds on a background thread.
+        """
+        return start_periodic( "commit-date-poller", interval, self.refresh, immediate=True )
+
+    def get( self, url ):
+        """ Returns the text displayed for the branch at url. Empty until the first check succeeds. When the date is
+        stale, the last date seen is still shown as the time of the latest known update.
+        """
+        with self._lock:
+            date = self._dates.get( url )
+            checked = self._checked.get( url, 0.0 )
+        if date is None:
+            return ""
+        if time.time() - checked > self.max_age:
+            return f"Updated at {date} or later"
+        return f"Updated at {date}"
@@ -0,0 +1,145 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ["state", "epiweek", "days_bucket", "zipcode", "provider", "sequencer", "lineage"]
+
+# Upper bounds (inclusive) of the days_past buckets. These are the windows offered by the recency dropdown plus 29,
+# which the summary table uses for sequences from the last month.
+DAYS_BUCKET_EDGES = [7, 29, 30, 183, 365]
+
+class CountCube:
+    """ Sequence counts pre-aggregated over (state, epiweek, days_past bucket, zipcode, provider, sequencer, lineage).
+    Each dimension is stored as integer codes into a table of labels and only combinations that contain sequences are
+    kept, so queries scale with the number of distinct combinations rather than the number of sequences.
+
+    Parameters
+    ----------
+    seqs : pandas.DataFrame
+        output of load_sequences().
+    bucket_edges : list[int]
+        inclusive upper bounds of the days_past buckets. Only these values can be used as a window when querying.
+    """
+    def __init__( self, seqs: pd.DataFrame, bucket_edges=DAYS_BUCKET_EDGES ):
+        self.bucket_edges = list( bucket_edges )
+        self._labels = dict()
+        self._lookup = dict()
+
+        columns = dict()
+        for dim in CUBE_DIMENSIONS:
+            if dim == "days_bucket":
+                codes = np.searchsorted( self.bucket_edges, seqs["days_past"].to_numpy(), side="left" )
+                uniques = pd.Index( range( len( self.bucket_edges ) + 1 ) )
+            else:
+                codes, uniques = pd.factorize( seqs[dim], sort=True )
+                uniques = pd.Index( np.asarray( uniques ) )
+                # Missing values get their own code, one past the last label.
+                codes = np.where( codes < 0, len( uniques ), codes )
+                uniques = uniques.insert( len( uniques ), np.nan )
+            columns[dim] = codes
+            self._labels[dim] = uniques
+            self._lookup[dim] = { value : code for code, value in enumerate( uniques ) if not pd.isna( value ) }
+
+        cells = pd.DataFrame( columns ).groupby( CUBE_DIMENSIONS ).size()
+        self.counts = cells.to_numpy()
+        self.codes = { dim : cells.index.get_level_values( dim ).to_numpy() for dim in CUBE_DIMENSIONS }
+
+    def __len__( self ):
+        return len( self.counts )
+
+    def _mask( self, window=None, **filters ):
+        mask = np.ones( len( self.counts ), dtype=bool )
+        for dim, value in filters.items():
+            if not value:
+                continue
+            code = self._lookup[dim].get( value )
+            if code is None:
+                return np.zeros( len( self.counts ), dtype=bool )
+            mask &= self.codes[dim] == code
+        if window:
+            if window not in self.bucket_edges:
+                raise ValueError( f"window must be one of {self.bucket_edges}, not {window}." )
+            mask &= self.codes["days_bucket"] <= self.bucket_edges.index( window )
+        return mask
+
+    def total( self, window=None, **filters ) -> int:
+        """ Returns the number of sequences matching the filters. See counts_by() for the parameters.
+        """
+        return int( self.counts[self._mask( window=window, **filters )].sum() )
+
+    def counts_by( self, dims, window=None, **filters ) -> pd.DataFrame:
+        """ Counts sequences matching the filters for each combination of dims.
+        Parameters
+        ----------
+        dims : list[str]
+            dimensions to group by.
+        window : int
+            only count sequences with days_past <= window. Must be one of the bucket edges. Ignored if falsy.
+        **filters :
+            dimension=value pairs to filter on by equality. Falsy values are ignored.
+
+        Returns
+        -------
+        pandas.DataFrame
+            one row per combination of dims with a nonzero count, with a column for each dimension and a "count" column.
+            Missing values of a dimension are kept as NaN.
+        """
+        mask = self._mask( window=window, **filters )
+        shape = tuple( len( self._labels[dim] ) for dim in dims )
+        flat = np.ravel_multi_index( tuple( self.codes[dim][mask] for dim in dims ), shape )
+        present, inverse = np.unique( flat, return_inverse=True )
+        counts = np.bincount( inverse, weights=self.counts[mask], minlength=len( present ) ).astype( np.int64 )
+
+        codes = np.unravel_index( present, shape )
+        return_df = pd.DataFrame( { dim : self._labels[dim].take( code ) for dim, code in zip( dims, codes ) } )
+        return_df["count"] = counts
+        return return_df
+
+    def export( self, dims, **filters ) -> dict:
+        """ Exports the cells matching the filters as packed columns, so they can be filtered and aggregated again in
+        the browser.
+        Parameters
+        ----------
+        dims : list[str]
+            dimensions to export. Cells are not aggregated over the dimensions left out, so these should only be
+            dimensions that are filtered on.
+        **filters :
+            dimension=value pairs to filter on by equality. Falsy values are ignored.
+
+        Returns
+        -------
+        dict
+            "labels" maps each dimension to the list of its values, with dates as ISO strings and missing values as None.
+            "codes" maps each dimension to the indices of the cell values into its labels, and "counts" holds the number
+            of sequences in each cell. Both are packed by _pack_array().
+        """
+        mask = self._mask( **filters )
+        labels, codes = dict(), dict()
+        for dim in dims:
+            present, inverse = np.unique( self.codes[dim][mask], return_inverse=True )
+            labels[dim] = [_label_to_json( value ) for value in self._labels[dim].take( present )]
+            codes[dim] = _pack_array( inverse )
+        return { "labels" : labels, "codes" : codes, "counts" : _pack_array( self.counts[mask] ) }
+
+def _label_to_json( value ):
+    if pd.isna( value ):
+        return None
+    if isinstance( value, pd.Timestamp ):
+        return value.strftime( "%Y-%m-%d" )
+    if isinstance( value, np.generic ):
+        return value.item()
+    return value
+
+def _pack_array( values ):
+    """ Packs non-negative integers into the smallest unsigned type holding them, as base64 encoded little-endian bytes.
+    Returns
+    -------
+    dict
+        "dtype", one of "uint8", "uint16" or "uint32", and "data".
+    """
+    values = np.asarray( values )
+    maximum = int( values.max() ) if len( values ) > 0 else 0
+    dtype = next( dtype for dtype in ["uint8", "uint16", "uint32"] if maximum <= np.iinfo( dtype ).max )
+    data = values.astype( np.dtype( dtype ).newbyteorder( "<" ) ).tobytes()
+    return { "dtype" : dtype, "data" : base64.b64encode( data ).decode( "ascii" ) }
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import threading
+import time
+
+import src.format_resources as format_data
+from src.background import start_periodic
+from src.cases import catchment_case_series
+from src.count_cube import CountCube
+from src.lineage_groups import LineageGroups
+from src.query_cache import QueryCache
+from src.sequence_index import SequenceIndex
+
+DATASET_FILES = [format_data.SEQUENCES_SNAPSHOT, format_data.SEQUENCES_CSV, format_data.CASES_CSV, format_data.GROWTH_RATES_CSV]
+REFRESH_INTERVAL = 5 * 60
+QUERY_CACHE_SIZE = 32
+
+def files_signature( paths ):
+    """ Returns a hash of the modification time and size of each path, which changes whenever one of the files is
+    rewritten.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat( path )
+            digest.update( f"{path}:{stat.st_mtime_ns}:{stat.st_size};".encode() )
+        except FileNotFoundError:
+            digest.update( f"{path}:missing;".encode() )
+    return digest.hexdigest()[:12]
+
+class Dataset:
+    """ Everything the callbacks read for a single version of the resource files: the raw frames, the indexes derived
+    from them, and the query cache holding results computed from them. A Dataset is never modified after it is built;
+    new data produces a new Dataset.
+
+    Parameters
+    ----------
+    version : str
+        Identifier of the resource files the dataset was built from.
+    sequences : pandas.DataFrame
+        output of load_sequences().
+    cases : pandas.DataFrame
+        output of load_cases().
+    growth_rates : pandas.DataFrame
+        output of load_growth_rates().
+    """
+    def __init__( self, version, sequences, cases, growth_rates ):
+        self.version = version
+        self.sequences = sequences
+        self.cases = cases
+        self.growth_rates = growth_rates
+        self.sequence_index = SequenceIndex( sequences )
+        self.count_cube = CountCube( sequences )
+        self.catchment_cases = catchment_case_series( cases )
+        self.query_cache = QueryCache( maxsize=QUERY_CACHE_SIZE )
+
+    @classmethod
+    def load( cls, paths=DATASET_FILES ):
+        version = files_signature( paths )
+        return cls( version=version,
+                    sequences=format_data.load_sequences(),
+                    cases=format_data.load_cases(),
+                    growth_rates=format_data.load_growth_rates() )
+
+class DatasetStore:
+    """ Holds the current Dataset and replaces it when the resource files change. The new Dataset is built entirely
+    before it is swapped in, so callbacks that read store.current once per request never see a partially updated
+    dataset.
+
+    Parameters
+    ----------
+    loader : callable
+        Function without arguments returning a new Dataset.
+    paths : list[str]
+        Files to watch for changes.
+    """
+    def __init__( self, loader=Dataset.load, paths=DATASET_FILES ):
+        self.loader = loader
+        self.paths = paths
+        self._pending = None
+        self._lock = threading.Lock()
+        self._current = loader()
+        self._signature = self._current.version
+
+    @property
+    def current( self ) -> Dataset:
+        return self._current
+
+    def refresh( self ):
+        """ Rebuilds the dataset if the watched files changed and haven't changed since the previous check, so files
+        that are still being written aren't loaded.
+
+        Returns
+        -------
+        bool
+            True if a new dataset was swapped in.
+        """
+        with self._lock:
+            signature = files_signature( self.paths )
+            if signature == self._signature:
+                self._pending = None
+                return False
+            if signature != self._pending:
+                self._pending = signature
+                return False
+
+            start = time.time()
+            dataset = self.loader()
+            self._current = dataset
+            self._signature = dataset.version
+            self._pending = None
+            print( f"Loaded dataset {dataset.version} in {time.time() - start:.1f}s" )
+            return True
+
+    def start( self, interval=REFRESH_INTERVAL ):
+        """ Checks for new resource files every interval seconds on a background thread.
+        """
+        return start_periodic( "dataset-refresher", interval, self.refresh )
+
+class WastewaterDataset:
+    """ Everything the wastewater callbacks read for a single version of the remote wastewater files: the qPCR
+    measurements and their smoothed series for every site, the lineage abundances measured at every site, the
+    resolved plot config, and the abundance of each group of the config at every site, raw and smoothed. Like Dataset,
+    it is never modified after it is built.
+
+    Parameters
+    ----------
+    version : str
+        Identifier of the remote files the dataset was built from; output of format_data.wastewater_version().
+    qpcr : pandas.DataFrame
+        qPCR measurements of all sites; first output of load_wastewater_data().
+    seqs : pandas.DataFrame
+        abundances of the lineages in config at all sites; second output of load_wastewater_data().
+    config : dict
+        output of load_ww_plot_config().
+    lineage_groups : src.lineage_groups.LineageGroups
+        groups compiled from config. Compiled here if not given.
+    """
+    def __init__( self, version, qpcr, seqs, config, lineage_groups=None ):
+        self.version = version
+        self.qpcr = qpcr
+        self.seqs = seqs
+        self.config = config
+        self.lineage_groups = LineageGroups( config ) if lineage_groups is None else lineage_groups
+        self.abundances = { smooth : self.lineage_groups.abundances( seqs, smooth=smooth ) for smooth in [True, False] }
+
+    @classmethod
+    def load( cls ):
+        version = format_data.wastewater_version()
+        config = format_data.load_ww_plot_config()
+        lineage_groups = LineageGroups( config )
+        qpcr, seqs = format_data.load_wastewater_data( lineages=lineage_groups.members )
+        return cls( version=version, qpcr=qpcr, seqs=seqs, config=config, lineage_groups=lineage_groups )
+
+class WastewaterStore:
+    """ Holds the current WastewaterDataset. The remote files are revalidated whenever their TTL expires and the
+    dataset is only rebuilt when their content changed, so the wastewater callbacks share a single parsed copy of the
+    data. The first dataset is built on first use, so the dashboard starts even when the remote files can't be reached.
+
+    Parameters
+    ----------
+    loader : callable
+        Function without arguments returning a new WastewaterDataset.
+    version : callable
+        Function without arguments returning the version of the remote files. Defaults to format_data.wastewater_version.
+    """
+    def __init__( self, loader=WastewaterDataset.load, version=None ):
+        self.loader = loader
+        self.version = version
+        self._current = None
+        self._lock = threading.Lock()
+
+    @property
+    def current( self ) -> WastewaterDataset:
+        version = self.version() if self.version is not None else format_data.wastewater_version()
+        dataset = self._current
+        if dataset is not None and dataset.version == version:
+            return dataset
+
+        # Callbacks arriving while the dataset is rebuilt wait for it rather than building their own.
+        with self._lock:
+            if self._current is None or self._current.version != version:
+                start = time.time()
+                self._current = self.loader()
+                print( f"Loaded wastewater dataset {self._current.version[:12]} in {time.time() - start:.1f}s" )
+            return self._current
@@ -0,0 +1,201 @@
+## decimate.py downsamples the traces of a serialized figure to roughly the number of points the graph can display, so
+## long daily time series aren't sent to the browser in full. Lines are decimated with Largest-Triangle-Three-Buckets,
+## markers keep the minimum and maximum of each bucket, and traces stacked into an area keep the mean of buckets shared by
+## the whole stack so the areas still line up. Only the visible x range is kept, so zooming in restores full resolution.
+## Bars and other trace types are left as is.
+import numpy as np
+
+# Width in pixels of the graphs on the dashboard pages, whose maxWidth is 77em.
+DEFAULT_WIDTH = 1200
+POINTS_PER_PIXEL = 0.5
+
+# Per-point arrays of a trace that have to be subset along with x and y.
+_POINT_ARRAYS = ["text", "hovertext", "customdata"]
+
+# Trace types drawn as lines or markers, the only ones decimated.
+_SCATTER_TYPES = ["scatter", "scattergl"]
+
+def _to_numbers( x ):
+    """ Returns x as float64, converting dates to nanoseconds.
+    """
+    values = np.asarray( x )
+    if values.dtype.kind in "USO":
+        return np.asarray( values, dtype="datetime64[ns]" ).astype( np.int64 ).astype( float )
+    return values.astype( float )
+
+def _to_floats( y ):
+    return np.array( [np.nan if value is None else value for value in y], dtype=float )
+
+def lttb_indices( x, y, threshold ):
+    """ Selects threshold points of a line with the Largest-Triangle-Three-Buckets algorithm, which keeps the first and
+    last point and, from each bucket in between, the point forming the largest triangle with the point kept from the
+    previous bucket and the mean of the next bucket.
+    Parameters
+    ----------
+    x : numpy.ndarray
+        increasing x values.
+    y : numpy.ndarray
+        y values. Points with missing y are only kept if a whole bucket is missing.
+    threshold : int
+        number of points to keep.
+
+    Returns
+    -------
+    numpy.ndarray
+        sorted indices of the selected points.
+    """
+    n = len( x )
+    if threshold >= n or threshold < 3:
+        return np.arange( n )
+
+    edges = np.linspace( 1, n - 1, threshold - 1 ).astype( int )
+    selected = np.zeros( threshold, dtype=int )
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range( threshold - 2 ):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len( edges ):
+            next_x = x[end:edges[bucket + 2]].mean()
+            next_ys = y[end:edges[bucket + 2]]
+            next_y = np.nanmean( next_ys ) if ( ~np.isnan( next_ys ) ).any() else y[previous]
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        area = np.abs( ( x[previous] - next_x ) * ( y[start:end] - y[previous] ) - ( x[previous] - x[start:end] ) * ( next_y - y[previous] ) )
+        area = np.where( np.isnan( area ), -1, area )
+        previous = start + int( np.argmax( area ) )
+        selected[bucket + 1] = previous
+    return selected
+
+def minmax_indices( y, buckets ):
+    """ Selects the first and last point and the minimum and maximum of each of buckets equally sized buckets.
+    Returns
+    -------
+    numpy.ndarray
+        sorted indices of the selected points.
+    """
+    n = len( y )
+    if 2 * buckets + 2 >= n:
+        return np.arange( n )
+    edges = np.linspace( 0, n, buckets + 1 ).astype( int )
+    selected = [0, n - 1]
+    filled = np.where( np.isnan( y ), np.inf, y )
+    for start, end in zip( edges[:-1], edges[1:] ):
+        selected.append( start + int( np.argmin( filled[start:end] ) ) )
+        selected.append( start + int( np.argmax( np.where( np.isinf( filled[start:end] ), -np.inf, filled[start:end] ) ) ) )
+    return np.unique( selected )
+
+def _visible( x, x_range ):
+    """ Indices of the points within x_range, plus one point on each side so lines continue to the edge of the graph.
+    """
+    if x_range is None:
+        return np.arange( len( x ) )
+    lo, hi = _to_numbers( list( x_range ) )
+    start = max( np.searchsorted( x, lo, side="left" ) - 1, 0 )
+    end = min( np.searchsorted( x, hi, side="right" ) + 1, len( x ) )
+    return np.arange( start, end )
+
+def _subset( trace, indices ):
+    n = len( trace["x"] )
+    for key in ["x", "y"] + _POINT_ARRAYS:
+        if isinstance( trace.get( key ), list ) and len( trace[key] ) == n:
+            trace[key] = [trace[key][i] for i in indices]
+
+def _is_sorted( x ):
+    return bool( np.all( x[1:] >= x[:-1] ) )
+
+def _decimate_trace( trace, x_range, points ):
+    x = _to_numbers( trace["x"] )
+    if not _is_sorted( x ):
+        return
+    visible = _visible( x, x_range )
+    y = _to_floats( trace["y"] )[visible]
+    if "markers" in trace.get( "mode", "lines" ) and "lines" not in trace.get( "mode", "lines" ):
+        keep = minmax_indices( y, points // 2 )
+    else:
+        keep = lttb_indices( x[visible], y, points )
+    _subset( trace, visible[keep] )
+
+def _decimate_stack( traces, x_range, points ):
+    # Every trace of a stack shares x. Each is replaced by the mean of the same buckets, so the stacked areas still add
+    # up and stay aligned.
+    x = _to_numbers( traces[0]["x"] )
+    if not _is_sorted( x ):
+        return
+    visible = _visible( x, x_range )
+    if len( visible ) <= points:
+        for trace in traces:
+            _subset( trace, visible )
+        return
+    starts = visible[np.linspace( 0, len( visible ), points + 1 ).astype( int )[:-1]]
+    for trace in traces:
+        y = _to_floats( trace["y"] )[visible]
+        missing = np.isnan( y )
+        totals = np.add.reduceat( np.where( missing, 0, y ), starts - visible[0] )
+        counts = np.add.reduceat( ~missing, starts - visible[0] )
+        means = np.divide( totals, counts, out=np.full( len( totals ), np.nan ), where=counts > 0 )
+        trace["x"] = [trace["x"][i] for i in starts]
+        trace["y"] = [None if np.isnan( value ) else float( value ) for value in means]
+        for key in _POINT_ARRAYS:
+            trace.pop( key, None )
+
+def decimate_figure( figure, x_range=None, width=DEFAULT_WIDTH ):
+    """ Downsamples the traces of a serialized figure in place.
+    Parameters
+    ----------
+    figure : dict
+        figure as parsed JSON, e.g. returned by FigureCache.get(). Traces whose x values aren't sorted are left as is.
+    x_range : tuple
+        first and last x value visible in the graph. Points outside of it are dropped, and the x axis is set to it.
+        Defaults to the initial range of the x axis of the figure, or the whole figure when it has none.
+    width : int
+        width of the graph in pixels.
+
+    Returns
+    -------
+    dict
+        figure
+    """
+    points = max( int( width * POINTS_PER_PIXEL ), 3 )
+    visible_range = x_range
+    if visible_range is None:
+        visible_range = figure.get( "layout", dict() ).get( "xaxis", dict() ).get( "range" )
+        if not isinstance( visible_range, list ) or len( visible_range ) != 2 or None in visible_range:
+            visible_range = None
+
+    stacks = dict()
+    for trace in figure.get( "data", [] ):
+        if trace.get( "type", "scatter" ) not in _SCATTER_TYPES:
+            continue
+        if not isinstance( trace.get( "x" ), list ) or not isinstance( trace.get( "y" ), list ) or len( trace["x"] ) == 0:
+            continue
+        if trace.get( "stackgroup" ):
+            stacks.setdefault( trace["stackgroup"], list() ).append( trace )
+        elif len( trace["x"] ) > points or visible_range is not None:
+            _decimate_trace( trace, visible_range, points )
+    for traces in stacks.values():
+        if len( set( len( trace["x"] ) for trace in traces ) ) == 1:
+            _decimate_stack( traces, visible_range, points )
+
+    if x_range is not None:
+        xaxis = figure.setdefault( "layout", dict() ).setdefault( "xaxis", dict() )
+        xaxis["range"] = list( x_range )
+        xaxis["autorange"] = False
+    return figure
+
+def relayout_range( relayout ):
+    """ Reads the x range from the relayoutData of a graph.
+    Returns
+    -------
+    tuple or str or None
+        (first, last) visible x value when the x axis was zoomed or panned, "auto" when it was reset to autorange, and
+        None when the event didn't change the x axis.
+    """
+    if not relayout:
+        return None
+    if relayout.get( "xaxis.autorange" ):
+        return "auto"
+    if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        return relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    if "xaxis.range" in relayout:
+        return tuple( relayout["xaxis.range"] )
+    return None
@@ -1,7 +1,13 @@
 import datetime
+import os
+import sys
 from urllib.error import HTTPError
 import pandas as pd
-from epiweeks import Week
+
+# Run as a script, so the repository root has to be on the path to import from src.
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), ".." ) )
+from src.cases import interpolate_new_reports, interpolate_weekly_cases
+from src.epiweek import epiweek_start
 from arcgis.gis import GIS
 
 # Download metadata from SEARCH repository
@@ -48,8 +54,8 @@ def download_search():
     md["zipcode"] = md["zipcode"].astype( "str" )
     md["zipcode"] = md["zipcode"].apply( lambda x: x.split( "-" )[0] )
 
-    md["epiweek"] = md["collection_date"].apply( lambda x: Week.fromdate( datetime.datetime.strptime( x, "%Y-%m-%d" ).date() ).startdate() )
     md["collection_date"] = pd.to_datetime( md["collection_date"], format="%Y-%m-%d" ).dt.normalize()
+    md["epiweek"] = epiweek_start( md["collection_date"] )
     md["days_past"] = ( md["collection_date"].max() - md["collection_date"] ).dt.days
 
     md["originating_lab"] = md["originating_lab"].replace( { 'UC San Diego Center for Advanced Laboratory Medicine' :  "UCSD CALM Lab",
@@ -106,14 +112,21 @@ def download_search():
 
     return md
 
-def download_cases():
+def download_cases( previous=None ):
     """ Downloads the cases per San Diego ZIP code. Appends population.
+    Parameters
+    ----------
+    previous : pandas.DataFrame
+        Previous output. If provided, San Diego cases are only processed for the newest reporting periods.
+
     Returns
     -------
     pandas.DataFrame
         DataFrame detailing the cummulative cases in each ZIP code.
     """
-    sd = download_sd_cases()
+    if previous is not None:
+        previous = previous.loc[previous["ziptext"]!="None"]
+    sd = download_sd_cases( previous )
     bc = download_bc_cases()
     c = pd.concat( [sd,bc] )
 
@@ -132,8 +145,15 @@ def append_wastewater( sd ):
     assert return_df.shape[0] == sd.shape[0], f"Merge was unsuccessful. {sd.shape[0]} rows in original vs. {return_df.shape[0]} rows in merge output."
     return return_df
 
-def download_sd_cases():
+def download_sd_cases( previous=None ):
     """
+    Parameters
+    ----------
+    previous : pandas.DataFrame
+        San Diego rows of a previous output. If provided, only the reporting periods after the last date of its ZIP
+        code furthest behind are interpolated and appended to it, instead of interpolating every period since
+        2021-06-28.
+
     Returns
     -------
     pandas.DataFrame
@@ -146,12 +166,6 @@ def download_sd_cases():
         dataframe = dataframe.drop( columns=["Zip"] ).rename( columns={"Total Population" : "population"} )
         return dataframe
 
-    def _add_missing_cases( entry ):
-        entry = entry.set_index( "updatedate" ).reindex( pd.date_range( entry["updatedate"].min(), entry["updatedate"].max() ) ).rename_axis( "updatedate" ).reset_index()
-        indexer = pd.api.indexers.FixedForwardWindowIndexer(window_size=7)
-        entry["new_cases"] = entry.rolling( window=indexer, min_periods=1 )["new_cases"].apply( lambda x: x.max() / 7 )
-        return entry
-
     gis = GIS()
     cases_loc = "34b6df47e084441790813348c69d49ee"
     gis_layer = gis.content.get( cases_loc )
@@ -172,12 +186,11 @@ def download_sd_cases():
 
     # Brief hack because SD stopped reporting daily cases and instead reports weekly cases after 2021-06-29.
     sdprob = sd.loc[sd["updatedate"]>"2021-06-28"]
-    sdprob = sdprob.groupby( "ziptext" ).apply( _add_missing_cases )
-    sdprob = sdprob.drop( columns="ziptext" ).reset_index()
-    sdprob = sdprob.drop( columns="level_1" )
-
-    sd = sd.loc[sd["updatedate"]<="2021-06-28"]
-    sd = pd.concat( [sd,sdprob] )
+    if previous is None:
+        sdprob = interpolate_weekly_cases( sdprob )
+        sd = pd.concat( [sd.loc[sd["updatedate"]<="2021-06-28"], sdprob] )
+    else:
+        sd = interpolate_new_reports( sdprob, previous[sd.columns] )
 
     sd = _append_population( sd )
 
@@ -234,5 +247,9 @@ if __name__ == "__main__":
     seqs_md = download_search()
     seqs_md.to_csv( "resources/sequences.csv", index=False )
 
-    cases = download_cases()
+    previous_cases = None
+    if "--full" not in sys.argv and os.path.exists( "resources/cases.csv" ):
+        previous_cases = pd.read_csv( "resources/cases.csv", parse_dates=["updatedate"], dtype={"ziptext" : str} )
+
+    cases = download_cases( previous_cases )
     cases.to_csv( "resources/cases.csv", index=False )
@@ -0,0 +1,91 @@
+## epiweek.py maps arrays of dates to CDC epidemiological weeks (MMWR weeks) with integer arithmetic on day numbers, as
+## a vectorized replacement for calling epiweeks.Week.fromdate() on every row. Epiweeks start on Sunday and week 1 of a
+## year is the first week with at least four days in that year, i.e. the week containing January 4th.
+import numpy as np
+import pandas as pd
+
+# 1970-01-01, day 0 of datetime64[D], was a Thursday, so (day + 4) % 7 is the number of days since the last Sunday.
+_DAYS_SINCE_SUNDAY_OFFSET = 4
+
+# The first Sunday of datetime64[D], 1970-01-04. epiweek_ordinal() counts weeks from the week starting on this day.
+_ORDINAL_ORIGIN = 3
+
+def _to_days( dates ):
+    """ Returns the day numbers of dates as int64 and a mask of missing dates.
+    """
+    values = pd.to_datetime( dates )
+    if isinstance( values, pd.Timestamp ):
+        values = pd.DatetimeIndex( [values] )
+    values = np.asarray( values, dtype="datetime64[ns]" )
+    missing = np.isnat( values )
+    return values.astype( "datetime64[D]" ).astype( np.int64 ), missing
+
+def _wrap( dates, values, name=None ):
+    if isinstance( dates, pd.Series ):
+        return pd.Series( values, index=dates.index, name=name or dates.name )
+    if isinstance( dates, pd.Index ):
+        return pd.Index( values, name=name or dates.name )
+    return values
+
+def _week_start_days( days ):
+    return days - ( days + _DAYS_SINCE_SUNDAY_OFFSET ) % 7
+
+def epiweek_start( dates ):
+    """ Returns the first day (Sunday) of the epiweek of each date.
+    Parameters
+    ----------
+    dates : array-like
+        dates, as datetimes or strings pandas.to_datetime() can parse. Missing values are allowed.
+
+    Returns
+    -------
+    pandas.Series, pandas.DatetimeIndex or numpy.ndarray
+        datetime64[ns] at midnight, of the same type and index as dates. Missing dates map to NaT.
+    """
+    days, missing = _to_days( dates )
+    start = _week_start_days( days ).astype( "datetime64[D]" ).astype( "datetime64[ns]" )
+    start[missing] = np.datetime64( "NaT" )
+    return _wrap( dates, start )
+
+def epiweek_ordinal( dates ):
+    """ Returns the number of epiweeks between 1970-01-04 and the epiweek of each date, so consecutive epiweeks get
+    consecutive integers, also across years with 53 epiweeks.
+    Parameters
+    ----------
+    dates : array-like
+        dates, as datetimes or strings pandas.to_datetime() can parse. Must not contain missing values.
+
+    Returns
+    -------
+    pandas.Series, pandas.Index or numpy.ndarray
+        int64, of the same type and index as dates.
+    """
+    days, missing = _to_days( dates )
+    if missing.any():
+        raise ValueError( "dates must not contain missing values." )
+    return _wrap( dates, ( _week_start_days( days ) - _ORDINAL_ORIGIN ) // 7 )
+
+def epiweek_year_week( dates ):
+    """ Returns the epiweek year and week number of each date, as reported by epiweeks.Week.
+    Parameters
+    ----------
+    dates : array-like
+        dates, as datetimes or strings pandas.to_datetime() can parse. Must not contain missing values.
+
+    Returns
+    -------
+    year : numpy.ndarray
+        int64 epiweek year, which differs from the calendar year for some days around January 1st.
+    week : numpy.ndarray
+        int64 week number, from 1 to 53.
+    """
+    days, missing = _to_days( dates )
+    if missing.any():
+        raise ValueError( "dates must not contain missing values." )
+    start = _week_start_days( days )
+
+    # An epiweek belongs to the year its Wednesday falls in.
+    year = ( start + 3 ).astype( "datetime64[D]" ).astype( "datetime64[Y]" )
+    jan_4 = ( year.astype( "datetime64[D]" ) + 3 ).astype( np.int64 )
+    week = ( start - _week_start_days( jan_4 ) ) // 7 + 1
+    return year.astype( np.int64 ) + 1970, week
@@ -0,0 +1,217 @@
+## fetch.py holds the single layer through which the dashboard reads remote CSV and YAML files. Responses are kept in
+## memory and on disk, revalidated with ETag/If-Modified-Since once their TTL expires, and parsed DataFrames are
+## memoized by the hash of the content they were parsed from.
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import requests
+import yaml
+
+DEFAULT_TTL = 15 * 60
+DEFAULT_TIMEOUT = 10
+CACHE_DIR = os.path.join( tempfile.gettempdir(), "lone_pine_cache" )
+
+class _Slot:
+    def __init__( self ):
+        self.ready = threading.Event()
+        self.value = None
+        self.error = None
+
+class RemoteEntry:
+    """ A cached response. digest is the sha256 of content and identifies the version of the remote file.
+    """
+    def __init__( self, url, content, etag=None, last_modified=None, fetched_at=0.0 ):
+        self.url = url
+        self.content = content
+        self.digest = hashlib.sha256( content ).hexdigest()
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+class RemoteCache:
+    """ In-process and on-disk cache of remote files. Callbacks running concurrently and asking for the same url, or the
+    same parsed frame, wait for the first one to download or parse it instead of doing it again.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory used to persist responses between processes and restarts, created when the first response is saved.
+        None disables the on-disk cache.
+    default_ttl : float
+        Seconds a response is used without contacting the server, unless a ttl is given for the url.
+    timeout : float
+        Timeout in seconds of each request.
+    max_frames : int
+        Number of parsed DataFrames to memoize.
+    """
+    def __init__( self, cache_dir=CACHE_DIR, default_ttl=DEFAULT_TTL, timeout=DEFAULT_TIMEOUT, max_frames=64 ):
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self.max_frames = max_frames
+        self._entries = dict()
+        self._frames = OrderedDict()
+        self._url_locks = dict()
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    def _cache_path( self, url ):
+        return os.path.join( self.cache_dir, hashlib.sha256( url.encode() ).hexdigest() )
+
+    def _load_from_disk( self, url ):
+        if self.cache_dir is None:
+            return None
+        path = self._cache_path( url )
+        try:
+            with open( f"{path}.json", "r" ) as meta_file:
+                meta = json.load( meta_file )
+            with open( path, "rb" ) as content_file:
+                content = content_file.read()
+        except ( OSError, ValueError ):
+            return None
+        return RemoteEntry( url, content, etag=meta.get( "etag" ), last_modified=meta.get( "last_modified" ), fetched_at=meta.get( "fetched_at", 0.0 ) )
+
+    def _save_to_disk( self, entry ):
+        if self.cache_dir is None:
+            return
+        os.makedirs( self.cache_dir, exist_ok=True )
+        path = self._cache_path( entry.url )
+        # Write to temporary files first so other workers never see a partially written response.
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open( path + tmp_suffix, "wb" ) as content_file:
+            content_file.write( entry.content )
+        with open( f"{path}.json{tmp_suffix}", "w" ) as meta_file:
+            json.dump( { "url" : entry.url, "etag" : entry.etag, "last_modified" : entry.last_modified, "fetched_at" : entry.fetched_at }, meta_file )
+        os.replace( path + tmp_suffix, path )
+        os.replace( f"{path}.json{tmp_suffix}", f"{path}.json" )
+
+    def fetch( self, url, ttl=None ) -> RemoteEntry:
+        """ Returns the content of url, downloading it only if the cached copy is older than ttl and has changed on the
+        server. If the server can't be reached, a stale copy is returned when available.
+        Parameters
+        ----------
+        url : str
+            Location of the remote file.
+        ttl : float
+            Seconds the cached copy can be used without revalidating it. Defaults to default_ttl.
+
+        Returns
+        -------
+        RemoteEntry
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = self._cached( url )
+        if entry is not None and time.time() - entry.fetched_at < ttl:
+            return entry
+
+        with self._lock:
+            url_lock = self._url_locks.setdefault( url, threading.Lock() )
+        with url_lock:
+            # Another callback may have revalidated url while this one was waiting.
+            entry = self._cached( url )
+            if entry is not None and time.time() - entry.fetched_at < ttl:
+                return entry
+            return self._revalidate( url, entry )
+
+    def _cached( self, url ):
+        with self._lock:
+            entry = self._entries.get( url )
+        if entry is None:
+            entry = self._load_from_disk( url )
+            if entry is not None:
+                with self._lock:
+                    self._entries.setdefault( url, entry )
+        return entry
+
+    def _revalidate( self, url, entry ):
+        now = time.time()
+        headers = dict()
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            response = self._session.get( url, headers=headers, timeout=self.timeout )
+            if response.status_code == 304 and entry is not None:
+                entry = RemoteEntry( url, entry.content, etag=entry.etag, last_modified=entry.last_modified, fetched_at=now )
+            else:
+                response.raise_for_status()
+                entry = RemoteEntry( url, response.content, etag=response.headers.get( "ETag" ),
+                                     last_modified=response.headers.get( "Last-Modified" ), fetched_at=now )
+        except requests.RequestException as error:
+            if entry is None:
+                raise
+            print( f"Unable to revalidate {url} ({error}). Using copy from {time.ctime( entry.fetched_at )}." )
+            # Callbacks waiting on url use the stale copy too, instead of each retrying the server in turn. It is only
+            # kept in memory, so the disk cache still records when the content was last confirmed.
+            with self._lock:
+                self._entries[url] = RemoteEntry( url, entry.content, etag=entry.etag, last_modified=entry.last_modified, fetched_at=now )
+            return entry
+
+        self._save_to_disk( entry )
+        with self._lock:
+            self._entries[url] = entry
+        return entry
+
+    def _parse( self, entry, kind, parser, kwargs ):
+        key = ( entry.digest, kind, repr( sorted( kwargs.items() ) ) )
+        with self._lock:
+            slot = self._frames.get( key )
+            owner = slot is None
+            if owner:
+                slot = _Slot()
+                self._frames[key] = slot
+            else:
+                self._frames.move_to_end( key )
+
+        if owner:
+            try:
+                slot.value = parser( entry.content, **kwargs )
+            except Exception as error:
+                slot.error = error
+                with self._lock:
+                    if self._frames.get( key ) is slot:
+                        del self._frames[key]
+                    slot.ready.set()
+                raise
+            with self._lock:
+                slot.ready.set()
+                while len( self._frames ) > self.max_frames:
+                    self._frames.popitem( last=False )
+        else:
+            slot.ready.wait()
+            if slot.error is not None:
+                raise slot.error
+        return slot.value
+
+    def read_csv( self, url, ttl=None, **kwargs ) -> pd.DataFrame:
+        """ pandas.read_csv() on a cached remote file. The parsed frame is memoized per content and kwargs, a copy is
+        returned so callers are free to modify it.
+        """
+        entry = self.fetch( url, ttl=ttl )
+        return self._parse( entry, "csv", lambda content, **kw: pd.read_csv( io.BytesIO( content ), **kw ), kwargs ).copy()
+
+    def read_yaml( self, url, ttl=None ):
+        """ Parses a cached remote YAML file. A new object is returned on every call.
+        """
+        entry = self.fetch( url, ttl=ttl )
+        return yaml.load( io.BytesIO( entry.content ), Loader=yaml.FullLoader )
+
+    def version( self, urls, ttl=None ) -> str:
+        """ Returns a hash identifying the current content of all urls.
+        """
+        digest = hashlib.sha256()
+        for url in urls:
+            digest.update( self.fetch( url, ttl=ttl ).digest.encode() )
+        return digest.hexdigest()
+
+remote = RemoteCache()
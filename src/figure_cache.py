@@ -0,0 +1,126 @@
+## figure_cache.py memoizes the figures returned by the dashboard callbacks as serialized JSON. Entries are keyed by the
+## plot, its normalized inputs and the version of the data it was drawn from, so a cached figure is only reused while the
+## data behind it is unchanged and common views are served without filtering data or building plotly figures.
+import json
+import threading
+from collections import OrderedDict
+
+from plotly.io.json import to_json_plotly
+
+class _Slot:
+    def __init__( self ):
+        self.ready = threading.Event()
+        self.value = None
+        self.error = None
+
+def normalize_inputs( inputs ):
+    """ Normalizes callback inputs into a string key. Empty values are treated as not set, like query_key() does.
+    """
+    normalized = [None if value in ( None, "", [] ) else value for value in inputs]
+    return json.dumps( normalized, sort_keys=True, default=str )
+
+class FigureCache:
+    """ Bounded LRU cache of serialized figures. Entries are evicted, least recently used first, once their total size
+    exceeds max_bytes. When a figure is requested for a new data version, the entries of that figure drawn from other
+    versions are dropped. Callbacks running concurrently and asking for the same figure wait for the first one to finish
+    instead of drawing it again.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximum total length of the cached JSON strings.
+    """
+    def __init__( self, max_bytes=128 * 2 ** 20 ):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._versions = dict()
+        self._lock = threading.Lock()
+
+    def _drop( self, key ):
+        slot = self._entries.pop( key )
+        if slot.value is not None:
+            self.size -= len( slot.value )
+
+    def _evict( self, keep ):
+        # Figures still being drawn have no size yet and are skipped, as is the figure just added.
+        for key in [k for k, slot in self._entries.items() if slot.ready.is_set() and k != keep]:
+            if self.size <= self.max_bytes:
+                break
+            self._drop( key )
+
+    def get( self, name, inputs, version, factory ):
+        """ Returns the figure called name for inputs and data version, drawing it with factory() if it isn't cached.
+        Parameters
+        ----------
+        name : str
+            Name of the plot.
+        inputs : list
+            Callback inputs the figure depends on.
+        version : str
+            Identifier of the data the figure is drawn from.
+        factory : callable
+            Function without arguments returning a plotly figure, or a list of figures.
+
+        Returns
+        -------
+        dict or list
+            The figure as parsed JSON, which Dash accepts in place of a plotly figure.
+        """
+        key = ( name, normalize_inputs( inputs ), version )
+        with self._lock:
+            if self._versions.get( name ) != version:
+                self._versions[name] = version
+                for stale in [k for k in self._entries if k[0] == name and k[2] != version and self._entries[k].ready.is_set()]:
+                    self._drop( stale )
+
+            slot = self._entries.get( key )
+            owner = slot is None
+            if owner:
+                slot = _Slot()
+                self._entries[key] = slot
+                self.misses += 1
+            else:
+                self._entries.move_to_end( key )
+                self.hits += 1
+
+        if owner:
+            try:
+                value = to_json_plotly( factory() )
+            except Exception as error:
+                slot.error = error
+                with self._lock:
+                    if self._entries.get( key ) is slot:
+                        del self._entries[key]
+                    slot.ready.set()
+                raise
+            with self._lock:
+                slot.value = value
+                slot.ready.set()
+                if self._entries.get( key ) is slot:
+                    self.size += len( value )
+                    self._evict( keep=key )
+        else:
+            slot.ready.wait()
+            if slot.error is not None:
+                raise slot.error
+
+        return json.loads( slot.value )
+
+    def clear( self ):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.size = 0
+
+    def stats( self ):
+        """ Returns the hit/miss counters and current size of the cache, for sizing max_bytes.
+        """
+        with self._lock:
+            return { "hits" : self.hits,
+                     "misses" : self.misses,
+                     "entries" : len( self._entries ),
+                     "bytes" : self.size,
+                     "max_bytes" : self.max_bytes }
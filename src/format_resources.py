@@ -1,18 +1,49 @@
+import json
+import os
+import threading
 from typing import List
 
 import numpy as np
 import pandas as pd
+import requests
 from dash import html
-from epiweeks import Week
+from src.epiweek import epiweek_start
 
 from src.variants import VOC, VOI
-from scipy.optimize import curve_fit
 from scipy.signal import savgol_filter
-from numpy import exp, log
-import geopandas as gpd
-
-def load_sequences( window=None ):
-    sequences = pd.read_csv( "resources/sequences.csv" )
+from src.fetch import remote
+from src.snapshot import snapshot_matches
+from src import sgtf
+
+SEQUENCES_CSV = "resources/sequences.csv"
+SEQUENCES_SNAPSHOT = "resources/sequences.parquet"
+CASES_CSV = "resources/new_cases.csv"
+GROWTH_RATES_CSV = "resources/growth_rates.csv"
+SGTF_TESTS_CSV = "resources/sgtf.csv"
+SGTF_FIT_CSV = "resources/fit.csv"
+SGTF_ESTIMATES_CSV = "resources/estimates.csv"
+SGTF_HASH_JSON = "resources/sgtf_fit.json"
+CATCHMENT_GEOMETRY = "resources/catchment_areas.json"
+SEQUENCE_COLUMNS = ["ID", "collection_date", "zipcode", "epiweek", "days_past", "sequencer", "provider", "lineage", "state"]
+CATEGORICAL_COLUMNS = ["zipcode", "sequencer", "provider", "lineage", "state"]
+
+# Seconds a remote file is used before checking whether it changed upstream.
+WASTEWATER_TTL = 10 * 60
+MONKEYPOX_TTL = 30 * 60
+CATCHMENT_TTL = 24 * 60 * 60
+SGTF_TTL = 60 * 60
+
+WASTEWATER_LOCATIONS = ["PointLoma", "Encina", "SouthBay"]
+WASTEWATER_TITER_TEMPLATE = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/{}_sewage_qPCR.csv"
+WASTEWATER_SEQS_TEMPLATE = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/{}_sewage_seqs.csv"
+WASTEWATER_CONFIG_URL = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/plot_config.yml"
+MONKEYPOX_TITER_TEMPLATE = "https://raw.githubusercontent.com/andersen-lab/MPX_WasteWater_San-Diego/master/MPX_{}_qpcr.csv"
+CATCHMENT_ZIPS_URL = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/Zipcodes.csv"
+
+MONKEYPOX_CASES_URL = "https://raw.githubusercontent.com/andersen-lab/MPX_WasteWater_San-Diego/master/MPX_cases.csv"
+
+def _parse_sequences_csv( columns ):
+    sequences = pd.read_csv( SEQUENCES_CSV, usecols=columns )
 
     # Convert to dates correctly.
     sequences["collection_date"] = pd.to_datetime( sequences["collection_date"] ).dt.tz_localize( None )
@@ -24,6 +55,40 @@ def load_sequences( window=None ):
     sequences["zipcode"] = sequences["zipcode"].replace(r'^\s*$', np.nan, regex=True)
     sequences["zipcode"] = sequences["zipcode"].apply( lambda x: f"{float( x ):.0f}" )
 
+    for col in CATEGORICAL_COLUMNS:
+        sequences[col] = sequences[col].astype( "category" )
+
+    return sequences
+
+def _snapshot_is_current():
+    # Producers other than update_seqs.py, like src/download_resources.py, only write the CSV. A snapshot converted from
+    # another version of the CSV is stale and ignored.
+    if not os.path.exists( SEQUENCES_SNAPSHOT ):
+        return False
+    if not os.path.exists( SEQUENCES_CSV ):
+        return True
+    return snapshot_matches( SEQUENCES_SNAPSHOT, SEQUENCES_CSV )
+
+def load_sequences( window=None, columns=None ):
+    """ Loads the sequence metadata generated by update_seqs.py. Reads the typed parquet snapshot written alongside the
+    CSV when it was converted from the current CSV, otherwise falls back to parsing the CSV.
+    Parameters
+    ----------
+    window : int
+        Only return sequences collected in the last window days.
+    columns : list[str]
+        Columns to load. Defaults to SEQUENCE_COLUMNS.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    columns = columns if columns is not None else SEQUENCE_COLUMNS
+    if _snapshot_is_current():
+        sequences = pd.read_parquet( SEQUENCES_SNAPSHOT, columns=columns )
+    else:
+        sequences = _parse_sequences_csv( columns )
+
     if window is not None:
         sequences = sequences.loc[sequences["days_past"] <= window].copy()
 
@@ -31,7 +96,7 @@ def load_sequences( window=None ):
 
 
 def load_cases( window = None ):
-    cases = pd.read_csv( "resources/new_cases.csv" )
+    cases = pd.read_csv( CASES_CSV )
 
     # Convert to dates correctly.
     cases["updatedate"] = pd.to_datetime( cases["updatedate"] ).dt.tz_localize( None )
@@ -43,11 +108,11 @@ def load_cases( window = None ):
 
 
 def load_growth_rates():
-    return pd.read_csv( "resources/growth_rates.csv" )
+    return pd.read_csv( GROWTH_RATES_CSV )
 
 
 def load_ww_growth_rates():
-    return pd.read_csv( "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/rel_growth_rates.csv" )
+    return remote.read_csv( "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/rel_growth_rates.csv", ttl=WASTEWATER_TTL )
 
 def format_cases_total( cases_df ):
     return_df = cases_df.sort_values( "updatedate", ascending=False ).groupby( "ziptext" ).first()
@@ -106,7 +171,7 @@ def get_seqs( seq_md, groupby="collection_date", zip_f=None ):
     else:
         seqs = seq_md
 
-    seqs = seqs.groupby( groupby )["ID"].agg( "count" ).reset_index()
+    seqs = seqs.groupby( groupby, observed=True )["ID"].agg( "count" ).reset_index()
     if groupby == "collection_date":
         seqs.columns = ["date", "new_sequences"]
     elif groupby == "zipcode":
@@ -138,8 +203,18 @@ def format_zip_summary( cases, seqs ):
 
     return cumulative_seqs
 
-def get_lineage_values( seqs ):
-    values = seqs["lineage"].dropna()
+def get_lineage_values( lineage_counts ):
+    """ Generates the options of the lineage dropdown.
+    Parameters
+    ----------
+    lineage_counts : pandas.DataFrame
+        number of sequences per lineage; output of CountCube.counts_by( ["lineage"] ).
+
+    Returns
+    -------
+    list[dict]
+    """
+    values = lineage_counts["lineage"].dropna()
     values = values.sort_values().unique()
 
     return_dict = [{"label" : "All variants of concern", "value" : "all-voc" },
@@ -162,20 +237,31 @@ def get_lineage_values( seqs ):
 
     return return_dict
 
-def get_summary_table( seqs ):
+def get_summary_table( lineage_counts, recent_counts ):
+    """ Generates the rows of the summary table on the Baja California page.
+    Parameters
+    ----------
+    lineage_counts : pandas.DataFrame
+        number of sequences per lineage; output of CountCube.counts_by( ["lineage"] ).
+    recent_counts : pandas.DataFrame
+        same as lineage_counts, but only for sequences collected in the last month.
+
+    Returns
+    -------
+    list[dash.html.Tr]
+    """
     sg = {"textAlign" : "center" }
     sd2 = {"marginLeft" : "50px" }
     table = [html.Tr( [html.Th( "Type", style={"marginLeft" : "20px" } ), html.Th( "Total", style=sg ), html.Th( "Last Month", style=sg )] ),
-             html.Tr( [html.Td( html.B( "Sequences", style={"marginLeft" : "10px" } ) ), html.Td( len( seqs ), style=sg ), html.Td( len( seqs.loc[seqs['days_past'] < 30] ), style=sg )] ),
+             html.Tr( [html.Td( html.B( "Sequences", style={"marginLeft" : "10px" } ) ), html.Td( int( lineage_counts["count"].sum() ), style=sg ), html.Td( int( recent_counts["count"].sum() ), style=sg )] ),
              html.Tr(html.Td( "", colSpan=3 ) ),
              html.Tr( html.Td( html.B( "Variants of concern", style={"marginLeft" : "10px" } ), colSpan=3))]
 
-    vocs = seqs.copy()
-    vocs["VOC"] = vocs["lineage"].map( VOC )
-    vocs = vocs.loc[~vocs["VOC"].isna()]
+    vocs = lineage_counts.groupby( lineage_counts["lineage"].map( VOC ) )["count"].sum()
+    recent_vocs = recent_counts.groupby( recent_counts["lineage"].map( VOC ) )["count"].sum()
 
-    for i in vocs["VOC"].sort_values().unique():
-        table.append( html.Tr( [html.Td( html.I( i, style={"marginLeft" : "20px" } ) ), html.Td( len( vocs.loc[vocs['VOC']==i] ), style=sg ), html.Td( len( vocs.loc[(vocs['VOC']==i)&(seqs['days_past']<30)] ), style=sg )] ) )
+    for i in vocs.index.sort_values():
+        table.append( html.Tr( [html.Td( html.I( i, style={"marginLeft" : "20px" } ) ), html.Td( int( vocs[i] ), style=sg ), html.Td( int( recent_vocs.get( i, 0 ) ), style=sg )] ) )
 
     # Brief hack to get Omicron in table
     #table.append( html.Tr(
@@ -184,17 +270,57 @@ def get_summary_table( seqs ):
 
     return table
 
-def get_provider_sequencer_values( seqs, value ):
-    labels = [{"label" : f"{i} ({j})", "value": i }for i, j in seqs[value].sort_values().value_counts().items()]
+def get_provider_sequencer_values( counts, value ):
+    """ Generates the options of the provider or sequencer dropdown.
+    Parameters
+    ----------
+    counts : pandas.DataFrame
+        number of sequences per provider or sequencer; output of CountCube.counts_by( [value] ).
+    value : str
+        either "provider" or "sequencer".
+
+    Returns
+    -------
+    list[dict]
+    """
+    counts = counts.groupby( value )["count"].sum()
+    labels = [{"label" : f"{i} ({j})", "value": i }for i, j in counts.loc[counts > 0].items()]
     labels = sorted( labels, key=lambda x: x["label"] )
     return labels
 
 
+# Fits made in-process by load_sgtf_data(), keyed by the input hash of the data they were fit to.
+_SGTF_FITS = dict()
+_SGTF_LOCK = threading.Lock()
+
+def _read_sgtf_outputs():
+    """ Reads the outputs of .github/scripts/update_sgtf.py.
+    Returns
+    -------
+    str or None
+        input hash of the data the outputs were fit to.
+    tuple or None
+        tests, fits and estimates, or None if the outputs are missing or written by an older version of the script.
+    """
+    try:
+        with open( SGTF_HASH_JSON, "r" ) as hash_file:
+            stored_hash = json.load( hash_file ).get( "input_hash" )
+        tests = pd.read_csv( SGTF_TESTS_CSV, parse_dates=["Date"] )
+        fit_df = pd.read_csv( SGTF_FIT_CSV, parse_dates=["date"] )
+        estimates = pd.read_csv( SGTF_ESTIMATES_CSV, index_col=0 )
+    except ( OSError, ValueError ):
+        return None, None
+    if not { "date99", "date50" }.issubset( estimates.columns ):
+        return None, None
+    estimates[["date99", "date50"]] = estimates[["date99", "date50"]].apply( pd.to_datetime )
+    return stored_hash, ( tests, fit_df, estimates )
+
 def load_sgtf_data():
-    """ Loads S-gene target failure data from file and fits a logistic growth mixture model. Data comes from clinical
+    """ Loads S-gene target failure data and the logistic growth mixture model fit to it. Data comes from clinical
     sequencing in San Diego. Logisitic growth mixture model is a summation of three logisitic growth models. Further
     versions might include a fourth model. Logisitic growth models are parameterized using logisitic growth rate and
-    sigmoid midpoint.
+    sigmoid midpoint. The model is fit during ingest by .github/scripts/update_sgtf.py. If its outputs are missing or
+    were fit to data that has since changed, the model is fit here instead and kept until the data changes again.
 
     Returns
     -------
@@ -205,76 +331,26 @@ def load_sgtf_data():
     estimates : pandas.DataFrame
         Estimates and confidence intervals for the growth rate, doubling time, and transmission advantage of the last component of the mixture model.
 
+    None is returned if neither the ingest outputs nor the remote data are available.
     """
-
-    def lgm( ndays, x0, r ):
-        return 1 / ( 1 + ( ( ( 1 / x0 ) - 1 ) * exp( -1 * r * ndays ) ) )
-
-    def lgm_mixture( ndays, x0_1, r_1, x0_2, r_2, x0_3, r_3, x0_4, r_4, x0_5, r_5 ):
-        return (lgm( ndays, x0_1, r_1 )
-                - lgm( ndays, x0_2, r_2 )
-                + lgm( ndays, x0_3, r_3 )
-                - lgm( ndays, x0_4, r_4 )
-                + lgm( ndays - 50, x0_5, r_5 ) )    # you didn't see anything.
-
-    tests = pd.read_csv( "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_SGTF_San-Diego/main/SGTF_San_Diego_new.csv", parse_dates=["Date"] )
-    tests = tests.dropna( how='all', axis=1 )
-    tests.columns = ["Date", "sgtf_all", "sgtf_likely", "sgtf_unlikely", "no_sgtf", "total_positive", "percent_low", "percen_all"]
-    tests = tests.loc[~tests["Date"].isna()]
-    tests["percent"] = (tests["sgtf_all"] / tests["total_positive"]).fillna(0)
-    tests["percent_filter"] = savgol_filter( tests["percent"], window_length=7, polyorder=2 )
-    tests["ndays"] = tests["Date"].apply(lambda x: x.toordinal())
-    tests["ndays"] = tests["ndays"] - min( tests["ndays"] ) + 1
-
-    fit, covar = curve_fit(
-        f=lgm_mixture,
-        xdata=tests["ndays"],
-        ydata=tests["percent_filter"],
-        p0=[0.01, 0.1, 0.003, 0.1, 2e-7, 0.1, 1e-9, 0.1, 1e-11, 0.05],
-        bounds=([0] * 10, [np.inf] * 10)
-    )
-    sigma_ab = np.sqrt( np.diagonal( covar ) )
-
-    days_sim = 1500
-
-    fit_df = pd.DataFrame( {"date" : pd.date_range( tests["Date"].min(), periods=days_sim ) } )
-    fit_df["ndays"] = fit_df.index
-    fit_df["fit_y"] = [lgm_mixture(i, *fit) for i in range( days_sim )]
-
-    sigma_addition = sigma_ab
-    # should be -1 when we want to include the term. I won't for now because the CI is so large.
-    sigma_addition[4] *= -1
-    sigma_addition[5] *= -1
-    sigma_addition[8] *= -0.5   # sneaky little hack to get CIs
-    sigma_addition[9] *= -1
-
-    fit_df["fit_lower"] = [lgm_mixture( i, *(fit + sigma_addition) ) for i in range( days_sim )]
-    fit_df["fit_upper"] = [lgm_mixture( i, *(fit - sigma_addition) ) for i in range( days_sim )]
-
-    min_date = "2023-07-01"
-
-    above_99 = fit_df.loc[(fit_df["date"] > min_date)&(fit_df["fit_y"] > 0.99),"date"].min()
-    above_99_lower = fit_df.loc[(fit_df["date"] > min_date)&(fit_df["fit_lower"] > 0.99),"date"].min()
-    above_99_upper = fit_df.loc[(fit_df["date"] > min_date)&(fit_df["fit_upper"] > 0.99),"date"].min()
-
-    above_50 = fit_df.loc[(fit_df["date"] > min_date)&(fit_df["fit_y"] > 0.50),"date"].min()
-    above_50_lower = fit_df.loc[(fit_df["date"] > min_date)&(fit_df["fit_lower"] > 0.50),"date"].min()
-    above_50_upper = fit_df.loc[(fit_df["date"] > min_date)&(fit_df["fit_upper"] > 0.50),"date"].min()
-
-    growth_rate = fit[9]
-    serial_interval = 5.5
-
-    estimates = pd.DataFrame( {
-        "estimate" : [above_99, above_50, growth_rate],
-        "lower" : [above_99_lower, above_50_lower, growth_rate + sigma_ab[5]],
-        "upper" : [above_99_upper, above_50_upper, growth_rate - sigma_ab[5]] }, index=["date99", "date50", "growth_rate"] )
-    estimates = estimates.T
-    estimates["doubling_time"] = log(2) / estimates["growth_rate"]
-    estimates["transmission_increase"] = serial_interval * estimates["growth_rate"]
-
-    return tests, fit_df, estimates
-
-def load_ww_individual( loc: str, source: str, date_col: str, value_col: str, columns: List[str], window_length: int ) -> pd.DataFrame:
+    stored_hash, stored = _read_sgtf_outputs()
+    try:
+        tests = sgtf.prepare_tests( remote.read_csv( sgtf.SGTF_URL, ttl=SGTF_TTL, parse_dates=["Date"] ) )
+    except ( requests.RequestException, OSError ):
+        # Without the remote data the ingest outputs can't be checked, so they're used as they are.
+        return stored
+    current_hash = sgtf.input_hash( tests )
+    if stored is not None and stored_hash == current_hash:
+        return stored
+
+    with _SGTF_LOCK:
+        if current_hash not in _SGTF_FITS:
+            fit_df, estimates = sgtf.fit_mixture( tests )
+            _SGTF_FITS.clear()
+            _SGTF_FITS[current_hash] = ( tests, fit_df, estimates )
+        return tuple( frame.copy() for frame in _SGTF_FITS[current_hash] )
+
+def load_ww_individual( loc: str, source: str, date_col: str, value_col: str, columns: List[str], window_length: int, ttl: float = WASTEWATER_TTL ) -> pd.DataFrame:
     """ Loads wastewater qPCR data from file
     Parameters
     ----------
@@ -290,13 +366,15 @@ def load_ww_individual( loc: str, source: str, date_col: str, value_col: str, co
         Values to replace column names in file. Bit of a hack...
     window_length : int
         Length of window to use for Savitzky-Golay filter.
+    ttl : float
+        Seconds a cached copy of the file is used before checking for updates.
 
     Returns
     -------
     pd.DataFrame
         DataFrame containing a time series of qPCR measurements for a given catchment area.
     """
-    temp = pd.read_csv( loc, parse_dates=[date_col] )
+    temp = remote.read_csv( loc, ttl=ttl, parse_dates=[date_col] )
     temp["source"] = source
     temp.columns = columns
     temp.loc[~temp[value_col].isna(), f"{value_col}_rolling"] = savgol_filter(
@@ -304,38 +382,120 @@ def load_ww_individual( loc: str, source: str, date_col: str, value_col: str, co
 
     return temp
 
-def load_wastewater_data():
+def load_wastewater_data( lineages=None ):
+    """ Loads the qPCR measurements and the lineage abundances estimated by Freyja for every wastewater site.
+    Parameters
+    ----------
+    lineages : list[str]
+        lineage columns of the Freyja output to read, e.g. LineageGroups( load_ww_plot_config() ).members. The Freyja
+        output gains a column for every newly designated lineage, so reading only the lineages that are plotted keeps
+        memory and parse time from growing with it. Lineages missing from a file are skipped. Defaults to all columns.
+
+    Returns
+    -------
+    pandas.DataFrame
+        qPCR measurements and their smoothed series, with a "source" column naming the site.
+    pandas.DataFrame
+        lineage abundances in percent as float32, indexed by date, with a "source" column naming the site.
+    """
     def round_to_odd( value ):
         return np.ceil( np.floor( value ) / 2 ) * 2 - 1
 
+    wanted = set( lineages ) if lineages is not None else None
+
     def load_seq_individul( loc, source ):
-        temp = pd.read_csv( loc, parse_dates=["Date"], index_col="Date" )
+        kwargs = dict()
+        if lineages is not None:
+            header = remote.read_csv( loc, ttl=WASTEWATER_TTL, nrows=0 ).columns
+            columns = [column for column in header if column in wanted]
+            kwargs = { "usecols" : ["Date"] + columns, "dtype" : { column : np.float32 for column in columns } }
+        temp = remote.read_csv( loc, ttl=WASTEWATER_TTL, parse_dates=["Date"], index_col="Date", **kwargs )
         temp["source"] = source
         return temp
 
-    titer_template = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/{}_sewage_qPCR.csv"
-    seqs_template = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/{}_sewage_seqs.csv"
-    locations = ["PointLoma", "Encina", "SouthBay"]
-
     qpcr_columns = ["date", "gene_copies", "source"]
-    return_df = pd.concat( [load_ww_individual( loc=titer_template.format( loc ), source=loc, date_col="Sample_Date", value_col="gene_copies", columns=qpcr_columns, window_length=11 ) for loc in locations] )
-    seqs = pd.concat( [load_seq_individul( seqs_template.format( loc ), loc ) for loc in locations] )
+    return_df = pd.concat( [load_ww_individual( loc=WASTEWATER_TITER_TEMPLATE.format( loc ), source=loc, date_col="Sample_Date", value_col="gene_copies", columns=qpcr_columns, window_length=11 ) for loc in WASTEWATER_LOCATIONS] )
+    seqs = pd.concat( [load_seq_individul( WASTEWATER_SEQS_TEMPLATE.format( loc ), loc ) for loc in WASTEWATER_LOCATIONS] )
 
     return return_df, seqs
 
-def load_catchment_areas():
-    zip_loc = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/Zipcodes.csv"
-    zips = pd.read_csv( zip_loc, usecols=["Zip_code", "Wastewater_treatment_plant"] )
+def wastewater_version():
+    """ Identifies the current content of the remote files read by load_wastewater_data() and load_ww_plot_config().
+    Returns
+    -------
+    str
+    """
+    urls = [template.format( loc ) for template in [WASTEWATER_TITER_TEMPLATE, WASTEWATER_SEQS_TEMPLATE] for loc in WASTEWATER_LOCATIONS]
+    try:
+        return remote.version( urls + [WASTEWATER_CONFIG_URL], ttl=WASTEWATER_TTL )
+    except ( requests.RequestException, OSError ):
+        # load_ww_plot_config() falls back to the local copy of the config when the remote one can't be reached.
+        return remote.version( urls, ttl=WASTEWATER_TTL ) + "-local-config"
+
+def monkeypox_version():
+    """ Identifies the current content of the remote files read by load_monkeypox_data().
+    Returns
+    -------
+    str
+    """
+    urls = [MONKEYPOX_TITER_TEMPLATE.format( loc ) for loc in WASTEWATER_LOCATIONS]
+    return remote.version( urls + [MONKEYPOX_CASES_URL], ttl=MONKEYPOX_TTL )
+
+# Levels of CATCHMENT_GEOMETRY parsed by _read_catchment_geometry(), with the modification time of the file they were
+# parsed from.
+_CATCHMENT_CACHE = { "mtime" : None, "levels" : dict() }
+_CATCHMENT_LOCK = threading.Lock()
+
+def _read_catchment_geometry( level ):
+    try:
+        mtime = os.path.getmtime( CATCHMENT_GEOMETRY )
+    except OSError:
+        # The geometry is built by the daily update once resources/zips.geojson is available. Until then the map is empty.
+        print( f"{CATCHMENT_GEOMETRY} not found. Build it with .github/scripts/build_catchment_geometry.py." )
+        return { "type" : "FeatureCollection", "features" : [] }
+
+    with _CATCHMENT_LOCK:
+        if _CATCHMENT_CACHE["mtime"] != mtime:
+            with open( CATCHMENT_GEOMETRY ) as geometry_file:
+                _CATCHMENT_CACHE["levels"] = json.load( geometry_file )["levels"]
+            _CATCHMENT_CACHE["mtime"] = mtime
+        return _CATCHMENT_CACHE["levels"][level]
+
+def catchment_version():
+    """ Identifies the current content of the files read by load_catchment_areas(), for keying cached maps.
+    Returns
+    -------
+    str
+    """
+    mtime = os.path.getmtime( CATCHMENT_GEOMETRY ) if os.path.exists( CATCHMENT_GEOMETRY ) else None
+    return f"{mtime}-{remote.version( [CATCHMENT_ZIPS_URL], ttl=CATCHMENT_TTL )}"
+
+def load_catchment_areas( level="medium" ):
+    """ Loads the ZIP code boundaries and the catchment area each ZIP code belongs to.
+    Parameters
+    ----------
+    level : str
+        level of detail of the boundaries; "low", "medium" or "high". See CATCHMENT_LEVELS in
+        .github/scripts/build_catchment_geometry.py.
+
+    Returns
+    -------
+    dict
+        GeoJSON FeatureCollection of the ZIP code boundaries, identified by the ZIP code. Empty if CATCHMENT_GEOMETRY
+        hasn't been built. The geometry is parsed once per version of the file and shared between callers, so it must
+        not be modified.
+    pandas.DataFrame
+        "Wastewater_treatment_plant" of each ZIP code in the FeatureCollection, indexed by the ZIP code.
+    """
+    geojson = _read_catchment_geometry( level )
 
-    sd = gpd.read_file( "resources/zips.geojson" )
+    zips = remote.read_csv( CATCHMENT_ZIPS_URL, ttl=CATCHMENT_TTL, usecols=["Zip_code", "Wastewater_treatment_plant"] )
+    zips["Zip_code"] = zips["Zip_code"].apply( lambda x: f"{x:.0f}" )
+    zips = zips.drop_duplicates( "Zip_code" ).set_index( "Zip_code" )
 
-    sd = sd.merge( zips, left_on=["ZIP"], right_on=["Zip_code"], how="outer" )
-    sd = sd.loc[~sd["geometry"].isna()]
-    sd["geometry"] = sd.simplify( 0.002 )
-    sd["Wastewater_treatment_plant"] = sd["Wastewater_treatment_plant"].fillna( "Other" )
-    sd["ZIP"] = sd["ZIP"].apply( lambda x: f"{x:.0f}" )
-    sd = sd.set_index( "ZIP" )
-    return sd
+    sd = pd.DataFrame( index=pd.Index( [feature["id"] for feature in geojson["features"]], name="ZIP" ) )
+    sd["Wastewater_treatment_plant"] = zips["Wastewater_treatment_plant"].reindex( sd.index ).fillna( "Other" )
+    return geojson, sd
 
 def convert_rbg_to_tuple( rgb ):
     rgb = rgb.lstrip( "#" )
@@ -357,12 +517,10 @@ def load_ww_plot_config( delta=0.15 ):
         Description of the name, lineage members, and color of each trace to be included in the plot.
     """
     import yaml
-    from urllib import request
 
     try:
-        config_url = request.urlopen( "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_WasteWater_San-Diego/master/plot_config.yml" )
-        plot_config = yaml.load( config_url, Loader=yaml.FullLoader )
-    except:
+        plot_config = remote.read_yaml( WASTEWATER_CONFIG_URL, ttl=WASTEWATER_TTL )
+    except ( requests.RequestException, OSError ):
         print( "Unable to connect to remote config. Defaulting to local, potentially out-of-date copy." )
         with open( "resources/ww_seqs.yml", "r" ) as f :
             plot_config = yaml.load( f, Loader=yaml.FullLoader )
@@ -388,15 +546,13 @@ def load_ww_plot_config( delta=0.15 ):
     return plot_config
 
 def load_monkeypox_data():
-    titer_template = "https://raw.githubusercontent.com/andersen-lab/MPX_WasteWater_San-Diego/master/MPX_{}_qpcr.csv"
-    locations = ["PointLoma", "Encina", "SouthBay"]
-    data = pd.concat( [load_ww_individual( loc=titer_template.format( loc ), source=loc, date_col="date", value_col="copies", columns=["date", "source", "copies"], window_length=11 if loc=="PointLoma" else 3 ) for loc in locations] )
+    data = pd.concat( [load_ww_individual( loc=MONKEYPOX_TITER_TEMPLATE.format( loc ), source=loc, date_col="date", value_col="copies", columns=["date", "source", "copies"], window_length=11 if loc=="PointLoma" else 3, ttl=MONKEYPOX_TTL ) for loc in WASTEWATER_LOCATIONS] )
     data.loc[data["copies_rolling"] < 0, "copies_rolling"] = 0
 
-    cases = pd.read_csv( "https://raw.githubusercontent.com/andersen-lab/MPX_WasteWater_San-Diego/master/MPX_cases.csv", parse_dates=["date"] )
+    cases = remote.read_csv( MONKEYPOX_CASES_URL, ttl=MONKEYPOX_TTL, parse_dates=["date"] )
     cases["cases"] = cases["cases"].diff().fillna(0)
     cases.loc[cases["cases"]<0,"cases"] = 0
-    cases["week"] = cases["date"].apply( lambda x: Week.fromdate( x ).startdate() )
+    cases["week"] = epiweek_start( cases["date"] )
     cases = cases.groupby( "week" )["cases"].agg( "sum" )
     cases = cases.reindex( pd.date_range( cases.index.min(), cases.index.max() ) ).rename_axis( "date" ).reset_index()
     indexer = pd.api.indexers.FixedForwardWindowIndexer( window_size=7 )
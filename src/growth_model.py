@@ -0,0 +1,208 @@
+## growth_model.py fits the multinomial logistic regression of lineage on epiweek used to estimate lineage growth rates.
+## The only covariate is the week, so the likelihood only depends on the number of sequences of each lineage in each
+## week, and the model is fit with Newton's method on that (week x lineage) count matrix instead of on one row per
+## sequence. Results use the layout of statsmodels' MNLogit: the first lineage is the reference, and every other
+## lineage has an "epiweek" and a "const" coefficient.
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+EXOG_NAMES = ["epiweek", "const"]
+
+class GrowthModelResults:
+    """ Fitted multinomial growth model.
+
+    Parameters
+    ----------
+    names : list[str]
+        lineages, starting with the reference lineage.
+    params : numpy.ndarray
+        (lineages - 1, 2) array with the epiweek and const coefficient of each non-reference lineage.
+    cov : numpy.ndarray
+        covariance matrix of params.ravel().
+    iterations : int
+        number of Newton iterations used by the fit.
+    converged : bool
+        whether the fit converged before the maximum number of iterations.
+    llf : float
+        log-likelihood at params.
+    """
+    def __init__( self, names, params, cov, iterations, converged, llf ):
+        self.names = list( names )
+        self._params = params
+        self._cov = cov
+        self.iterations = iterations
+        self.converged = converged
+        self.llf = llf
+
+    @property
+    def params( self ) -> pd.DataFrame:
+        """ Coefficients, with a row per covariate and a column per non-reference lineage.
+        """
+        return pd.DataFrame( self._params.T, index=EXOG_NAMES, columns=self.names[1:] )
+
+    def cov_params( self ) -> pd.DataFrame:
+        """ Covariance of the coefficients, indexed by (lineage, covariate) on both axes.
+        """
+        index = pd.MultiIndex.from_product( [self.names[1:], EXOG_NAMES] )
+        return pd.DataFrame( self._cov, index=index, columns=index )
+
+    def conf_int( self, alpha=0.05 ) -> np.ndarray:
+        """ Returns the (lineages - 1, 2, 2) array of lower and upper bounds of each coefficient.
+        """
+        q = norm.ppf( 1 - alpha / 2 )
+        bse = np.sqrt( np.diag( self._cov ) ).reshape( self._params.shape )
+        return np.stack( [self._params - q * bse, self._params + q * bse], axis=-1 )
+
+    def predict( self, exog ) -> np.ndarray:
+        """ Returns the probability of each lineage for each row of exog, given as [epiweek, 1] pairs.
+        """
+        exog = np.asarray( exog, dtype=float )
+        return _probabilities( exog @ self._params.T )
+
+def _probabilities( eta ):
+    eta = np.column_stack( [np.zeros( len( eta ) ), eta] )
+    eta -= eta.max( axis=1, keepdims=True )
+    prob = np.exp( eta )
+    return prob / prob.sum( axis=1, keepdims=True )
+
+class MultinomialGrowthModel:
+    """ Multinomial logistic regression of lineage on epiweek, fit to the number of sequences of each lineage per week.
+    Equivalent to statsmodels.api.MNLogit( lineage, [epiweek, const] ) fit on one row per sequence.
+
+    Parameters
+    ----------
+    counts : pandas.DataFrame
+        number of sequences, with a row per epiweek (as a number) and a column per lineage. The first column is the
+        reference lineage.
+    """
+    def __init__( self, counts : pd.DataFrame ):
+        self.names = list( counts.columns )
+        self.weeks = counts.index.to_numpy( dtype=float )
+        self.counts = counts.to_numpy( dtype=float )
+        self.totals = self.counts.sum( axis=1 )
+
+        # Weeks are large numbers (days since 1970), so the model is solved with centered weeks to keep the Hessian
+        # well conditioned. Coefficients are converted back before they are returned.
+        self.center = np.average( self.weeks, weights=self.totals )
+        self.exog = np.column_stack( [self.weeks - self.center, np.ones( len( self.weeks ) )] )
+
+    def _to_centered( self, params ):
+        centered = np.array( params, dtype=float, copy=True )
+        centered[:, 1] += centered[:, 0] * self.center
+        return centered
+
+    def _from_centered( self, centered, cov ):
+        params = centered.copy()
+        params[:, 1] -= params[:, 0] * self.center
+        jacobian = np.kron( np.eye( len( params ) ), np.array( [[1.0, 0.0], [-self.center, 1.0]] ) )
+        return params, jacobian @ cov @ jacobian.T
+
+    def start_params( self, previous : GrowthModelResults ):
+        """ Maps the coefficients of a previous fit onto the lineages of this model. Lineages which weren't in the
+        previous fit start without growth, at their overall log-odds against the reference lineage.
+        Parameters
+        ----------
+        previous : GrowthModelResults
+            results of an earlier fit with the same reference lineage.
+
+        Returns
+        -------
+        start_params : numpy.ndarray
+            (lineages - 1, 2) array of epiweek and const coefficients.
+        matched : int
+            number of lineages whose coefficients were taken from previous.
+        """
+        if previous.names[0] != self.names[0]:
+            raise ValueError( f"previous fit uses {previous.names[0]} as the reference lineage instead of {self.names[0]}." )
+
+        totals = self.counts.sum( axis=0 ) + 0.5
+        start = np.column_stack( [np.zeros( len( self.names ) - 1 ), np.log( totals[1:] / totals[0] )] )
+
+        previous_index = pd.Index( previous.names[1:] ).get_indexer( self.names[1:] )
+        matched = previous_index >= 0
+        start[matched] = previous._params[previous_index[matched]]
+        return start, int( matched.sum() )
+
+    def loglike( self, centered ):
+        prob = _probabilities( self.exog @ centered.T )
+        return np.sum( self.counts * np.log( np.clip( prob, 1e-300, None ) ) )
+
+    def _score_hessian( self, centered ):
+        prob = _probabilities( self.exog @ centered.T )[:, 1:]
+        residuals = self.counts[:, 1:] - self.totals[:, None] * prob
+        score = np.einsum( "wk,wi->ki", residuals, self.exog ).ravel()
+
+        # Information of each week between lineages k and l: N (diag( p ) - p p').
+        weights = -np.einsum( "w,wk,wl->wkl", self.totals, prob, prob )
+        lineages = np.arange( prob.shape[1] )
+        weights[:, lineages, lineages] += self.totals[:, None] * prob
+        information = np.einsum( "wkl,wi,wj->kilj", weights, self.exog, self.exog )
+        size = score.size
+        return score, information.reshape( size, size )
+
+    def fit( self, start_params=None, maxiter=100, tol=1e-8 ) -> GrowthModelResults:
+        """ Finds the maximum likelihood coefficients with Newton's method.
+        Parameters
+        ----------
+        start_params : numpy.ndarray
+            (lineages - 1, 2) array of initial epiweek and const coefficients. Defaults to zeros.
+        maxiter : int
+            maximum number of Newton iterations.
+        tol : float
+            the fit stops when no coefficient changes more than tol, relative to the centered coefficients, or when
+            the expected gain in log-likelihood is below tol.
+
+        Returns
+        -------
+        GrowthModelResults
+        """
+        shape = ( len( self.names ) - 1, 2 )
+        centered = np.zeros( shape ) if start_params is None else self._to_centered( start_params )
+        llf = self.loglike( centered )
+
+        converged = False
+        iterations = 0
+        while iterations < maxiter:
+            iterations += 1
+            score, information = self._score_hessian( centered )
+            step = np.linalg.lstsq( information, score, rcond=None )[0].reshape( shape )
+
+            # Half the Newton decrement is the expected gain in log-likelihood. It also goes to zero when the maximum
+            # is at infinity, e.g. when the reference lineage has no sequences, where the steps themselves don't.
+            decrement = score @ step.ravel()
+
+            # Halve the step until the likelihood doesn't decrease.
+            for _ in range( 30 ):
+                candidate = centered + step
+                candidate_llf = self.loglike( candidate )
+                if candidate_llf >= llf - 1e-12 * abs( llf ):
+                    break
+                step /= 2
+            centered, llf = candidate, candidate_llf
+
+            if decrement / 2 < tol or np.max( np.abs( step ) / ( 1 + np.abs( centered ) ) ) < tol:
+                converged = True
+                break
+
+        _, information = self._score_hessian( centered )
+        params, cov = self._from_centered( centered, np.linalg.pinv( information ) )
+        return GrowthModelResults( self.names, params, cov, iterations, converged, llf )
+
+    def refit( self, previous : GrowthModelResults, maxiter=100, tol=1e-8 ) -> GrowthModelResults:
+        """ Fits the model starting from the coefficients of a previous fit, see start_params().
+        Parameters
+        ----------
+        previous : GrowthModelResults
+            results of an earlier fit with the same reference lineage.
+        maxiter : int
+            maximum number of Newton iterations.
+        tol : float
+            convergence tolerance, see fit().
+
+        Returns
+        -------
+        GrowthModelResults
+        """
+        start, _ = self.start_params( previous )
+        return self.fit( start_params=start, maxiter=maxiter, tol=tol )
@@ -0,0 +1,61 @@
+## lineage_groups.py compiles the wastewater plot config into a sparse matrix mapping the lineage columns of the Freyja
+## output to the groups shown in the wastewater lineage graph, so the abundance of every group at every site is computed
+## with a single matrix product however many lineage columns the Freyja output grows to.
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.signal import savgol_filter
+
+class LineageGroups:
+    """ Lineage membership of the groups of the wastewater plot config.
+
+    Parameters
+    ----------
+    config : dict
+        output of load_ww_plot_config(). Every entry except "Other" is a group summing the abundance of its members.
+    """
+    def __init__( self, config ):
+        self.groups = [key for key in config if key != "Other"]
+        self.members = list( dict.fromkeys( member for key in self.groups for member in config[key]["members"] ) )
+
+        index = { member : i for i, member in enumerate( self.members ) }
+        rows = [index[member] for key in self.groups for member in config[key]["members"]]
+        columns = [group for group, key in enumerate( self.groups ) for _ in config[key]["members"]]
+        self.membership = sparse.csr_matrix( ( np.ones( len( rows ) ), ( rows, columns ) ), shape=( len( self.members ), len( self.groups ) ) )
+
+    def abundances( self, seqs, smooth=True, window_length=21 ):
+        """ Computes the abundance of each group at each site.
+        Parameters
+        ----------
+        seqs : pandas.DataFrame
+            lineage abundances in percent with a "source" column naming the site; second output of
+            load_wastewater_data(). Missing values and members without a column count as zero.
+        smooth : bool
+            whether to smooth the abundances of each site with savgol_filter( window_length=window_length, polyorder=1 )
+            and scale them back to 100%.
+        window_length : int
+            length of the window of the Savitzky-Golay filter.
+
+        Returns
+        -------
+        pandas.DataFrame
+            same index and "source" column as seqs, with a column for each group, and an "Other" column holding the
+            abundance not assigned to any group.
+        """
+        values = seqs.reindex( columns=self.members ).to_numpy( dtype=float, na_value=0.0 )
+        grouped = np.asarray( ( self.membership.T @ values.T ).T )
+        other = np.clip( 100 - grouped.sum( axis=1 ), 0, None )
+        abundances = np.column_stack( [grouped, other] )
+
+        if smooth:
+            sources = seqs["source"].to_numpy()
+            for source in pd.unique( sources ):
+                rows = np.flatnonzero( sources == source )
+                abundances[rows] = savgol_filter( abundances[rows], window_length=window_length, polyorder=1, axis=0 )
+            abundances = np.clip( abundances, 0, None )
+            with np.errstate( invalid="ignore", divide="ignore" ):
+                abundances = abundances / abundances.sum( axis=1, keepdims=True ) * 100
+
+        return_df = pd.DataFrame( abundances, index=seqs.index, columns=self.groups + ["Other"] )
+        return_df["source"] = seqs["source"].to_numpy()
+        return return_df
@@ -5,6 +5,7 @@ def get_layout():
     layout = [
         html.Div( [dcc.Markdown( id="markdown-stuff", link_target='_blank' ),
                    html.P() ] ),
+        dcc.Store( id="region-counts" ),
         html.Div( id="top-table-div", style={"width" : "55em",
                                              "marginLeft" : "auto",
                                              "marginRight" : "auto",
@@ -139,11 +140,12 @@ def get_layout():
                     "marginRight" : "auto" }
         ),
         html.Div(
-            dcc.Graph(
+            [dcc.Graph(
                 id="lineage-time-graph",
                 config={"displayModeBar" : False},
                 style={"height" : "25em" }
             ),
+            dcc.Store( id="lineage-time-graph-variants" )],
             className="pretty_container",
             style={ "marginLeft" : "auto",
                     "marginRight" : "auto" }
@@ -52,7 +52,8 @@ def get_layout():
                             id="monkeypox-graph",
                             config={"displayModeBar" : False },
                             style={"height" : "30em"}
-                        )
+                        ),
+                        dcc.Store( id="monkeypox-graph-variants" )
                     ]
                 )
             ]
@@ -13,6 +13,14 @@ def get_layout( sgtf_data ):
     other estimates of its prevalence in San Diego and elsewhere can be found at [Outbreak.info](https://outbreak.info/).
     """
 
+    if sgtf_data is None:
+        return [
+            dcc.Markdown( markdown, link_target='_blank' ),
+            html.H5( "SGTF data is currently unavailable. Please check back later.", style={ 'textAlign': 'center' } ),
+            html.Br(),
+            html.P( id="commit-date", style={ 'textAlign': 'center' })
+        ]
+
     #commit_date = get_last_commit_date()
     #commit_date = "December 23 @ 3:47 PM PST"
 
@@ -82,6 +82,7 @@ def get_layout():
                             config={"displayModeBar" : False },
                             style={"height" : "30em"}
                         ),
+                        dcc.Store( id="wastewater-graph-variants" ),
                     ]
                 ),
                 html.P(),
@@ -136,10 +137,11 @@ def get_layout():
                                 )],
                         ),
                         html.Div(
-                            dcc.Graph(
+                            [dcc.Graph(
                                 id="wastewater-seq-graph",
                                 config={"displayModeBar" : False},
                             ),
+                            dcc.Store( id="wastewater-seq-graph-variants" )],
                             style={ "height": "30em", "margin" : "auto" }
                         )
                     ],
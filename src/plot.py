@@ -3,8 +3,7 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import numpy as np
 import pandas as pd
-from epiweeks import Week
-from scipy.signal import savgol_filter
+from src.epiweek import epiweek_start
 from scipy.special import betaincinv
 
 from src.variants import VOC, VOI
@@ -12,6 +11,8 @@ import datetime
 
 COLOR_DARK = "#495057"
 COLOR_LIGHT = "#93aad3"
+COLOR_LINEAGE_VOC = "#925c37"
+COLOR_LINEAGE_VOI = "#4977CE"
 
 def _add_date_formatting_minimum( fig ):
     fig.update_layout( template="simple_white",
@@ -111,7 +112,8 @@ def plot_cummulative_cases_seqs( df ):
     return fig
 
 def plot_cummulative_sampling_fraction( df ):
-    df["epiweek"] = df["date"].apply( lambda x: Week.fromdate(x).startdate() )
+    # df can be shared between callbacks, so don't modify it in place.
+    df = df.assign( epiweek=epiweek_start( df["date"] ) )
     plot_df = df.groupby( "epiweek" ).agg( new_cases = ("new_cases", "sum"), new_sequences = ("new_sequences", "sum" ) )
     plot_df = plot_df.loc[plot_df["new_sequences"]>0]
     plot_df["fraction"] = plot_df["new_sequences"] / plot_df["new_cases"]
@@ -144,7 +146,21 @@ def add_missing_to_color_scale( scale, color="white" ):
     return return_list
 
 def plot_lineages_time( df, lineage=None, scaleby="fraction" ):
-    plot_df = df.pivot_table( index="epiweek", columns="lineage", values="ID", aggfunc="count" )
+    """ Plots the number of sequences per epiweek, highlighting a single lineage if requested.
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        number of sequences per epiweek and lineage; output of CountCube.counts_by( ["epiweek", "lineage"] ).
+    lineage : str
+        lineage to highlight.
+    scaleby : str
+        either "fraction" or "sequences".
+
+    Returns
+    -------
+    plotly.graph_objects.Figure
+    """
+    plot_df = df.pivot_table( index="epiweek", columns="lineage", values="count", aggfunc="sum" )
     plot_df = plot_df.fillna( 0 )
 
     yaxis_label = "Sequences"
@@ -179,7 +195,22 @@ def plot_lineages_time( df, lineage=None, scaleby="fraction" ):
     return fig
 
 def plot_voc( df, scaleby="fraction", focus="VOC" ):
-    plot_df = df.pivot_table( index="epiweek", columns="lineage", values="state", aggfunc="count", fill_value=0 ).T
+    """ Plots the number of sequences per epiweek for each variant of concern, or for the top lineages of a single
+    variant of concern.
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        number of sequences per epiweek and lineage; output of CountCube.counts_by( ["epiweek", "lineage"] ).
+    scaleby : str
+        either "fraction" or "sequences".
+    focus : str
+        "VOC" to plot all variants of concern, otherwise the prefix of the variant of concern to focus on.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure
+    """
+    plot_df = df.pivot_table( index="epiweek", columns="lineage", values="count", aggfunc="sum", fill_value=0 ).T
     plot_df["VOC"] = plot_df.index.map( VOC )
     plot_df.loc[plot_df["VOC"].isna(),"VOC"] = "Other"
 
@@ -190,7 +221,8 @@ def plot_voc( df, scaleby="fraction", focus="VOC" ):
 
         focus_df = plot_df.loc[plot_df["VOC"].str.startswith( focus )]
         focus_df = focus_df.drop( columns="VOC" ).T
-        focus_df = focus_df.reindex( columns=focus_df.sum().sort_values( ascending=False ).index )
+        # Ties keep the order of the lineage names, like voc() in assets/clientside_filters.js, so both color them the same.
+        focus_df = focus_df.reindex( columns=focus_df.sum().sort_values( ascending=False, kind="mergesort" ).index )
         focus_top = focus_df.iloc[:,:5]
         focus_bottom = focus_df.iloc[:,5:].sum( axis=1)
         focus_bottom.name = "Other"
@@ -202,9 +234,10 @@ def plot_voc( df, scaleby="fraction", focus="VOC" ):
     else:
         plot_df = plot_df.groupby( "VOC" ).agg( "sum" ).T
 
-        order = plot_df.sum().sort_values( ascending=False ).index.to_list()
-        order.remove( "Other" )
-        order.append( "Other" )
+        order = plot_df.sum().sort_values( ascending=False, kind="mergesort" ).index.to_list()
+        if "Other" in order:
+            order.remove( "Other" )
+            order.append( "Other" )
 
         plot_df = plot_df.reindex( columns=order )
 
@@ -220,7 +253,7 @@ def plot_voc( df, scaleby="fraction", focus="VOC" ):
         if j == "Other":
             color = COLOR_DARK
         else:
-            color = px.colors.colorbrewer.Dark2[i]
+            color = px.colors.colorbrewer.Dark2[i % len( px.colors.colorbrewer.Dark2 )]
         fig.add_trace( go.Bar( x=plot_df.index, y=plot_df[j], name=j, marker_color=color ) )
 
     fig.update_layout( barmode='stack' )
@@ -233,7 +266,7 @@ def plot_voc( df, scaleby="fraction", focus="VOC" ):
     return fig
 
 def plot_delta( df, scaleby="fraction" ):
-    plot_df = df.pivot_table( index="epiweek", columns="lineage", values="state", aggfunc="count", fill_value=0 ).T
+    plot_df = df.pivot_table( index="epiweek", columns="lineage", values="count", aggfunc="sum", fill_value=0 ).T
     plot_df["VOC"] = plot_df.index.map( VOC )
     plot_df.loc[plot_df["VOC"].isna(),"VOC"] = "Other"
 
@@ -275,20 +308,28 @@ def plot_delta( df, scaleby="fraction" ):
 
 
 def plot_lineages( df ):
-
-    plot_df = df["lineage"].value_counts().reset_index()
-    print(plot_df)
+    """ Plots the number of sequences of each lineage.
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        number of sequences per lineage; output of CountCube.counts_by( ["lineage"] ).
+
+    Returns
+    -------
+    plotly.graph_objects.Figure
+    """
+    plot_df = df.groupby( "lineage" )["count"].sum().sort_values( ascending=False ).reset_index()
     colors = list()
-    for i in plot_df["index"]:
+    for i in plot_df["lineage"]:
         if i in sorted( VOI.keys() ):
-            colors.append( "#4977CE" )
+            colors.append( COLOR_LINEAGE_VOI )
         elif i in sorted( VOC.keys() ):
-            colors.append( "#925c37" )
+            colors.append( COLOR_LINEAGE_VOC )
         else:
             colors.append( COLOR_DARK )
 
     fig = go.Figure()
-    fig.add_trace( go.Bar( x=plot_df["index"], y=plot_df["lineage"], marker_color=colors ) )
+    fig.add_trace( go.Bar( x=plot_df["lineage"], y=plot_df["count"], marker_color=colors ) )
     fig.update_yaxes( showgrid=True, title="<b>Number of sequences</b>" )
     fig.update_xaxes( title="<b>PANGO lineage</b>" )
 
@@ -358,7 +399,7 @@ def binom_conf_interval(k, n, confidence_level=0.95 ):
 
 def plot_sgtf( sgtf_data ):
     plot_df = sgtf_data[0]
-    plot_df["week"] = plot_df["Date"].apply( lambda x: Week.fromdate( x ).startdate() )
+    plot_df["week"] = epiweek_start( plot_df["Date"] )
     plot_df = plot_df.groupby( "week" )[["sgtf_all", "sgtf_likely", "sgtf_unlikely", "total_positive"]].agg( sum )
     plot_df["percent"] = plot_df["sgtf_all"] / plot_df["total_positive"]
     plot_df[["lower", "upper"]] = plot_df.apply( lambda x: binom_conf_interval( x["sgtf_all"], x["total_positive"] ), axis=1 )
@@ -488,8 +529,21 @@ def plot_sgtf_estiamte( sgtf_data ):
 
     return fig
 
-def plot_catchment_areas( sd_map ):
-    fig = px.choropleth( sd_map, geojson=sd_map.geometry, locations=sd_map.index, color="Wastewater_treatment_plant",
+def plot_catchment_areas( geojson, sd_map ):
+    """ Plots the catchment area of each ZIP code. The geometry is embedded in the figure, so callbacks should serve it
+    through FigureCache with catchment_version() as the data version rather than drawing it on every request.
+    Parameters
+    ----------
+    geojson : dict
+        first output of load_catchment_areas().
+    sd_map : pandas.DataFrame
+        second output of load_catchment_areas().
+
+    Returns
+    -------
+    plotly.graph_objects.Figure
+    """
+    fig = px.choropleth( sd_map, geojson=geojson, featureidkey="id", locations=sd_map.index, color="Wastewater_treatment_plant",
                          labels={ "ZIP": "Zip code", "Wastewater_treatment_plant": "Catchment area" },
                          hover_data=["Wastewater_treatment_plant"],
                          category_orders={ "Encina": 0, "Point Loma": 1, "South Bay": 2, "Other": 3 },
@@ -634,35 +688,34 @@ def plot_monkeypox_concentration( mx_gene: pd.DataFrame, mx_cases: pd.DataFrame,
 
     return fig
 
-def plot_wastewater_seqs( ww_data, seqs, cases, config, norm_type, source="PointLoma", smooth=True ) -> go.Figure:
+def plot_wastewater_seqs( ww_data, abundances, cases, config, norm_type, source="PointLoma" ) -> go.Figure:
+    """ Plots the abundance of the lineage groups in the wastewater of a site.
+    Parameters
+    ----------
+    ww_data : pandas.DataFrame
+        qPCR measurements of all sites; first output of load_wastewater_data().
+    abundances : pandas.DataFrame
+        abundance of each group of config at each site; output of LineageGroups.abundances().
+    cases : pandas.DataFrame
+        reported cases in the catchment area of the site.
+    config : dict
+        output of load_ww_plot_config().
+    norm_type : str
+        "prevalence" to plot abundances, or "viral" or "cases" to scale them by the viral load or reported cases.
+    source : str
+        site to plot.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure
+    """
     def hex_to_rgb( hex_color: str ) -> tuple:
         hex_color = hex_color.lstrip( "#" )
         if len( hex_color ) == 3:
             hex_color = hex_color * 2
         return int( hex_color[0:2], 16 ), int( hex_color[2:4], 16 ), int( hex_color[4:6], 16 )
 
-    filtered_seqs = seqs.loc[seqs["source"]==source]
-
-    plot_df = []
-    for i in config.keys() :
-        if i != "Other" :
-            try:
-                temp_sum = filtered_seqs[config[i]["members"]].sum( axis=1 )
-            except KeyError:
-                print( 'help"')
-                exit()
-            temp_sum.name = i
-            plot_df.append( temp_sum )
-    plot_df = pd.concat( plot_df, axis=1 )
-    plot_df["Other"] = 100 - plot_df.sum( axis=1 )
-    plot_df["Other"] = plot_df["Other"].clip( lower=0 )
-
-
-    if smooth:
-        plot_df = plot_df.apply( savgol_filter, window_length=21, polyorder=1 )
-        #plot_df = plot_df.apply( lambda x: x.rolling( 14, min_periods=1, win_type="triang" ).mean() )
-        plot_df = plot_df.clip( lower=0 )
-        plot_df = plot_df.apply( lambda x:( x / x.sum()) * 100, axis=1  )
+    plot_df = abundances.loc[abundances["source"]==source].drop( columns="source" )
 
     norm=None
     ht = "%{y:.0f}"
@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+
+class _Slot:
+    def __init__( self ):
+        self.ready = threading.Event()
+        self.value = None
+        self.error = None
+
+class QueryCache:
+    """ Bounded LRU memoization of the intermediates computed for a single dashboard query. Entries are keyed on the
+    normalized filter tuple and hold any number of named values (filtered sequences, filtered cases, aggregates), so
+    that the callbacks fired by a single interaction compute each intermediate once. Callbacks running concurrently
+    and asking for the same value wait for the first one to finish instead of computing it again.
+
+    Values handed out are shared between callbacks and must be treated as read-only.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of filter tuples to keep. The least recently used tuple is evicted first.
+    """
+    def __init__( self, maxsize=32 ):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get( self, key, name, factory ):
+        """ Returns the value called name for the filter tuple key, computing it with factory() if it isn't cached.
+        Parameters
+        ----------
+        key : tuple
+            Normalized filter tuple, see query_key().
+        name : str
+            Name of the intermediate.
+        factory : callable
+            Function without arguments that computes the value.
+
+        Returns
+        -------
+        object
+        """
+        with self._lock:
+            entry = self._entries.get( key )
+            if entry is None:
+                entry = dict()
+                self._entries[key] = entry
+                while len( self._entries ) > self.maxsize:
+                    self._entries.popitem( last=False )
+            else:
+                self._entries.move_to_end( key )
+
+            slot = entry.get( name )
+            owner = slot is None
+            if owner:
+                slot = _Slot()
+                entry[name] = slot
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if owner:
+            try:
+                slot.value = factory()
+            except Exception as error:
+                slot.error = error
+                with self._lock:
+                    if entry.get( name ) is slot:
+                        del entry[name]
+                raise
+            finally:
+                slot.ready.set()
+        else:
+            slot.ready.wait()
+            if slot.error is not None:
+                raise slot.error
+
+        return slot.value
+
+    def clear( self ):
+        with self._lock:
+            self._entries.clear()
+
+    def stats( self ):
+        """ Returns the hit/miss counters and current size of the cache, for sizing maxsize.
+        """
+        with self._lock:
+            return { "hits" : self.hits,
+                     "misses" : self.misses,
+                     "size" : len( self._entries ),
+                     "maxsize" : self.maxsize }
+
+def query_key( state, window=None, provider=None, sequencer=None, zip_f=None ):
+    """ Normalizes dashboard filters into a hashable key. Empty filters are treated as not set, like the callbacks do.
+    """
+    return state, window or None, provider or None, sequencer or None, zip_f or None
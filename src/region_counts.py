@@ -0,0 +1,54 @@
+## region_counts.py builds the data loaded once per page in the clientside filtering mode of the main page: the sequence
+## counts of a region as packed columns, together with everything assets/clientside_filters.js needs to build the
+## dropdown options and lineage graphs from them without asking the server again.
+import json
+
+import plotly.express as px
+from plotly.io.json import to_json_plotly
+
+import src.plot as dashplot
+from src.variants import VOC, VOI
+
+REGION_DIMENSIONS = ["epiweek", "days_bucket", "zipcode", "provider", "sequencer", "lineage"]
+LINEAGE_SCALES = ["sequences", "fraction"]
+
+def _layout( figure ):
+    return json.loads( to_json_plotly( figure ) )["layout"]
+
+def region_counts( cube, state ):
+    """ Exports the sequence counts of a region for filtering in the browser.
+    Parameters
+    ----------
+    cube : src.count_cube.CountCube
+        counts of the current dataset.
+    state : str
+        region to export, either "San Diego" or "Baja California".
+
+    Returns
+    -------
+    dict
+        output of CountCube.export() for REGION_DIMENSIONS, plus the days_past bucket edges, the variants of concern
+        and interest among the exported lineages, the colors of the plots, and the layouts of the lineage graphs drawn
+        from all sequences of the region. The plotly template shared by the layouts is stored once, under "template".
+    """
+    lineage_counts = cube.counts_by( ["lineage"], state=state )
+    time_counts = cube.counts_by( ["epiweek", "lineage"], state=state )
+
+    layouts = { "lineages" : _layout( dashplot.plot_lineages( lineage_counts ) ) }
+    for scaleby in LINEAGE_SCALES:
+        layouts[f"lineage_time_{scaleby}"] = _layout( dashplot.plot_lineages_time( time_counts, None, scaleby ) )
+        layouts[f"voc_{scaleby}"] = _layout( dashplot.plot_voc( time_counts, scaleby ) )
+    template = None
+    for layout in layouts.values():
+        template = layout.pop( "template", template )
+
+    exported = cube.export( REGION_DIMENSIONS, state=state )
+    lineages = [lineage for lineage in exported["labels"]["lineage"] if lineage is not None]
+    return { **exported,
+             "bucket_edges" : cube.bucket_edges,
+             "voc" : { lineage : VOC[lineage] for lineage in lineages if lineage in VOC },
+             "voi" : { lineage : VOI[lineage] for lineage in lineages if lineage in VOI },
+             "colors" : { "dark" : dashplot.COLOR_DARK, "light" : dashplot.COLOR_LIGHT, "voc" : px.colors.colorbrewer.Dark2,
+                          "lineage_voc" : dashplot.COLOR_LINEAGE_VOC, "lineage_voi" : dashplot.COLOR_LINEAGE_VOI },
+             "template" : template,
+             "layouts" : layouts }
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+INDEXED_COLUMNS = ["state", "provider", "sequencer", "zipcode"]
+
+class SequenceIndex:
+    """ Precomputed filter index over the sequence metadata. For every distinct value of the indexed columns the sorted
+    row positions holding that value are stored, along with the row order sorted by days_past. Filters then start from
+    the smallest candidate set and only check the remaining conditions on those rows, instead of comparing every row of
+    every column.
+
+    Parameters
+    ----------
+    seqs : pandas.DataFrame
+        output of load_sequences().
+    columns : list[str]
+        columns of seqs that can be filtered on by equality.
+    """
+    def __init__( self, seqs: pd.DataFrame, columns=INDEXED_COLUMNS ):
+        self.seqs = seqs
+        self._codes = dict()
+        self._lookup = dict()
+        self._positions = dict()
+
+        for col in columns:
+            codes, uniques = pd.factorize( seqs[col] )
+            codes = np.asarray( codes )
+            order = np.argsort( codes, kind="stable" )
+            bounds = np.searchsorted( codes[order], np.arange( len( uniques ) + 1 ) )
+            self._codes[col] = codes
+            self._lookup[col] = { value : code for code, value in enumerate( uniques ) }
+            self._positions[col] = [order[bounds[i]:bounds[i+1]] for i in range( len( uniques ) )]
+
+        self._days = seqs["days_past"].to_numpy()
+        self._days_order = np.argsort( self._days, kind="stable" )
+        self._days_sorted = self._days[self._days_order]
+
+    def __len__( self ):
+        return len( self.seqs )
+
+    def positions( self, window=None, **filters ) -> np.ndarray:
+        """ Finds the rows matching all filters.
+        Parameters
+        ----------
+        window : int
+            only include sequences with days_past <= window. Ignored if falsy.
+        **filters :
+            column=value pairs to filter on by equality. Falsy values are ignored.
+
+        Returns
+        -------
+        numpy.ndarray
+            sorted row positions of the matching sequences.
+        """
+        candidates = list()
+        for col, value in filters.items():
+            if not value:
+                continue
+            code = self._lookup[col].get( value )
+            if code is None:
+                return np.array( [], dtype=np.intp )
+            candidates.append( (col, code, self._positions[col][code]) )
+
+        if window:
+            end = np.searchsorted( self._days_sorted, window, side="right" )
+            candidates.append( ("days_past", window, self._days_order[:end]) )
+
+        if len( candidates ) == 0:
+            return np.arange( len( self.seqs ) )
+
+        candidates = sorted( candidates, key=lambda x: len( x[2] ) )
+        positions = candidates[0][2]
+        for col, value, _ in candidates[1:]:
+            if col == "days_past":
+                positions = positions[self._days[positions] <= value]
+            else:
+                positions = positions[self._codes[col][positions] == value]
+
+        # Only the days_past order is unsorted, but sorting keeps the row order of the original frame.
+        return np.sort( positions )
+
+    def select( self, window=None, **filters ) -> pd.DataFrame:
+        """ Returns the rows of the indexed frame matching all filters, in their original order. See positions().
+        """
+        return self.seqs.take( self.positions( window=window, **filters ) )
@@ -0,0 +1,117 @@
+## sgtf.py fits the logistic growth mixture model of the /sgtf page. The fit normally runs during ingest in
+## .github/scripts/update_sgtf.py; load_sgtf_data() only runs it in-process when the ingest outputs are missing or were
+## fit to data that has since changed.
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import curve_fit
+from scipy.signal import savgol_filter
+
+SGTF_URL = "https://raw.githubusercontent.com/andersen-lab/SARS-CoV-2_SGTF_San-Diego/main/SGTF_San_Diego_new.csv"
+
+# Everything that affects the fit besides the input data. Changing any of these forces a refit.
+FIT_PARAMETERS = {
+    "p0" : [0.01, 0.1, 0.003, 0.1, 2e-7, 0.1, 1e-9, 0.1, 1e-11, 0.05],
+    "days_sim" : 1500,
+    "min_date" : "2023-07-01",
+    "serial_interval" : 5.5,
+    # should be -1 when we want to include the term. I won't for now because the CI is so large.
+    "sigma_scale" : { 4 : -1, 5 : -1, 8 : -0.5, 9 : -1 },    # sneaky little hack to get CIs
+}
+
+def lgm( ndays, x0, r ):
+    return 1 / ( 1 + ( ( ( 1 / x0 ) - 1 ) * np.exp( -1 * r * ndays ) ) )
+
+def lgm_mixture( ndays, x0_1, r_1, x0_2, r_2, x0_3, r_3, x0_4, r_4, x0_5, r_5 ):
+    """ Summation of five logistic growth models, parameterized using the initial prevalence and logistic growth rate.
+    ndays can be a scalar or an array.
+    """
+    return (lgm( ndays, x0_1, r_1 )
+            - lgm( ndays, x0_2, r_2 )
+            + lgm( ndays, x0_3, r_3 )
+            - lgm( ndays, x0_4, r_4 )
+            + lgm( ndays - 50, x0_5, r_5 ) )    # you didn't see anything.
+
+def prepare_tests( tests ):
+    """ Cleans the number of tests with S-gene target failure in San Diego and smooths the percent of SGTF tests.
+    Parameters
+    ----------
+    tests : pandas.DataFrame
+        SGTF_URL read with parse_dates=["Date"].
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    tests = tests.dropna( how='all', axis=1 )
+    tests.columns = ["Date", "sgtf_all", "sgtf_likely", "sgtf_unlikely", "no_sgtf", "total_positive", "percent_low", "percen_all"]
+    tests = tests.loc[~tests["Date"].isna()].copy()
+    tests["percent"] = (tests["sgtf_all"] / tests["total_positive"]).fillna(0)
+    tests["percent_filter"] = savgol_filter( tests["percent"], window_length=7, polyorder=2 )
+    tests["ndays"] = tests["Date"].apply(lambda x: x.toordinal())
+    tests["ndays"] = tests["ndays"] - min( tests["ndays"] ) + 1
+    return tests
+
+def input_hash( tests ):
+    """ Returns a hash of the data the model is fit to and of FIT_PARAMETERS.
+    """
+    digest = hashlib.sha256()
+    digest.update( tests[["Date", "ndays", "percent_filter"]].to_csv( index=False ).encode() )
+    digest.update( json.dumps( FIT_PARAMETERS, sort_keys=True ).encode() )
+    return digest.hexdigest()
+
+def fit_mixture( tests ):
+    """ Fits a logistic growth mixture model to the smoothed SGTF percentage.
+    Parameters
+    ----------
+    tests : pandas.DataFrame
+        output of download_tests().
+
+    Returns
+    -------
+    fits : pandas.DataFrame
+        Estimated prevelence of SGTF using Logistic growth mixture model.
+    estimates : pandas.DataFrame
+        Estimates and confidence intervals for the growth rate, doubling time, and transmission advantage of the last component of the mixture model.
+    """
+    p0 = FIT_PARAMETERS["p0"]
+    fit, covar = curve_fit(
+        f=lgm_mixture,
+        xdata=tests["ndays"],
+        ydata=tests["percent_filter"],
+        p0=p0,
+        bounds=([0] * len( p0 ), [np.inf] * len( p0 ))
+    )
+    sigma_ab = np.sqrt( np.diagonal( covar ) )
+
+    days_sim = FIT_PARAMETERS["days_sim"]
+    ndays = np.arange( days_sim )
+
+    fit_df = pd.DataFrame( {"date" : pd.date_range( tests["Date"].min(), periods=days_sim ) } )
+    fit_df["ndays"] = ndays
+    fit_df["fit_y"] = lgm_mixture( ndays, *fit )
+
+    sigma_addition = sigma_ab.copy()
+    for index, scale in FIT_PARAMETERS["sigma_scale"].items():
+        sigma_addition[index] *= scale
+
+    fit_df["fit_lower"] = lgm_mixture( ndays, *(fit + sigma_addition) )
+    fit_df["fit_upper"] = lgm_mixture( ndays, *(fit - sigma_addition) )
+
+    after_min = fit_df.loc[fit_df["date"] > FIT_PARAMETERS["min_date"]]
+    first_above = lambda col, threshold: after_min.loc[after_min[col] > threshold, "date"].min()
+
+    growth_rate = fit[9]
+
+    estimates = pd.DataFrame( {
+        "estimate" : [first_above( "fit_y", 0.99 ), first_above( "fit_y", 0.50 ), growth_rate],
+        "lower" : [first_above( "fit_lower", 0.99 ), first_above( "fit_lower", 0.50 ), growth_rate - sigma_ab[5]],
+        "upper" : [first_above( "fit_upper", 0.99 ), first_above( "fit_upper", 0.50 ), growth_rate + sigma_ab[5]] }, index=["date99", "date50", "growth_rate"] )
+    estimates = estimates.T
+    estimates["growth_rate"] = estimates["growth_rate"].astype( float )
+    estimates["doubling_time"] = np.log(2) / estimates["growth_rate"]
+    estimates["transmission_increase"] = FIT_PARAMETERS["serial_interval"] * estimates["growth_rate"]
+
+    return fit_df, estimates
@@ -0,0 +1,49 @@
+## snapshot.py writes and checks the typed parquet snapshot of the sequence metadata. The snapshot records the size and
+## sha256 of the CSV it was converted from, so readers can tell whether it still matches the CSV next to it without
+## relying on file modification times, which a clone or checkout doesn't preserve.
+import hashlib
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SOURCE_SIZE_KEY = b"lone_pine.source_size"
+SOURCE_SHA256_KEY = b"lone_pine.source_sha256"
+
+def file_digest( path ):
+    digest = hashlib.sha256()
+    with open( path, "rb" ) as source_file:
+        for chunk in iter( lambda: source_file.read( 2 ** 20 ), b"" ):
+            digest.update( chunk )
+    return digest.hexdigest()
+
+def write_snapshot( frame, path, source ):
+    """ Writes frame to path as parquet, recording the size and hash of the CSV it was converted from.
+    Parameters
+    ----------
+    frame : pandas.DataFrame
+        typed sequence metadata.
+    path : str
+        location of the snapshot.
+    source : str
+        location of the CSV frame was converted from.
+    """
+    table = pa.Table.from_pandas( frame, preserve_index=False )
+    metadata = { **( table.schema.metadata or dict() ),
+                 SOURCE_SIZE_KEY : str( os.path.getsize( source ) ).encode(),
+                 SOURCE_SHA256_KEY : file_digest( source ).encode() }
+    pq.write_table( table.replace_schema_metadata( metadata ), path )
+
+def snapshot_matches( path, source ):
+    """ Returns whether the snapshot at path was converted from the current content of source. Only the parquet footer
+    is read, and source is only hashed when its size matches.
+    """
+    try:
+        metadata = pq.read_schema( path ).metadata or dict()
+    except ( OSError, pa.ArrowInvalid ):
+        return False
+    if SOURCE_SHA256_KEY not in metadata:
+        return False
+    if metadata.get( SOURCE_SIZE_KEY ) != str( os.path.getsize( source ) ).encode():
+        return False
+    return metadata[SOURCE_SHA256_KEY] == file_digest( source ).encode()
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import savgol_filter
+
+from src.cases import interpolate_weekly_cases, interpolate_new_reports, catchment_case_series
+
+def _add_missing_cases( entry, start=None ):
+    # Per ZIP code implementation interpolate_weekly_cases() replaces.
+    start = entry["updatedate"].min() if start is None else start
+    entry = entry.set_index( "updatedate" ).reindex( pd.date_range( start, entry["updatedate"].max() ) ).rename_axis( "updatedate" ).reset_index()
+    indexer = pd.api.indexers.FixedForwardWindowIndexer( window_size=7 )
+    entry["new_cases"] = entry.rolling( window=indexer, min_periods=1 )["new_cases"].apply( lambda x: x.max() / 7 )
+    return entry
+
+def _reference( cases, **kwargs ):
+    return_df = cases.groupby( "ziptext" ).apply( _add_missing_cases, **kwargs )
+    return return_df.drop( columns="ziptext" ).reset_index().drop( columns="level_1" )
+
+def _weekly_cases():
+    rng = np.random.default_rng( 0 )
+    frames = list()
+    for ziptext in ["92037", "92101", "91910", "92103"]:
+        dates = pd.date_range( pd.Timestamp( "2021-06-29" ) + pd.Timedelta( days=int( rng.integers( 0, 7 ) ) ), "2021-12-31", freq="7D" )
+        dates = dates[rng.random( len( dates ) ) > 0.2]
+        frames.append( pd.DataFrame( { "ziptext" : ziptext,
+                                       "case_count" : rng.integers( 0, 100, len( dates ) ),
+                                       "updatedate" : dates,
+                                       "new_cases" : rng.integers( 0, 50, len( dates ) ).astype( float ),
+                                       "population" : 40000 } ) )
+    cases = pd.concat( frames, ignore_index=True ).sort_values( "updatedate" )
+    cases.loc[cases.index[::11], "new_cases"] = np.nan
+    return cases
+
+def _catchment_reference( cases, catchment ):
+    # Per catchment implementation catchment_case_series() replaces.
+    new_cases = cases.loc[cases["catchment"] == catchment].groupby( "updatedate" ).agg(
+        reported_cases=("new_cases", sum),
+        population=("population", sum ) )
+    new_cases["reported_cases_rolling"] = savgol_filter( new_cases["reported_cases"], window_length=21, polyorder=2 )
+    new_cases.loc[new_cases["reported_cases_rolling"] < 0] = 0
+    new_cases["reported_cases_rolling"] = new_cases["reported_cases_rolling"] / new_cases["population"]
+    return new_cases
+
+def test_matches_rolling_apply():
+    cases = _weekly_cases()
+    pd.testing.assert_frame_equal( interpolate_weekly_cases( cases ), _reference( cases ) )
+
+def test_matches_rolling_apply_from_start():
+    cases = _weekly_cases()
+    cases = cases.loc[cases["updatedate"] > "2021-11-01"]
+    start = pd.Timestamp( "2021-10-28" )
+    pd.testing.assert_frame_equal( interpolate_weekly_cases( cases, start=start ), _reference( cases, start=start ) )
+
+def test_new_reports_match_full_interpolation():
+    cases = _weekly_cases()
+    # 92101 fell behind: its reports since October weren't available when previous was interpolated, and 91910 only
+    # started reporting afterwards.
+    available = ( cases["updatedate"] <= "2021-11-15" ) & ~( ( cases["ziptext"] == "92101" ) & ( cases["updatedate"] > "2021-10-01" ) )
+    available &= cases["ziptext"] != "91910"
+    previous = interpolate_weekly_cases( cases.loc[available] )
+
+    extended = interpolate_new_reports( cases, previous ).sort_values( ["ziptext", "updatedate"] ).reset_index( drop=True )
+    pd.testing.assert_frame_equal( extended, interpolate_weekly_cases( cases ) )
+
+def test_catchment_case_series():
+    rng = np.random.default_rng( 0 )
+    frames = list()
+    for catchment, ziptext, start in [("PointLoma", "92037", "2021-01-01"), ("PointLoma", "92101", "2021-01-15"), ("Encina", "92008", "2021-02-01")]:
+        dates = pd.date_range( start, "2021-06-30" )
+        new_cases = rng.poisson( 20, len( dates ) ).astype( float )
+        # A sudden drop to zero makes the smoothed series dip below zero.
+        new_cases[-40:] = 0
+        new_cases[:5] = np.nan
+        frames.append( pd.DataFrame( { "updatedate" : dates, "ziptext" : ziptext, "catchment" : catchment, "new_cases" : new_cases, "population" : 40000 } ) )
+    cases = pd.concat( frames, ignore_index=True )
+
+    series = catchment_case_series( cases )
+    for catchment in ["PointLoma", "Encina"]:
+        result = series.xs( catchment, axis=1, level=1 )
+        result = result.loc[result["reported_cases"].notna()]
+        expected = _catchment_reference( cases, catchment )
+        assert ( expected["population"] == 0 ).any()
+        pd.testing.assert_frame_equal( result, expected.astype( float ), check_names=False )
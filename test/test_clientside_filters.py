@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pandas as pd
+import pytest
+from plotly.io.json import to_json_plotly
+
+import src.plot as dashplot
+from src.count_cube import CountCube
+from src.region_counts import region_counts
+
+ASSET = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "assets", "clientside_filters.js" )
+
+# Runs the lineage_time_variants() clientside function on the region counts read from stdin.
+NODE_SCRIPT = """
+global.window = { dash_clientside : { no_update : null } };
+global.atob = function( s ) { return Buffer.from( s, "base64" ).toString( "binary" ); };
+require( process.argv[1] );
+const data = JSON.parse( require( "fs" ).readFileSync( 0, "utf8" ) );
+const out = {};
+for ( const lineage of ["all-voc", "all-delta", "all-omicron"] ) {
+    out[lineage] = window.dash_clientside.filters.lineage_time_variants( data, "/", null, null, lineage, null, null ).variants;
+}
+process.stdout.write( JSON.stringify( out ) );
+"""
+
+# Lineages with tied totals, so the order of the bars, and their colors, depends on how ties are broken. There are
+# enough Delta lineages tied that an unstable sort reorders them.
+LINEAGE_COUNTS = { "B.1.1.7" : 4, "B.1.351" : 4, "B.1" : 4,
+                   "B.1.617.2" : 3, "AY.1" : 3, "AY.100" : 3, "AY.106" : 1,
+                   **{ f"AY.{i}" : 2 for i in [101, 103, 105, 107, 108, 109, 110, 111, 112, 113, 114, 115, 116, 117, 118, 119, 12] },
+                   "BA.1" : 6, "BA.1.1" : 6, "B.1.1.529" : 1 }
+
+def _sequences():
+    lineages = [lineage for lineage, count in LINEAGE_COUNTS.items() for _ in range( count )]
+    return pd.DataFrame( {
+        "state" : "San Diego",
+        "epiweek" : pd.to_datetime( ["2022-01-02", "2022-01-09"] * ( len( lineages ) // 2 ) + ["2022-01-09"] * ( len( lineages ) % 2 ) ),
+        "days_past" : 10,
+        "zipcode" : "92037",
+        "provider" : "Helix",
+        "sequencer" : "Andersen Lab",
+        "lineage" : lineages,
+    } )
+
+def _traces( figure ):
+    return [( trace["name"], trace["marker"]["color"], [round( value, 9 ) for value in trace["y"]] ) for trace in figure["data"]]
+
+@pytest.mark.skipif( shutil.which( "node" ) is None, reason="node is not installed" )
+def test_voc_matches_server():
+    cube = CountCube( _sequences() )
+    data = to_json_plotly( region_counts( cube, "San Diego" ) )
+    result = subprocess.run( ["node", "-e", NODE_SCRIPT, ASSET], input=data, capture_output=True, text=True, check=True )
+    clientside = json.loads( result.stdout )
+
+    counts = cube.counts_by( ["epiweek", "lineage"], state="San Diego" )
+    for lineage, focus in [( "all-voc", "VOC" ), ( "all-delta", "Delta" ), ( "all-omicron", "Omicron" )]:
+        for scaleby in ["sequences", "fraction"]:
+            server = json.loads( to_json_plotly( dashplot.plot_voc( counts, scaleby, focus=focus ) ) )
+            assert _traces( clientside[lineage][scaleby] ) == _traces( server )
@@ -0,0 +1,73 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.commit_dates import CommitDatePoller
+
+class _GitHub:
+    """ Local stand-in for the GitHub API serving a single branch ref and the commits it points to.
+    """
+    def __init__( self ):
+        self.sha = "a1"
+        self.dates = { "a1" : "2022-08-01T17:30:00Z", "b2" : "2022-08-02T18:45:00Z" }
+        self.requests = []
+
+        server = self
+        class Handler( BaseHTTPRequestHandler ):
+            def do_GET( self ):
+                server.requests.append( self.path )
+                if self.path == "/ref":
+                    etag = f'"{server.sha}"'
+                    if self.headers.get( "If-None-Match" ) == etag:
+                        self.send_response( 304 )
+                        self.end_headers()
+                        return
+                    body = { "object" : { "url" : f"{server.url}/commits/{server.sha}" } }
+                else:
+                    etag = None
+                    body = { "author" : { "date" : server.dates[self.path.rsplit( "/", 1 )[-1]] } }
+                content = json.dumps( body ).encode()
+                self.send_response( 200 )
+                if etag:
+                    self.send_header( "ETag", etag )
+                self.send_header( "Content-Length", str( len( content ) ) )
+                self.end_headers()
+                self.wfile.write( content )
+
+            def log_message( self, *args ):
+                pass
+
+        self.httpd = ThreadingHTTPServer( ("127.0.0.1", 0), Handler )
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread( target=self.httpd.serve_forever, daemon=True ).start()
+
+    def stop( self ):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def github():
+    s = _GitHub()
+    yield s
+    s.stop()
+
+def test_unchanged_ref_is_revalidated( github ):
+    poller = CommitDatePoller( [f"{github.url}/ref"] )
+    assert poller.get( f"{github.url}/ref" ) == ""
+    poller.refresh()
+    poller.refresh()
+    assert github.requests == ["/ref", "/commits/a1", "/ref"]
+    assert poller.get( f"{github.url}/ref" ) == "Updated at August 01 @ 10:30 AM PDT"
+
+    github.sha = "b2"
+    poller.refresh()
+    assert poller.get( f"{github.url}/ref" ) == "Updated at August 02 @ 11:45 AM PDT"
+
+def test_last_date_is_kept_when_github_is_down( github ):
+    poller = CommitDatePoller( [f"{github.url}/ref"], timeout=1, max_age=0 )
+    poller.refresh()
+    github.stop()
+    poller.refresh()
+    assert poller.get( f"{github.url}/ref" ) == "Updated at August 01 @ 10:30 AM PDT or later"
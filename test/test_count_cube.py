@@ -0,0 +1,33 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+from src.count_cube import CountCube
+
+def _sequences():
+    return pd.DataFrame( {
+        "state" : ["San Diego"] * 4 + ["Baja California"],
+        "epiweek" : pd.to_datetime( ["2022-01-02", "2022-01-02", "2022-01-09", "2022-01-09", "2022-01-02"] ),
+        "days_past" : [300, 300, 20, 20, 300],
+        "zipcode" : ["92037", "92037", "92101", None, "None"],
+        "provider" : ["Helix", "Helix", "Helix", "Sharp Health", "Helix"],
+        "sequencer" : ["Andersen Lab"] * 5,
+        "lineage" : ["BA.1", "BA.1", "BA.2", "BA.2", "BA.1"],
+    } )
+
+def _unpack( packed ):
+    return np.frombuffer( base64.b64decode( packed["data"] ), dtype=np.dtype( packed["dtype"] ).newbyteorder( "<" ) )
+
+def test_export_round_trip():
+    cube = CountCube( _sequences() )
+    exported = cube.export( ["epiweek", "zipcode", "lineage"], state="San Diego" )
+    assert exported["labels"]["epiweek"] == ["2022-01-02", "2022-01-09"]
+    assert exported["labels"]["zipcode"] == ["92037", "92101", None]
+    assert exported["counts"]["dtype"] == "uint8"
+
+    codes = { dim : _unpack( packed ) for dim, packed in exported["codes"].items() }
+    rows = pd.DataFrame( { dim : [exported["labels"][dim][code] for code in codes[dim]] for dim in codes } )
+    rows["count"] = _unpack( exported["counts"] )
+    totals = rows.groupby( ["epiweek", "lineage"] )["count"].sum()
+    assert totals.to_dict() == { ( "2022-01-02", "BA.1" ) : 2, ( "2022-01-09", "BA.2" ) : 2 }
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from src.decimate import lttb_indices, minmax_indices, decimate_figure, relayout_range
+
+DATES = [date.isoformat() for date in pd.date_range( "2021-01-01", periods=2000 )]
+
+def _figure():
+    rng = np.random.default_rng( 0 )
+    line = rng.normal( size=len( DATES ) ).cumsum()
+    line[500] = 100
+    return { "data" : [{ "type" : "scatter", "mode" : "lines", "x" : DATES, "y" : line.tolist() },
+                       { "type" : "scattergl", "mode" : "markers", "x" : DATES, "y" : rng.normal( size=len( DATES ) ).tolist() },
+                       { "type" : "scatter", "stackgroup" : "one", "x" : DATES, "y" : [60.0] * len( DATES ) },
+                       { "type" : "scatter", "stackgroup" : "one", "x" : DATES, "y" : [40.0] * ( len( DATES ) - 1 ) + [None] }],
+             "layout" : { "xaxis" : { "range" : ["2021-01-01", "2026-06-01"] } } }
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange( 1000, dtype=float )
+    y = np.sin( x / 50 )
+    y[333] = 10
+    indices = lttb_indices( x, y, 100 )
+    assert len( indices ) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 333 in indices
+    assert ( np.diff( indices ) > 0 ).all()
+
+def test_minmax_keeps_extremes():
+    y = np.random.default_rng( 1 ).normal( size=1000 )
+    indices = minmax_indices( y, 50 )
+    assert len( indices ) <= 102
+    assert y.argmax() in indices and y.argmin() in indices
+
+def test_decimate_whole_figure():
+    figure = decimate_figure( _figure(), width=400 )
+    line, markers, bottom, top = figure["data"]
+    assert len( line["x"] ) == 200
+    assert 100 in line["y"]
+    assert len( markers["x"] ) <= 202
+    assert bottom["x"] == top["x"]
+    assert len( bottom["x"] ) == 200
+    assert set( bottom["y"] ) == {60.0} and set( top["y"] ) == {40.0}
+    assert figure["layout"]["xaxis"]["range"] == ["2021-01-01", "2026-06-01"]
+
+def test_initial_range():
+    figure = _figure()
+    figure["layout"]["xaxis"]["range"] = ["2021-03-01", "2021-04-30 12:00:00"]
+    figure = decimate_figure( figure, width=400 )
+    for trace in figure["data"]:
+        assert trace["x"][0] == "2021-02-28T00:00:00"
+        assert trace["x"][-1] == "2021-05-01T00:00:00"
+        assert len( trace["x"] ) == 63
+    assert figure["layout"]["xaxis"] == { "range" : ["2021-03-01", "2021-04-30 12:00:00"] }
+
+def test_bars_are_unchanged():
+    y = np.random.default_rng( 2 ).normal( size=len( DATES ) ).tolist()
+    figure = { "data" : [{ "type" : "bar", "x" : DATES, "y" : y }], "layout" : { "xaxis" : { "range" : [DATES[0], DATES[99]] } } }
+    figure = decimate_figure( figure, x_range=( DATES[0], DATES[99] ), width=400 )
+    assert figure["data"][0]["x"] == DATES and figure["data"][0]["y"] == y
+
+def test_zoom_is_full_resolution():
+    figure = decimate_figure( _figure(), x_range=( "2021-03-01", "2021-04-30 12:00:00" ), width=400 )
+    for trace in figure["data"]:
+        assert trace["x"][0] == "2021-02-28T00:00:00"
+        assert trace["x"][-1] == "2021-05-01T00:00:00"
+        assert len( trace["x"] ) == 63
+    assert figure["layout"]["xaxis"]["range"] == ["2021-03-01", "2021-04-30 12:00:00"]
+
+def test_relayout_range():
+    assert relayout_range( None ) is None
+    assert relayout_range( { "autosize" : True } ) is None
+    assert relayout_range( { "yaxis.range[0]" : 0, "yaxis.range[1]" : 1 } ) is None
+    assert relayout_range( { "xaxis.autorange" : True } ) == "auto"
+    assert relayout_range( { "xaxis.range[0]" : "2022-01-01", "xaxis.range[1]" : "2022-02-01" } ) == ( "2022-01-01", "2022-02-01" )
+    assert relayout_range( { "xaxis.range" : ["2022-01-01", "2022-02-01"] } ) == ( "2022-01-01", "2022-02-01" )
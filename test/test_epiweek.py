@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from epiweeks import Week
+
+from src.epiweek import epiweek_start, epiweek_ordinal, epiweek_year_week
+
+DATES = pd.Series( pd.date_range( "2019-01-01", "2030-12-31" ) )
+
+def test_matches_epiweeks():
+    weeks = [Week.fromdate( date ) for date in DATES.dt.date]
+    expected_start = pd.to_datetime( pd.Series( [week.startdate() for week in weeks] ) )
+    assert epiweek_start( DATES ).equals( expected_start )
+
+    year, week = epiweek_year_week( DATES )
+    assert ( year == [w.year for w in weeks] ).all()
+    assert ( week == [w.week for w in weeks] ).all()
+
+def test_ordinals_are_consecutive():
+    ordinals = epiweek_ordinal( DATES ).to_numpy()
+    steps = np.diff( ordinals )
+    assert ( ( steps == 1 ) == ( DATES.dt.dayofweek[1:] == 6 ) ).all()
+    assert ( steps[DATES.dt.dayofweek[1:] != 6] == 0 ).all()
+    assert epiweek_ordinal( ["1970-01-04", "1970-01-10", "1970-01-11"] ).tolist() == [0, 0, 1]
+
+def test_input_types():
+    strings = ["2022-01-01", None, "2022-01-09"]
+    starts = epiweek_start( pd.Series( strings, index=[5, 6, 7] ) )
+    assert starts.index.tolist() == [5, 6, 7]
+    assert starts.isna().tolist() == [False, True, False]
+    assert starts[7] == pd.Timestamp( "2022-01-09" )
+    assert isinstance( epiweek_start( pd.DatetimeIndex( ["2022-01-01"] ) ), pd.DatetimeIndex )
+    assert epiweek_start( ["2021-12-29"] )[0] == np.datetime64( "2021-12-26" )
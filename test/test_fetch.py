@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.fetch import RemoteCache
+
+class _Server:
+    """ Local stand-in for raw.githubusercontent.com that serves a single CSV with an ETag and counts requests.
+    """
+    def __init__( self ):
+        self.body = b"date,value\n2022-01-01,1\n2022-01-02,2\n"
+        self.etag = '"v1"'
+        self.requests = []
+        self.delay = 0
+
+        server = self
+        class Handler( BaseHTTPRequestHandler ):
+            def do_GET( self ):
+                server.requests.append( self.headers.get( "If-None-Match" ) )
+                time.sleep( server.delay )
+                if self.headers.get( "If-None-Match" ) == server.etag:
+                    self.send_response( 304 )
+                    self.end_headers()
+                    return
+                self.send_response( 200 )
+                self.send_header( "ETag", server.etag )
+                self.send_header( "Content-Length", str( len( server.body ) ) )
+                self.end_headers()
+                self.wfile.write( server.body )
+
+            def log_message( self, *args ):
+                pass
+
+        self.httpd = ThreadingHTTPServer( ("127.0.0.1", 0), Handler )
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/data.csv"
+        self.thread = threading.Thread( target=self.httpd.serve_forever, daemon=True )
+        self.thread.start()
+
+    def update( self, body, etag ):
+        self.body = body
+        self.etag = etag
+
+    def stop( self ):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server():
+    s = _Server()
+    yield s
+    s.stop()
+
+def test_fresh_entries_are_not_refetched( server, tmp_path ):
+    cache = RemoteCache( cache_dir=str( tmp_path ), default_ttl=60 )
+    first = cache.read_csv( server.url )
+    second = cache.read_csv( server.url )
+    assert len( server.requests ) == 1
+    assert first.equals( second )
+
+def test_expired_entries_are_revalidated( server, tmp_path ):
+    cache = RemoteCache( cache_dir=str( tmp_path ), default_ttl=0 )
+    first = cache.fetch( server.url )
+    second = cache.fetch( server.url )
+    assert server.requests == [None, '"v1"']
+    assert first.digest == second.digest
+
+    server.update( b"date,value\n2022-01-01,5\n", '"v2"' )
+    df = cache.read_csv( server.url )
+    assert df["value"].to_list() == [5]
+
+def test_parsed_frames_are_copies( server, tmp_path ):
+    cache = RemoteCache( cache_dir=str( tmp_path ), default_ttl=60 )
+    df = cache.read_csv( server.url, parse_dates=["date"] )
+    df["value"] = 0
+    assert cache.read_csv( server.url, parse_dates=["date"] )["value"].to_list() == [1, 2]
+
+def test_disk_cache_is_shared_between_instances( server, tmp_path ):
+    RemoteCache( cache_dir=str( tmp_path ), default_ttl=60 ).fetch( server.url )
+    entry = RemoteCache( cache_dir=str( tmp_path ), default_ttl=60 ).fetch( server.url )
+    assert len( server.requests ) == 1
+    assert entry.content == server.body
+
+def test_stale_copy_is_used_when_server_is_down( server, tmp_path ):
+    cache = RemoteCache( cache_dir=str( tmp_path ), default_ttl=0, timeout=1 )
+    first = cache.fetch( server.url )
+    server.stop()
+    assert cache.fetch( server.url ).content == first.content
+
+def test_concurrent_fetches_download_once( server, tmp_path ):
+    cache = RemoteCache( cache_dir=str( tmp_path / "cache" ), default_ttl=60 )
+    assert not os.path.exists( tmp_path / "cache" )
+    server.delay = 0.2
+    frames = []
+    threads = [threading.Thread( target=lambda: frames.append( cache.read_csv( server.url ) ) ) for _ in range( 8 )]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len( server.requests ) == 1
+    assert len( frames ) == 8 and all( frame.equals( frames[0] ) for frame in frames )
+    assert os.path.exists( tmp_path / "cache" )
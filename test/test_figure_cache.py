@@ -0,0 +1,66 @@
+import plotly.graph_objects as go
+import pytest
+
+from src.figure_cache import FigureCache
+
+class _Plot:
+    """ Figure factory counting how many times it was called.
+    """
+    def __init__( self, y=( 1, 2, 3 ) ):
+        self.y = list( y )
+        self.calls = 0
+
+    def __call__( self ):
+        self.calls += 1
+        return go.Figure( go.Scatter( x=list( range( len( self.y ) ) ), y=self.y ) )
+
+def test_hits_on_same_inputs_and_version():
+    cache = FigureCache()
+    plot = _Plot()
+    first = cache.get( "plot", ["/", None, ""], "v1", plot )
+    second = cache.get( "plot", ["/", "", None], "v1", plot )
+    assert plot.calls == 1
+    assert first == second
+    assert first["data"][0]["y"] == [1, 2, 3]
+    assert cache.stats()["hits"] == 1
+
+    cache.get( "plot", ["/", 30, None], "v1", plot )
+    assert plot.calls == 2
+
+def test_new_version_drops_old_entries():
+    cache = FigureCache()
+    plot = _Plot()
+    cache.get( "plot", ["/"], "v1", plot )
+    cache.get( "other", ["/"], "v1", _Plot() )
+    cache.get( "plot", ["/"], "v2", plot )
+    assert plot.calls == 2
+    assert cache.stats()["entries"] == 2
+
+    cache.get( "plot", ["/"], "v2", plot )
+    assert plot.calls == 2
+
+def test_size_cap_evicts_least_recently_used():
+    cache = FigureCache()
+    cache.get( "plot", [0], "v1", _Plot() )
+    cache = FigureCache( max_bytes=int( 2.5 * cache.stats()["bytes"] ) )
+    plots = [_Plot() for _ in range( 3 )]
+    for i, plot in enumerate( plots ):
+        cache.get( "plot", [i], "v1", plot )
+        if i == 0:
+            cache.get( "plot", [0], "v1", plot )
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    cache.get( "plot", [2], "v1", plots[2] )
+    assert plots[2].calls == 1
+    cache.get( "plot", [0], "v1", plots[0] )
+    assert plots[0].calls == 2
+
+def test_errors_are_not_cached():
+    cache = FigureCache()
+    def fail():
+        raise ValueError( "no data" )
+    with pytest.raises( ValueError ):
+        cache.get( "plot", [], "v1", fail )
+    plot = _Plot()
+    cache.get( "plot", [], "v1", plot )
+    assert plot.calls == 1
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.growth_model import MultinomialGrowthModel
+
+sm = pytest.importorskip( "statsmodels.api" )
+
+def _sequences():
+    rng = np.random.default_rng( 1 )
+    weeks = rng.integers( 2700, 2720, 3000 )
+    eta = np.column_stack( [np.zeros( len( weeks ) ), 0.15 * ( weeks - 2710 ) - 1, -0.1 * ( weeks - 2710 )] )
+    prob = np.exp( eta ) / np.exp( eta ).sum( axis=1, keepdims=True )
+    lineages = np.array( ["Other", "BA.2", "BA.5"] )[( prob.cumsum( axis=1 ) > rng.random( ( len( weeks ), 1 ) ) ).argmax( axis=1 )]
+    return pd.DataFrame( { "epiweek" : weeks, "lineage" : pd.Categorical( lineages, categories=["Other", "BA.2", "BA.5"] ) } )
+
+def test_matches_mnlogit():
+    seqs = _sequences()
+    counts = seqs.groupby( "epiweek" )["lineage"].value_counts().unstack( fill_value=0 )
+    counts = counts.reindex( columns=seqs["lineage"].cat.categories, fill_value=0 )
+    results = MultinomialGrowthModel( counts ).fit()
+
+    exog = seqs[["epiweek"]].assign( const=1 )
+    expected = sm.MNLogit( seqs["lineage"].cat.codes, exog ).fit( method="newton", disp=False )
+
+    assert results.converged
+    assert results.names == ["Other", "BA.2", "BA.5"]
+    assert results.llf == pytest.approx( expected.llf )
+    np.testing.assert_allclose( results.params.to_numpy(), expected.params.to_numpy(), rtol=1e-6 )
+    np.testing.assert_allclose( results.conf_int()[:, 0], expected._results.conf_int()[:, 0], rtol=1e-4 )
+    np.testing.assert_allclose( results.cov_params().to_numpy(), expected.cov_params().to_numpy(), rtol=1e-3 )
+    assert results.cov_params().loc["BA.5", "BA.5"].shape == ( 2, 2 )
+
+    weeks = [[2705, 1], [2725, 1]]
+    np.testing.assert_allclose( results.predict( weeks ), expected.predict( weeks ), rtol=1e-6 )
+
+def test_start_params():
+    counts = pd.DataFrame( { "Other" : [50, 40, 30, 20], "BA.2" : [5, 10, 20, 40] }, index=[2700, 2701, 2702, 2703] )
+    model = MultinomialGrowthModel( counts )
+    results = model.fit()
+    warm = model.fit( start_params=results.params.to_numpy().T )
+    assert warm.iterations < results.iterations
+    np.testing.assert_allclose( warm.params.to_numpy(), results.params.to_numpy() )
+
+def test_refit_with_new_lineage():
+    counts = pd.DataFrame( { "Other" : [50, 40, 30, 20], "BA.2" : [5, 10, 20, 40] }, index=[2700, 2701, 2702, 2703] )
+    previous = MultinomialGrowthModel( counts ).fit()
+
+    counts["XBB"] = [0, 2, 4, 8]
+    model = MultinomialGrowthModel( counts.shift( -1 ).dropna() )
+    start, matched = model.start_params( previous )
+    assert matched == 1
+    np.testing.assert_allclose( start[0], previous.params["BA.2"] )
+    assert start[1, 0] == 0
+
+    results = model.refit( previous )
+    assert results.converged
+    np.testing.assert_allclose( results.params.to_numpy(), model.fit().params.to_numpy(), rtol=1e-6 )
+
+    with pytest.raises( ValueError ):
+        MultinomialGrowthModel( counts[["BA.2", "Other"]] ).start_params( previous )
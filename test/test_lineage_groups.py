@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import savgol_filter
+
+from src.lineage_groups import LineageGroups
+
+CONFIG = {
+    "BA.2" : { "name" : "BA.2", "members" : ["BA.2.X", "BA.2.75.X"] },
+    "BA.5" : { "name" : "BA.5", "members" : ["BA.5.X"] },
+    "Recombinants" : { "name" : "Recombinants", "members" : ["XBB.X", "Missing.X"] },
+    "Other" : { "name" : "Other", "members" : None },
+}
+
+def _seqs():
+    rng = np.random.default_rng( 0 )
+    frames = list()
+    for source, days in [("PointLoma", 60), ("Encina", 45)]:
+        values = rng.dirichlet( np.ones( 5 ), days ) * 90
+        seqs = pd.DataFrame( values, index=pd.date_range( "2022-06-01", periods=days, name="Date" ), columns=["BA.2.X", "BA.2.75.X", "BA.5.X", "XBB.X", "B.1.X"] )
+        seqs["source"] = source
+        frames.append( seqs )
+    seqs = pd.concat( frames )
+    seqs.iloc[3, 0] = np.nan
+    return seqs
+
+def _reference( seqs, source, smooth ):
+    # Per site implementation LineageGroups.abundances() replaces.
+    filtered_seqs = seqs.loc[seqs["source"] == source]
+    plot_df = pd.concat( [filtered_seqs[[m for m in CONFIG[i]["members"] if m in seqs]].sum( axis=1 ).rename( i ) for i in CONFIG if i != "Other"], axis=1 )
+    plot_df["Other"] = ( 100 - plot_df.sum( axis=1 ) ).clip( lower=0 )
+    if smooth:
+        plot_df = plot_df.apply( savgol_filter, window_length=21, polyorder=1 )
+        plot_df = plot_df.clip( lower=0 )
+        plot_df = plot_df.apply( lambda x: ( x / x.sum() ) * 100, axis=1 )
+    return plot_df
+
+def test_matches_per_site_sums():
+    seqs = _seqs()
+    groups = LineageGroups( CONFIG )
+    assert groups.membership.shape == ( 5, 3 )
+    for smooth in [True, False]:
+        abundances = groups.abundances( seqs, smooth=smooth )
+        for source in ["PointLoma", "Encina"]:
+            result = abundances.loc[abundances["source"] == source].drop( columns="source" )
+            pd.testing.assert_frame_equal( result, _reference( seqs, source, smooth ) )
@@ -0,0 +1,24 @@
+import os
+
+import pandas as pd
+
+from src.snapshot import snapshot_matches, write_snapshot
+
+def test_snapshot_tracks_its_csv( tmp_path ):
+    csv = str( tmp_path / "sequences.csv" )
+    snapshot = str( tmp_path / "sequences.parquet" )
+    frame = pd.DataFrame( { "ID" : ["a", "b"], "lineage" : ["BA.1", "BA.2"] } )
+    frame.to_csv( csv, index=False )
+    write_snapshot( frame, snapshot, csv )
+    assert snapshot_matches( snapshot, csv )
+    pd.testing.assert_frame_equal( pd.read_parquet( snapshot ), frame )
+
+    # Modification times don't matter, only the content of the CSV.
+    os.utime( csv, ( 0, 0 ) )
+    assert snapshot_matches( snapshot, csv )
+    frame.assign( lineage=["BA.1", "BA.5"] ).to_csv( csv, index=False )
+    assert not snapshot_matches( snapshot, csv )
+
+    # Snapshots written without the metadata are never trusted.
+    frame.to_parquet( snapshot, index=False )
+    assert not snapshot_matches( snapshot, csv )